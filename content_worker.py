@@ -16,6 +16,7 @@ from core.base_worker import BaseWorker
 from core.content_task_dispatcher import ContentTaskDispatcher
 from handlers.content_generation_handler import ContentGenerationHandler
 from services.backend_api_client import BackendApiClient
+from models.task_messages import TaskType
 from utils.logger import logger
 
 async def main():
@@ -28,8 +29,7 @@ async def main():
         logger.error(f"Content worker config error: {e}")
         return
     
-    logger.info(f"🔤 Starting Content Worker - Queue: {config.ai_task_queue}")
-    logger.info(f"� Routing Key: {config.routing_key}")
+    logger.info(f"🔤 Starting Content Worker - Queue: {config.task_route(TaskType.GENERATE_CONTENT)}")
     
     # SSL setup
     verify_ssl = not ('localhost' in config.backend_api_base_url.lower() or '127.0.0.1' in config.backend_api_base_url)
@@ -54,7 +54,7 @@ async def main():
             return await dispatcher.dispatch_task(message)
         
         # Create and run worker with graceful shutdown
-        worker = BaseWorker(config, handle_message)
+        worker = BaseWorker(config, handle_message, task_types=[TaskType.GENERATE_CONTENT])
         logger.info("🔤 Content Worker starting...")
         await worker.run()
 
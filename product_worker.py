@@ -15,7 +15,9 @@ from config.worker_config import WorkerConfig
 from core.base_worker import BaseWorker
 from core.product_task_dispatcher import ProductTaskDispatcher
 from handlers.product_creation_handler import ProductCreationHandler
+from handlers.slide_render_handler import SlideRenderHandler
 from services.backend_api_client import BackendApiClient
+from models.task_messages import TaskType
 from utils.logger import logger
 
 async def main():
@@ -45,7 +47,8 @@ async def main():
         # Setup components
         backend_client = BackendApiClient(session, config.backend_api_base_url, config.backend_api_key)
         product_handler = ProductCreationHandler(config, backend_client)
-        dispatcher = ProductTaskDispatcher(product_handler)
+        render_handler = SlideRenderHandler(config, backend_client) if config.scatter_render_enabled else None
+        dispatcher = ProductTaskDispatcher(product_handler, render_handler)
         
         # Message handler with timing
         async def handle_message(message):
@@ -64,7 +67,12 @@ async def main():
             return result
         
         # Create and run worker with graceful shutdown
-        worker = BaseWorker(config, handle_message)
+        worker = BaseWorker(
+            config, handle_message,
+            cost_estimator=product_handler.estimate_cost,
+            task_types=[TaskType.CREATE_PRODUCT]
+        )
+        product_handler.set_task_publisher(worker.rabbitmq_manager)
         logger.info("🎬 Product Worker starting...")
         await worker.run()
 
@@ -4,7 +4,9 @@ Worker configuration for AI processing
 import os
 import tempfile
 from dataclasses import dataclass
+from typing import List, Optional
 from dotenv import load_dotenv
+from src.models.task_messages import TaskType, JobType
 
 load_dotenv()
 
@@ -22,11 +24,30 @@ class WorkerConfig:
     dlq_queue: str = os.getenv("DLQ_QUEUE", "eduva.dlq")
     dlq_exchange: str = os.getenv("DLQ_EXCHANGE", "eduva.dlq.exchange")
     dlq_routing_key: str = os.getenv("DLQ_ROUTING_KEY", "eduva.dlq.routing_key")
+    # Fanout exchange for {"jobId": ...} cancel requests, received by every worker
+    cancel_exchange: str = os.getenv("CANCEL_EXCHANGE_NAME", "eduva.cancel")
+
+    # Dedicated queue and routing key per task type: <prefix>.<task_type>[.<job_type>]
+    task_route_prefix: str = os.getenv("TASK_ROUTE_PREFIX", "eduva.task")
+    job_type_routing: bool = os.getenv("JOB_TYPE_ROUTING", "false").lower() == "true"  # also split create_product per job type
+    worker_job_types: str = os.getenv("WORKER_JOB_TYPES", "")  # e.g. "VIDEO_LESSON"; empty = all job types
+    # Keep consuming QUEUE_NAME/ROUTING_KEY (shared by all worker types) while publishers migrate
+    consume_shared_queue: bool = os.getenv("CONSUME_SHARED_QUEUE", "true").lower() == "true"
+
+    # Slide render sub-tasks of scattered video jobs (product workers only)
+    scatter_render_enabled: bool = os.getenv("SCATTER_RENDER_ENABLED", "false").lower() == "true"
+    render_task_queue: str = os.getenv("RENDER_QUEUE_NAME", "ai_render_queue")
+    render_routing_key: str = os.getenv("RENDER_ROUTING_KEY", "ai.render")
+    render_prefetch_count: int = int(os.getenv("RENDER_PREFETCH_COUNT", "1"))
     
-    # Azure Blob Storage Configuration
+    # Storage Configuration: "azure" (Blob Storage) or "local" (containers are directories under LOCAL_STORAGE_DIR)
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "azure").lower()
+    local_storage_dir: str = os.getenv("LOCAL_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "eduva_storage"))
     azure_storage_connection_string: str = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "")
     azure_input_container: str = os.getenv("AZURE_INPUT_CONTAINER", "eduva-temp-storage")
     azure_output_container: str = os.getenv("AZURE_OUTPUT_CONTAINER", "eduva-storage")
+    azure_segment_cache_container: str = os.getenv("AZURE_SEGMENT_CACHE_CONTAINER", "")  # empty = local segment cache only
+    azure_checkpoint_container: str = os.getenv("AZURE_CHECKPOINT_CONTAINER", "")  # empty = resume on the same worker only
     
     # AI Service Configuration
     google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
@@ -41,7 +62,10 @@ class WorkerConfig:
     # Worker Configuration
     worker_id: str = os.getenv("WORKER_ID", "ai-worker-001")
     max_retries: int = int(os.getenv("MAX_RETRIES", "1"))
-    retry_delay: int = int(os.getenv("RETRY_DELAY", "5"))
+    retry_delay: int = int(os.getenv("RETRY_DELAY", "5"))  # seconds before the first retry; 0 = retry immediately
+    retry_backoff_factor: float = float(os.getenv("RETRY_BACKOFF_FACTOR", "4"))
+    retry_max_delay: int = int(os.getenv("RETRY_MAX_DELAY", "600"))
+    retry_jitter: float = float(os.getenv("RETRY_JITTER", "0.2"))  # fraction of a delay randomly taken off
     
     # Dead Letter Queue Configuration
     dlq_monitoring_enabled: bool = os.getenv("DLQ_MONITORING_ENABLED", "true").lower() == "true"
@@ -54,7 +78,10 @@ class WorkerConfig:
     
     def __post_init__(self):
         """Validate configuration after initialization"""
-        if not self.azure_storage_connection_string:
+        if self.storage_backend not in ("azure", "local"):
+            raise ValueError(f"STORAGE_BACKEND must be 'azure' or 'local', got '{self.storage_backend}'")
+
+        if self.storage_backend == "azure" and not self.azure_storage_connection_string:
             raise ValueError("AZURE_STORAGE_CONNECTION_STRING is required")
         
         if not self.backend_api_base_url:
@@ -69,6 +96,35 @@ class WorkerConfig:
         # Ensure temp directory exists
         os.makedirs(self.temp_dir, exist_ok=True)
     
+    def task_route(self, task_type: TaskType, job_type: Optional[JobType] = None) -> str:
+        """Routing key, which is also the queue name, of a task type (and job type with JOB_TYPE_ROUTING)"""
+        route = f"{self.task_route_prefix}.{task_type.name.lower()}"
+        if job_type is not None and self.job_type_routing and task_type == TaskType.CREATE_PRODUCT:
+            route += f".{job_type.name.lower()}"
+        return route
+
+    def retry_delay_for(self, retry_count: int) -> int:
+        """Delay tier (seconds) of the n-th retry: exponential from RETRY_DELAY, capped at RETRY_MAX_DELAY"""
+        if self.retry_delay <= 0:
+            return 0
+        delay = self.retry_delay * self.retry_backoff_factor ** max(0, retry_count - 1)
+        return int(min(delay, max(self.retry_delay, self.retry_max_delay)))
+
+    @property
+    def retry_delay_tiers(self) -> List[int]:
+        """Distinct delays used by the retries of a message, i.e. the delay queues to declare"""
+        return sorted({self.retry_delay_for(n) for n in range(1, self.max_retries)} - {0})
+
+    def retry_tier_name(self, delay: int) -> str:
+        """Exchange and queue holding retries for `delay` seconds"""
+        return f"{self.main_exchange}.retry.{delay}s"
+
+    @property
+    def handled_job_types(self) -> List[JobType]:
+        """Job types this worker takes from the per-job-type product queues"""
+        names = [name.strip().upper() for name in self.worker_job_types.split(",") if name.strip()]
+        return [JobType[name] for name in names] if names else list(JobType)
+
     @property
     def is_backend_api_enabled(self) -> bool:
         """Check if backend API is properly configured"""
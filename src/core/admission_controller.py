@@ -0,0 +1,177 @@
+"""
+Resource-aware admission control for delivered task messages
+
+Each task takes a number of weighted slots out of WorkerConfig.max_concurrent_tasks
+(a video render costs more than an audio lesson) and is only started while the
+node has CPU, memory and temp disk to spare. Messages waiting for admission stay
+unacked, so they are redelivered elsewhere if this worker goes away. Slide render
+sub-tasks are not admitted here: they do part of a job that already holds slots,
+and RENDER_PREFETCH_COUNT bounds them on their own channel.
+
+Waiting tasks are admitted shortest predicted job first. Every second of waiting
+takes ADMISSION_AGING_FACTOR seconds off a task's predicted cost, so long jobs
+are not starved by a stream of short ones.
+"""
+import os
+import time
+import shutil
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+import psutil
+from src.config.worker_config import WorkerConfig
+from src.models.task_messages import TaskType, JobType
+from src.utils.logger import logger
+
+# Slots taken per task kind, out of max_concurrent_tasks
+TASK_WEIGHT_VIDEO = int(os.getenv("TASK_WEIGHT_VIDEO", "2"))
+TASK_WEIGHT_AUDIO = int(os.getenv("TASK_WEIGHT_AUDIO", "1"))
+TASK_WEIGHT_CONTENT = int(os.getenv("TASK_WEIGHT_CONTENT", "1"))
+
+# Live resource limits checked before starting a task while others are running (0 disables a check)
+ADMISSION_MAX_CPU_PERCENT = float(os.getenv("ADMISSION_MAX_CPU_PERCENT", "85"))
+ADMISSION_MAX_RSS_MB = int(os.getenv("ADMISSION_MAX_RSS_MB", "0"))
+ADMISSION_MIN_AVAILABLE_MEMORY_MB = int(os.getenv("ADMISSION_MIN_AVAILABLE_MEMORY_MB", "1024"))
+ADMISSION_MIN_FREE_DISK_MB = int(os.getenv("ADMISSION_MIN_FREE_DISK_MB", "2048"))
+ADMISSION_POLL_INTERVAL = float(os.getenv("ADMISSION_POLL_INTERVAL", "2"))
+ADMISSION_AGING_FACTOR = float(os.getenv("ADMISSION_AGING_FACTOR", "1.0"))
+
+
+def task_weight(data: Dict[str, Any]) -> int:
+    """Slots needed by a raw task message"""
+    task_type = str(data.get("taskType"))
+    job_type = str(data.get("jobType"))
+
+    if task_type in (str(TaskType.GENERATE_CONTENT.value), TaskType.GENERATE_CONTENT.name):
+        return TASK_WEIGHT_CONTENT
+    if job_type in (str(JobType.AUDIO_LESSON.value), JobType.AUDIO_LESSON.name):
+        return TASK_WEIGHT_AUDIO
+    return TASK_WEIGHT_VIDEO
+
+
+class AdmissionController:
+    """
+    Weighted slot semaphore with resource checks, admitting the waiter with the
+    lowest aged cost first (arrival order among equal costs).
+
+    The first task is always admitted on an idle worker, so a busy node still
+    makes progress. Later tasks also wait for CPU, memory and disk headroom.
+    """
+
+    def __init__(self, config: WorkerConfig):
+        self.capacity = max(1, config.max_concurrent_tasks)
+        self.temp_dir = config.temp_dir
+        self.in_use = 0
+        self.running = 0
+        # ticket -> (predicted cost in seconds, enqueue time)
+        self._waiters: Dict[object, tuple] = {}
+        self._changed = asyncio.Condition()
+        self._process = psutil.Process()
+        # Prime the CPU counter; the first cpu_percent(None) call always returns 0
+        psutil.cpu_percent(interval=None)
+
+    def _resource_pressure(self) -> Optional[str]:
+        """Reason the node cannot take another task right now, or None"""
+        if ADMISSION_MAX_CPU_PERCENT > 0:
+            cpu = psutil.cpu_percent(interval=None)
+            if cpu > ADMISSION_MAX_CPU_PERCENT:
+                return f"CPU at {cpu:.0f}%"
+
+        if ADMISSION_MIN_AVAILABLE_MEMORY_MB > 0:
+            available_mb = psutil.virtual_memory().available / (1024 * 1024)
+            if available_mb < ADMISSION_MIN_AVAILABLE_MEMORY_MB:
+                return f"{available_mb:.0f} MB memory available"
+
+        if ADMISSION_MAX_RSS_MB > 0:
+            rss_mb = self._worker_rss_mb()
+            if rss_mb > ADMISSION_MAX_RSS_MB:
+                return f"worker RSS at {rss_mb:.0f} MB"
+
+        if ADMISSION_MIN_FREE_DISK_MB > 0:
+            try:
+                free_mb = shutil.disk_usage(self.temp_dir).free / (1024 * 1024)
+            except OSError:
+                free_mb = None
+            if free_mb is not None and free_mb < ADMISSION_MIN_FREE_DISK_MB:
+                return f"{free_mb:.0f} MB free in {self.temp_dir}"
+        return None
+
+    def _worker_rss_mb(self) -> float:
+        """RSS of the worker with its render processes and FFmpeg children"""
+        rss = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / (1024 * 1024)
+
+    def _next_waiter(self) -> Optional[object]:
+        now = time.monotonic()
+        return min(
+            self._waiters,
+            key=lambda ticket: (
+                self._waiters[ticket][0] - ADMISSION_AGING_FACTOR * (now - self._waiters[ticket][1]),
+                self._waiters[ticket][1]
+            ),
+            default=None
+        )
+
+    def _can_admit(self, ticket: object, weight: int) -> bool:
+        if self._next_waiter() is not ticket:
+            return False
+        if self.running == 0:
+            return True
+        if self.in_use + weight > self.capacity:
+            return False
+        return self._resource_pressure() is None
+
+    @asynccontextmanager
+    async def slot(self, weight: int, label: str = "", cost: float = 0.0):
+        """
+        Hold `weight` slots for the duration of the block, waiting for admission first.
+
+        `cost` is the predicted run time in seconds; 0 (unknown) goes before any prediction.
+        """
+        weight = min(max(1, weight), self.capacity)
+        ticket = object()
+        started = time.monotonic()
+        logged = False
+
+        async with self._changed:
+            self._waiters[ticket] = (cost, started)
+            try:
+                while not self._can_admit(ticket, weight):
+                    if not logged:
+                        reason = self._resource_pressure() or f"{self.in_use}/{self.capacity} slots in use"
+                        logger.info(f"⏳ Holding {label or 'task'} (weight {weight}, ~{cost:.0f}s): {reason}")
+                        logged = True
+                    try:
+                        # Woken by releases; poll because resource readings change on their own
+                        await asyncio.wait_for(self._changed.wait(), timeout=ADMISSION_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                del self._waiters[ticket]
+                self._changed.notify_all()
+
+            self.in_use += weight
+            self.running += 1
+
+        if logged:
+            logger.info(f"Admitted {label or 'task'} after {time.monotonic() - started:.1f}s")
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self.in_use -= weight
+                self.running -= 1
+                self._changed.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "running": self.running,
+            "waiting": len(self._waiters),
+        }
@@ -4,9 +4,12 @@ Base Worker Class - Shared functionality for all workers
 import asyncio
 import signal
 import sys
-from typing import Callable
+from typing import Callable, List, Optional
 from src.config.worker_config import WorkerConfig
 from src.core.rabbitmq_manager import RabbitMQManager
+from src.models.task_messages import TaskType
+from src.services.azure_blob_service import close_blob_transport
+from src.services.blob_cache import get_blob_cache
 from src.utils.logger import logger
 from src.utils.temp_cleanup import cleanup_old_temp_files
 
@@ -14,10 +17,13 @@ from src.utils.temp_cleanup import cleanup_old_temp_files
 class BaseWorker:
     """Base worker with graceful shutdown and common functionality"""
     
-    def __init__(self, config: WorkerConfig, message_handler: Callable):
+    def __init__(self, config: WorkerConfig, message_handler: Callable, cost_estimator: Optional[Callable] = None,
+                 task_types: Optional[List[TaskType]] = None):
         self.config = config
         self.message_handler = message_handler
-        self.rabbitmq_manager = RabbitMQManager(config, message_handler)
+        self.rabbitmq_manager = RabbitMQManager(
+            config, message_handler, cost_estimator=cost_estimator, task_types=task_types
+        )
         self.is_running = False
         self.shutdown_event = asyncio.Event()
         
@@ -53,7 +59,7 @@ class BaseWorker:
             
             # Start RabbitMQ connection
             await self.rabbitmq_manager.start()
-            logger.info(f"✅ Worker started - Queue: {self.config.ai_task_queue}")
+            logger.info(f"✅ Worker started - Queues: {', '.join(self.rabbitmq_manager.queue_names)}")
             
             # Wait for shutdown signal
             await self.shutdown_event.wait()
@@ -74,6 +80,14 @@ class BaseWorker:
         try:
             # Stop RabbitMQ manager (this will handle running task cleanup)
             await self.rabbitmq_manager.stop()
+            await close_blob_transport()
+            blob_cache = get_blob_cache()
+            if blob_cache is not None:
+                stats = blob_cache.get_stats()
+                logger.info(
+                    f"Blob cache: {stats['hits']} hits, {stats['misses']} misses ({stats['stale']} stale), "
+                    f"hit ratio {stats['hit_ratio']:.0%}, {stats['entries']} entries / {stats['size_mb']:.1f} MB"
+                )
             logger.info("✅ Worker stopped gracefully")
         except Exception as e:
             logger.error(f"Error stopping worker: {e}")
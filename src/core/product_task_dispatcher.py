@@ -1,7 +1,7 @@
 """
 Product Worker Task Dispatcher - Only handles product creation
 """
-from typing import Dict
+from typing import Dict, Any, Optional, Union
 from src.models.task_messages import TaskType, parse_task_message
 from src.handlers.base_handler import BaseTaskHandler
 from src.utils.logger import logger
@@ -10,14 +10,19 @@ from src.utils.logger import logger
 class ProductTaskDispatcher:
     """Dispatcher for product-only tasks"""
     
-    def __init__(self, product_handler: BaseTaskHandler):
+    def __init__(self, product_handler: BaseTaskHandler, render_handler: Optional[BaseTaskHandler] = None):
         self.product_handler = product_handler
+        # Renders slides of video jobs scattered by other product workers
+        self.render_handler = render_handler
         logger.info("Product task dispatcher initialized")
     
-    async def dispatch_task(self, message_body: Dict) -> bool:
-        """Dispatch only product creation tasks"""
+    async def dispatch_task(self, message_body: Dict) -> Union[bool, Dict[str, Any]]:
+        """Dispatch product creation tasks and slide render sub-tasks"""
         try:
             task_message = parse_task_message(message_body)
+
+            if task_message.taskType == TaskType.RENDER_SLIDE and self.render_handler:
+                return await self.render_handler.process(task_message)
             
             # Only handle product creation
             if task_message.taskType != TaskType.CREATE_PRODUCT:
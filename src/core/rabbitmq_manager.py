@@ -1,23 +1,70 @@
 import asyncio
 import json
-from typing import Callable, Dict, Any
+import uuid
+import random
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple
 import aio_pika
 from src.config.worker_config import WorkerConfig
+from src.models.task_messages import TaskType, JobType, parse_task_message
+from src.core.admission_controller import AdmissionController, task_weight
 from src.utils.logger import logger
 
+# Cancelled job ids remembered, so a cancelled job delivered (or retried) later is dropped
+CANCELLED_JOBS_MEMORY = 1000
+# Seconds stop() waits for cancelled tasks to clean up
+SHUTDOWN_GRACE_SECONDS = 5
+
 class RabbitMQManager:
     """
     Manager for RabbitMQ using the async-native aio-pika library.
     It handles connections, message consumption, and DLQ/retry logic gracefully.
     """
     
-    def __init__(self, config: WorkerConfig, message_handler: Callable):
+    def __init__(self, config: WorkerConfig, message_handler: Callable,
+                 cost_estimator: Optional[Callable[[Dict[str, Any]], Awaitable[Optional[float]]]] = None,
+                 task_types: Optional[List[TaskType]] = None):
         self.config = config
         self.message_handler = message_handler
+        # Task types this worker processes; each gets its own queue. Empty = everything on the shared queue.
+        # (by name: the worker scripts import the models without the src. package prefix)
+        self.task_types = [TaskType[task_type.name] for task_type in task_types or []]
+        # Predicts a message's run time (seconds) so admission can run the shortest jobs first
+        self.cost_estimator = cost_estimator
         self.connection = None
         self.consuming_task = None
         self.running_tasks = set()  # Track running message processing tasks
-        logger.info(f"aio-pika RabbitMQ manager initialized for queue: {config.ai_task_queue}")
+        # jobId -> tasks processing it (the job, or render sub-tasks of it), for cancel requests
+        self.active_jobs: Dict[str, Set[asyncio.Task]] = {}
+        self.cancelled_jobs: "OrderedDict[str, None]" = OrderedDict()
+        # Delivered messages wait (unacked) here until the node has capacity for them
+        self.admission = AdmissionController(config)
+        # Replies to request() calls, by correlation id
+        self.pending_replies: Dict[str, asyncio.Future] = {}
+        self.reply_queue_name: Optional[str] = None
+        self.reply_queue_ready = asyncio.Event()
+        # Long-lived channel with publisher confirms, shared by every publish of this worker
+        self.publish_channel: Optional[aio_pika.abc.AbstractChannel] = None
+        self.publish_channel_lock = asyncio.Lock()
+        logger.info(f"aio-pika RabbitMQ manager initialized for queues: {', '.join(self.queue_names)}")
+
+    def _task_routes(self) -> List[str]:
+        """Dedicated routing keys (= queue names) this worker consumes"""
+        routes = []
+        for task_type in self.task_types:
+            if task_type == TaskType.CREATE_PRODUCT and self.config.job_type_routing:
+                routes += [self.config.task_route(task_type, job_type) for job_type in self.config.handled_job_types]
+            else:
+                routes.append(self.config.task_route(task_type))
+        return routes
+
+    @property
+    def queue_names(self) -> List[str]:
+        names = self._task_routes()
+        if self.config.consume_shared_queue or not names:
+            names.append(self.config.ai_task_queue)
+        return names
 
     async def start(self):
         """Connects to RabbitMQ and starts the message consuming task."""
@@ -43,25 +90,241 @@ class RabbitMQManager:
             dlq_exchange = await channel.declare_exchange(self.config.dlq_exchange, aio_pika.ExchangeType.DIRECT, durable=True)
             dlq_queue = await channel.declare_queue(self.config.dlq_queue, durable=True)
             await dlq_queue.bind(dlq_exchange, self.config.dlq_routing_key)
+            await self._declare_retry_tiers(channel)
+            await self._start_cancel_consumer()
+
+            bindings = [(route, route) for route in self._task_routes()]
+            if self.config.consume_shared_queue or not bindings:
+                bindings.append((self.config.ai_task_queue, self.config.routing_key))
+            if len(bindings) > 1:
+                # One prefetch budget for the worker, shared by all of its queues
+                await channel.set_qos(prefetch_count=self.config.prefetch_count or 1, global_=True)
+
+            for queue_name, routing_key in bindings:
+                queue = await channel.declare_queue(
+                    name=queue_name,
+                    durable=True,
+                    arguments={
+                        'x-dead-letter-exchange': self.config.dlq_exchange,
+                        'x-dead-letter-routing-key': self.config.dlq_routing_key
+                    }
+                )
+                await queue.bind(self.config.main_exchange, routing_key)
+                await queue.consume(self._on_task)
+
+            if self.config.scatter_render_enabled:
+                await self._start_render_consumer()
 
-            queue = await channel.declare_queue(
-                name=self.config.ai_task_queue,
+            logger.info("Consumer is waiting for messages.")
+            # Consumers run on the channel; stay here until stop() cancels this task
+            await asyncio.Future()
+
+    async def _declare_retry_tiers(self, channel: aio_pika.abc.AbstractChannel):
+        """
+        Declare one delay queue per retry delay. A retry waits there until its TTL
+        expires, then is dead-lettered back to the main exchange with its original
+        routing key, i.e. into the queue it came from.
+        """
+        for delay in self.config.retry_delay_tiers:
+            name = self.config.retry_tier_name(delay)
+            # Fanout, so the home routing key given at publish time is kept for dead-lettering
+            tier_exchange = await channel.declare_exchange(name, aio_pika.ExchangeType.FANOUT, durable=True)
+            tier_queue = await channel.declare_queue(
+                name=name,
                 durable=True,
                 arguments={
-                    'x-dead-letter-exchange': self.config.dlq_exchange,
-                    'x-dead-letter-routing-key': self.config.dlq_routing_key
+                    'x-message-ttl': delay * 1000,
+                    'x-dead-letter-exchange': self.config.main_exchange
                 }
             )
-            await queue.bind(self.config.main_exchange, self.config.routing_key)
+            await tier_queue.bind(tier_exchange)
+        if self.config.retry_delay_tiers:
+            logger.info(f"Retry delay tiers: {', '.join(f'{delay}s' for delay in self.config.retry_delay_tiers)}")
 
-            logger.info("Consumer is waiting for messages.")
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    # Create task and track it
-                    task = asyncio.create_task(self._process_message_safely(message))
-                    self.running_tasks.add(task)
-                    # Remove task when done
-                    task.add_done_callback(lambda t: self.running_tasks.discard(t))
+    async def _on_task(self, message: aio_pika.IncomingMessage):
+        self._spawn(message)
+
+    async def _start_cancel_consumer(self):
+        """Receive cancel requests on an exclusive queue bound to the cancel fanout exchange"""
+        cancel_channel = await self.connection.channel()
+        cancel_exchange = await cancel_channel.declare_exchange(
+            self.config.cancel_exchange, aio_pika.ExchangeType.FANOUT, durable=True
+        )
+        cancel_queue = await cancel_channel.declare_queue(exclusive=True, auto_delete=True)
+        await cancel_queue.bind(cancel_exchange)
+        await cancel_queue.consume(self._on_cancel, no_ack=True)
+
+    async def _on_cancel(self, message: aio_pika.IncomingMessage):
+        try:
+            job_id = json.loads(message.body.decode()).get('jobId')
+        except (ValueError, AttributeError):
+            job_id = None
+        if not job_id:
+            logger.warning(f"Ignoring malformed cancel request: {message.body[:200]!r}")
+            return
+        self.cancel_job(str(job_id))
+
+    def cancel_job(self, job_id: str) -> int:
+        """
+        Cancel the tasks processing a job on this worker. The job is also dropped
+        if it is delivered (or retried) later. Returns the number of tasks cancelled.
+        """
+        self.cancelled_jobs[job_id] = None
+        self.cancelled_jobs.move_to_end(job_id)
+        while len(self.cancelled_jobs) > CANCELLED_JOBS_MEMORY:
+            self.cancelled_jobs.popitem(last=False)
+
+        tasks = [task for task in self.active_jobs.get(job_id, ()) if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.info(f"🛑 Cancelling job {job_id} ({len(tasks)} running tasks)")
+        return len(tasks)
+
+    async def publish_cancel(self, job_id: str):
+        """Ask every worker to cancel a job"""
+        await self._publish(
+            aio_pika.Message(body=json.dumps({'jobId': job_id}).encode(), content_type="application/json"),
+            routing_key="",
+            exchange_name=self.config.cancel_exchange
+        )
+
+    def _spawn(self, message: aio_pika.IncomingMessage):
+        # Create task and track it
+        task = asyncio.create_task(self._process_message_safely(message))
+        self.running_tasks.add(task)
+        # Remove task when done
+        task.add_done_callback(lambda t: self.running_tasks.discard(t))
+
+    async def _start_render_consumer(self):
+        """
+        Consume slide render sub-tasks on their own channel (so they do not take
+        prefetch slots from whole jobs) and open this worker's reply queue.
+        """
+        render_channel = await self.connection.channel()
+        await render_channel.set_qos(prefetch_count=self.config.render_prefetch_count or 1)
+        render_queue = await render_channel.declare_queue(name=self.config.render_task_queue, durable=True)
+        await render_queue.bind(self.config.main_exchange, self.config.render_routing_key)
+        await render_queue.consume(self._on_render_task)
+
+        reply_channel = await self.connection.channel()
+        reply_queue = await reply_channel.declare_queue(exclusive=True, auto_delete=True)
+        await reply_queue.consume(self._on_reply, no_ack=True)
+        self.reply_queue_name = reply_queue.name
+        self.reply_queue_ready.set()
+        logger.info(f"Render sub-task consumer started on {self.config.render_task_queue}")
+
+    async def _on_render_task(self, message: aio_pika.IncomingMessage):
+        self._spawn(message)
+
+    def _route_for(self, data: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        """
+        Dedicated routing key of a message and whether this worker processes it.
+
+        Messages that do not parse are left to the handler (which rejects them).
+        Render sub-tasks only reach workers consuming the render queue, which
+        process them whatever their own task types.
+        """
+        try:
+            task_message = parse_task_message(data)
+        except (ValueError, KeyError, TypeError):
+            return None, True
+        if task_message.taskType == TaskType.RENDER_SLIDE:
+            return self.config.render_routing_key, True
+        job_type: Optional[JobType] = getattr(task_message, 'jobType', None)
+        route = self.config.task_route(task_message.taskType, job_type)
+        if not self.task_types:
+            return route, True
+        return route, route in self._task_routes()
+
+    async def _publisher(self) -> aio_pika.abc.AbstractChannel:
+        """The shared publish channel, (re)opened on first use or after it was closed"""
+        async with self.publish_channel_lock:
+            if self.publish_channel is None or self.publish_channel.is_closed:
+                self.publish_channel = await self.connection.channel(
+                    publisher_confirms=True, on_return_raises=True
+                )
+            return self.publish_channel
+
+    async def _publish(self, message: aio_pika.Message, routing_key: str,
+                       exchange_name: Optional[str] = None, mandatory: bool = False):
+        """
+        Publish on the shared channel and wait for the broker's confirm.
+
+        `exchange_name` defaults to the main exchange; "" is the default exchange.
+        With `mandatory`, an unroutable message raises instead of being dropped.
+        """
+        channel = await self._publisher()
+        if exchange_name == "":
+            exchange = channel.default_exchange
+        else:
+            exchange = await channel.get_exchange(exchange_name or self.config.main_exchange, ensure=False)
+        await exchange.publish(message, routing_key=routing_key, mandatory=mandatory)
+
+    async def _forward(self, message: aio_pika.IncomingMessage, routing_key: str, job_id: str):
+        """Hand a message from the shared queue to the queue of the worker type that processes it"""
+        try:
+            async with message.process(requeue=False, ignore_processed=True):
+                await self._publish(
+                    aio_pika.Message(
+                        body=message.body,
+                        headers=message.headers,
+                        delivery_mode=message.delivery_mode
+                    ),
+                    routing_key=routing_key,
+                    mandatory=True
+                )
+            logger.info(f"↪️ Forwarded job {job_id} to {routing_key}")
+        except Exception as e:
+            # Unroutable (no worker of that type has declared its queue yet): dead-letter instead of dropping
+            logger.error(f"Could not forward job {job_id} to {routing_key}: {e}. Message sent to DLQ.")
+
+    async def _on_reply(self, message: aio_pika.IncomingMessage):
+        future = self.pending_replies.get(message.correlation_id)
+        if future is not None and not future.done():
+            future.set_result(json.loads(message.body.decode()))
+
+    async def request(self, routing_key: str, body: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """
+        Publish a sub-task and wait for the reply of the worker that processed it.
+
+        The message expires after `timeout` so an unclaimed sub-task is not rendered
+        after the requester has given up on it. Raises asyncio.TimeoutError.
+        """
+        if not self.config.scatter_render_enabled:
+            raise RuntimeError("Sub-task requests need SCATTER_RENDER_ENABLED")
+        await asyncio.wait_for(self.reply_queue_ready.wait(), timeout=timeout)
+
+        correlation_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self.pending_replies[correlation_id] = future
+        try:
+            await self._publish(
+                aio_pika.Message(
+                    body=json.dumps(body, ensure_ascii=False).encode(),
+                    content_type="application/json",
+                    correlation_id=correlation_id,
+                    reply_to=self.reply_queue_name,
+                    expiration=timeout,
+                    timestamp=datetime.now(timezone.utc)
+                ),
+                routing_key=routing_key
+            )
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self.pending_replies.pop(correlation_id, None)
+
+    async def _reply(self, message: aio_pika.IncomingMessage, body: Dict[str, Any]):
+        """Answer a request() sent by another worker"""
+        await self._publish(
+            aio_pika.Message(
+                body=json.dumps(body).encode(),
+                content_type="application/json",
+                correlation_id=message.correlation_id
+            ),
+            routing_key=message.reply_to,
+            exchange_name=""
+        )
     
     async def _process_message_safely(self, message: aio_pika.IncomingMessage):
         """
@@ -70,9 +333,74 @@ class RabbitMQManager:
         """
         job_id = "unknown"
         try:
-            async with message.process(requeue=False, ignore_processed=True):
+            try:
                 data = json.loads(message.body.decode())
                 job_id = data.get('jobId', 'unknown')
+                weight = task_weight(data)
+            except (ValueError, AttributeError):
+                data, weight = None, 1
+
+            if job_id in self.cancelled_jobs:
+                logger.info(f"🛑 Dropping message of cancelled job {job_id}")
+                await message.ack()
+                return
+
+            # A request() is answered by whoever received it, never passed on
+            if data is not None and not message.reply_to:
+                route, handled = self._route_for(data)
+                if not handled:
+                    await self._forward(message, route, job_id)
+                    return
+
+            self.active_jobs.setdefault(job_id, set()).add(asyncio.current_task())
+            if message.reply_to:
+                # A sub-task renders part of a job that holds slots already (here or on a peer),
+                # waiting for slots of its own would block behind that job until the requester gives up
+                await self._process_admitted(message, data)
+                return
+            cost = await self._estimate_cost(data) if data is not None else 0.0
+            async with self.admission.slot(weight, label=f"job {job_id}", cost=cost):
+                await self._process_admitted(message, data)
+
+        except asyncio.CancelledError:
+            if job_id in self.cancelled_jobs:
+                # Cancelled while waiting for admission: nothing ran, just settle the message
+                logger.info(f"🛑 Job {job_id} cancelled before it started")
+                if not message.processed:
+                    await message.ack()
+                return
+            logger.info(f"Task for job {job_id} was cancelled during shutdown")
+            return
+
+        finally:
+            tasks = self.active_jobs.get(job_id)
+            if tasks is not None:
+                tasks.discard(asyncio.current_task())
+                if not tasks:
+                    del self.active_jobs[job_id]
+
+    async def _estimate_cost(self, data: Dict[str, Any]) -> float:
+        """Predicted run time of a message, 0 when unknown (sub-tasks, no estimator, estimation failed)"""
+        if self.cost_estimator is None or data.get('taskType') is None:
+            return 0.0
+        try:
+            return float(await self.cost_estimator(data) or 0.0)
+        except Exception as e:
+            logger.warning(f"Cost estimation failed for job {data.get('jobId', 'unknown')}: {e}")
+            return 0.0
+
+    async def _process_admitted(self, message: aio_pika.IncomingMessage, data: Optional[Dict[str, Any]]):
+        """Process a message that passed admission control (ack/nack, retry, reply)"""
+        job_id = "unknown"
+        try:
+            async with message.process(requeue=False, ignore_processed=True):
+                if data is None:
+                    data = json.loads(message.body.decode())
+                job_id = data.get('jobId', 'unknown')
+
+                if self._is_abandoned(message):
+                    logger.info(f"Skipping sub-task for job {job_id}: the requester stopped waiting for it")
+                    return
                 
                 retry_count = message.headers.get('x-retry-count', 0)
                 if retry_count >= self.config.max_retries:
@@ -80,33 +408,92 @@ class RabbitMQManager:
                     raise RuntimeError("Max retries exceeded")
 
                 logger.info(f"🔄 Processing message {job_id} (retry: {retry_count})")
-                success = await self.message_handler(data)
-                
-                if not success:
-                    logger.warning(f"⚠️ Handler failed for job {job_id}. Retrying...")
-                    await self._retry_message(message, retry_count + 1)
+                try:
+                    result = await self.message_handler(data)
+                except asyncio.CancelledError:
+                    if job_id not in self.cancelled_jobs:
+                        raise
+                    result = None
+                success = bool(result)
+
+                if job_id in self.cancelled_jobs:
+                    # The handlers clean up after themselves on cancellation; the job is not retried
+                    logger.info(f"🛑 Job {job_id} was cancelled")
+                elif message.reply_to:
+                    # Sub-task: the requester falls back on failure, so reply instead of retrying
+                    reply = result if isinstance(result, dict) else {"success": success}
+                    await self._reply(message, dict(reply, workerId=self.config.worker_id))
+                elif not success:
+                    if retry_count + 1 >= self.config.max_retries:
+                        logger.error(f"Handler failed for job {job_id} on its last attempt. Sending to DLQ.")
+                        raise RuntimeError("Max retries exceeded")
+                    await self._retry_message(message, retry_count + 1, job_id)
                 else:
                     logger.info(f"✅ Message {job_id} processed successfully.")
         
-        except asyncio.CancelledError:
-            logger.info(f"Task for job {job_id} was cancelled during shutdown")
-            return
-            
         except Exception as e:
             logger.error(f"🔥 Unhandled exception for job {job_id}: {e}. Message will be rejected.", exc_info=True)
 
-    async def _retry_message(self, original_message: aio_pika.IncomingMessage, next_retry_count: int):
-        """Publishes a new message to the main exchange to retry."""
-        async with self.connection.channel() as channel:
-            exchange = await channel.get_exchange(self.config.main_exchange)
-            await exchange.publish(
+    @staticmethod
+    def _is_abandoned(message: aio_pika.IncomingMessage) -> bool:
+        """A request() whose requester has timed out while the message waited for admission"""
+        if not (message.reply_to and message.expiration and message.timestamp):
+            return False
+        sent_at = message.timestamp
+        if sent_at.tzinfo is None:
+            sent_at = sent_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - sent_at).total_seconds() > message.expiration
+
+    def _home_route(self, body: bytes) -> str:
+        """Routing key to republish a message to: its task type's queue, or the shared queue"""
+        if self.task_types:
+            try:
+                route, _ = self._route_for(json.loads(body.decode()))
+                if route:
+                    return route
+            except (ValueError, AttributeError):
+                pass
+        return self.config.routing_key
+
+    async def _retry_message(self, original_message: aio_pika.IncomingMessage, next_retry_count: int,
+                             job_id: str = "unknown"):
+        """
+        Republish a failed message through the delay queue of its retry tier.
+
+        The delay grows exponentially per retry; a random part of it (RETRY_JITTER)
+        is taken off so that jobs failed by the same outage do not come back together.
+        The original is acked only once the broker has confirmed the retry.
+        """
+        tier = self.config.retry_delay_for(next_retry_count)
+        routing_key = self._home_route(original_message.body)
+        if tier <= 0:
+            logger.warning(f"⚠️ Handler failed for job {job_id}. Retrying now...")
+            await self._publish(
                 aio_pika.Message(
                     body=original_message.body,
                     headers={'x-retry-count': next_retry_count},
                     delivery_mode=original_message.delivery_mode
                 ),
-                routing_key=self.config.routing_key
+                routing_key=routing_key
             )
+            return
+
+        # Never above the tier's queue TTL, and within a narrow band so expiry order stays close to FIFO
+        delay = tier * (1 - random.uniform(0, min(max(self.config.retry_jitter, 0.0), 1.0)))
+        logger.warning(
+            f"⚠️ Handler failed for job {job_id}. Retry {next_retry_count}/{self.config.max_retries} in {delay:.1f}s..."
+        )
+        await self._publish(
+            aio_pika.Message(
+                body=original_message.body,
+                headers={'x-retry-count': next_retry_count},
+                delivery_mode=original_message.delivery_mode,
+                expiration=max(delay, 0.001)
+            ),
+            routing_key=routing_key,
+            exchange_name=self.config.retry_tier_name(tier),
+            mandatory=True
+        )
 
     async def stop(self):
         """Stops the RabbitMQ consumer gracefully."""
@@ -126,11 +513,8 @@ class RabbitMQManager:
             for task in list(self.running_tasks):
                 task.cancel()
             
-            # Simple wait with timeout
-            try:
-                await asyncio.wait_for(asyncio.sleep(3), timeout=5.0)
-            except asyncio.TimeoutError:
-                pass
+            # Wait for the handlers' cleanup (partial blobs, FFmpeg processes), not longer than the grace period
+            await asyncio.wait(list(self.running_tasks), timeout=SHUTDOWN_GRACE_SECONDS)
             logger.info("Running tasks cancelled.")
         
         # Close connection
@@ -154,7 +538,7 @@ class RabbitMQManager:
                         logger.info(f"Reprocessing message from DLQ with body: {message.body.decode()}")
                         await main_exchange.publish(
                             aio_pika.Message(body=message.body, headers={}),
-                            routing_key=self.config.routing_key
+                            routing_key=self._home_route(message.body)
                         )
                         reprocessed_count += 1
                 except asyncio.TimeoutError:
@@ -3,16 +3,20 @@ Base task handler for AI processing tasks
 """
 import os
 import json
+import asyncio
 import tempfile
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
 from src.models.task_messages import TaskMessage
-from src.services.azure_blob_service import AzureBlobService
+from src.services.storage_backend import create_storage_backend
 from src.services.backend_api_client import BackendApiClient
 from src.config.worker_config import WorkerConfig
 from src.utils.logger import logger
 from src.config.job_status import JobStatus
 
+# Source files of one job downloaded at the same time (each large file is also fetched in parallel ranges)
+SOURCE_DOWNLOAD_CONCURRENCY = int(os.getenv("SOURCE_DOWNLOAD_CONCURRENCY", "4"))
+
 
 class BaseTaskHandler(ABC):
 
@@ -20,7 +24,7 @@ class BaseTaskHandler(ABC):
         """Initialize base task handler with shared clients."""
         self.config = config
         self.backend_client = backend_client
-        self.azure_service = AzureBlobService(config.azure_storage_connection_string)
+        self.storage = create_storage_backend(config)
     
     @abstractmethod
     async def process(self, message: TaskMessage) -> bool:
@@ -50,11 +54,15 @@ class BaseTaskHandler(ABC):
                 ) as temp_file:
                     local_path = temp_file.name
             
-            local_path = await self.azure_service.download_file(
-                container_name, 
-                blob_name, 
-                local_path
-            )
+            try:
+                local_path = await self.storage.download_file(
+                    container_name, 
+                    blob_name, 
+                    local_path
+                )
+            except BaseException:
+                self.cleanup_temp_files(local_path)
+                raise
             
             logger.info(f"Downloaded source file: {blob_name} -> {local_path}")
             return local_path
@@ -64,17 +72,25 @@ class BaseTaskHandler(ABC):
             raise
     
     async def download_multiple_source_files(self, blob_names: List[str]) -> List[str]:
+        slots = asyncio.Semaphore(max(1, SOURCE_DOWNLOAD_CONCURRENCY))
+
+        async def download(blob_name: str) -> str:
+            async with slots:
+                return await self.download_source_file(blob_name)
+
+        downloads = [asyncio.create_task(download(blob_name)) for blob_name in blob_names]
         try:
-            local_paths = []
-            
-            for blob_name in blob_names:
-                local_path = await self.download_source_file(blob_name)
-                local_paths.append(local_path)
+            # Paths keep the order of blob_names
+            local_paths = await asyncio.gather(*downloads)
             
             logger.info(f"Downloaded {len(local_paths)} source files")
             return local_paths
             
-        except Exception as e:
+        except BaseException as e:
+            for task in downloads:
+                task.cancel()
+            results = await asyncio.gather(*downloads, return_exceptions=True)
+            self.cleanup_temp_files(*(path for path in results if isinstance(path, str)))
             logger.error(f"Failed to download multiple source files: {e}")
             raise
 
@@ -95,7 +111,7 @@ class BaseTaskHandler(ABC):
             }
             content_type = content_type_map.get(file_extension, 'application/octet-stream')
             
-            blob_url = await self.azure_service.upload_file(
+            blob_url = await self.storage.upload_file(
                 container_name,
                 blob_name,
                 local_path,
@@ -124,7 +140,7 @@ class BaseTaskHandler(ABC):
             }
             content_type = content_type_map.get(file_extension, 'application/octet-stream')
             
-            blob_url = await self.azure_service.upload_file(
+            blob_url = await self.storage.upload_file(
                 container_name,
                 blob_name,
                 local_path,
@@ -146,7 +162,7 @@ class BaseTaskHandler(ABC):
             json_content = json.dumps(content, ensure_ascii=False, indent=2)
             content_bytes = json_content.encode('utf-8')
             
-            blob_url = await self.azure_service.upload_content(
+            blob_url = await self.storage.upload_content(
                 container_name,
                 blob_name,
                 content_bytes,
@@ -166,7 +182,7 @@ class BaseTaskHandler(ABC):
             container_name = self.config.azure_input_container
             
             # Download to temp file
-            local_path = await self.azure_service.download_file(
+            local_path = await self.storage.download_file(
                 container_name,
                 blob_name
             )
@@ -186,7 +202,7 @@ class BaseTaskHandler(ABC):
 
     async def delete_blob(self, container_name: str, blob_name: str) -> bool:
         try:
-            return await self.azure_service.delete_blob(container_name, blob_name)
+            return await self.storage.delete_blob(container_name, blob_name)
         except Exception as e:
             logger.error(f"Failed to delete blob {blob_name}: {e}")
             return False
@@ -3,23 +3,68 @@ Product creation handler for generating final products (video/audio) from conten
 """
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
 import asyncio
+import time
 import uuid
 
 from src.handlers.base_handler import BaseTaskHandler
-from src.models.task_messages import CreateProductMessage, JobType
+from src.models.task_messages import CreateProductMessage, JobType, TaskType, parse_task_message
 from src.services.video_generator import VideoGenerator
+from src.services.segment_cache import get_segment_cache
+from src.services.slide_scatter import SlideScatter
+from src.services.cost_estimator import get_cost_estimator, lesson_features, message_features
+from src.services.job_checkpoint import (
+    JobCheckpoint, job_fingerprint, cleanup_expired_checkpoints, JOB_CHECKPOINT_ENABLED
+)
 from src.config.job_status import JobStatus
 from src.utils.logger import logger
 from src.utils.temp_cleanup import force_cleanup_workspace
 from src.services.tts_service import TTSService
 from src.services.tts_service import TTSService
-from moviepy.editor import concatenate_audioclips, AudioFileClip, VideoFileClip
+from moviepy.editor import concatenate_audioclips, AudioFileClip
 from src.utils.helper import normalize_language
+from src.utils.media_info import get_media_duration
+
+# Upload video blocks while FFmpeg is still muxing instead of after the render
+STREAM_PRODUCT_UPLOAD = os.getenv("STREAM_PRODUCT_UPLOAD", "false").lower() == "true"
+
 
 class ProductCreationHandler(BaseTaskHandler):
     """Handler for create_product tasks"""
+
+    task_publisher = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cost_estimator = get_cost_estimator()
+
+    async def estimate_cost(self, message_body: Dict[str, Any]) -> Optional[float]:
+        """
+        Predicted processing time (seconds) of a product job, used to admit short jobs first.
+
+        Uses the lesson statistics in the message, so nothing is downloaded before
+        admission; a message without them is costed as a typical lesson of its job type.
+        """
+        message = parse_task_message(message_body)
+        if message.taskType != TaskType.CREATE_PRODUCT:
+            return None
+
+        features = message_features(message_body) or self.cost_estimator.typical_features(message.jobType)
+        cost = self.cost_estimator.predict(message.jobType, features)
+        logger.info(f"Predicted {message.jobType.name} job {message.jobId}: ~{cost:.0f}s")
+        return cost
+
+    def set_task_publisher(self, task_publisher):
+        """RabbitMQ manager used to scatter slide renders to other product workers"""
+        self.task_publisher = task_publisher
+
+    def _slide_scatter(self) -> Optional[SlideScatter]:
+        if not (self.config.scatter_render_enabled and self.task_publisher):
+            return None
+        return SlideScatter(
+            self.task_publisher, self.storage, self.config.azure_input_container, self.config.render_routing_key
+        )
     
     async def process(self, message: CreateProductMessage) -> bool:
         """
@@ -34,6 +79,8 @@ class ProductCreationHandler(BaseTaskHandler):
         job_id = message.jobId
         local_product_file = None
         product_blob_name = None
+        checkpoint = None
+        stream_upload = None
         
         try:
             workspace_dir = os.path.join(self.config.temp_dir, f"product_job_{job_id}_{uuid.uuid4().hex[:8]}")
@@ -43,28 +90,68 @@ class ProductCreationHandler(BaseTaskHandler):
             # Step 1: Download content from Azure
             logger.info(f"Downloading content file: {message.contentBlobName}")
             lesson_content = await self.download_json_content(message.contentBlobName)
+
+            # A retry or redelivery of this job resumes from the stages and slides of the previous attempt
+            checkpoint = await self._open_checkpoint(message, lesson_content)
             
             # Step 2: Generate product based on job type
-            logger.info(f"Generating {message.jobType} product")
             lesson_info = lesson_content.get("lesson_info", {})
 
             language = normalize_language(lesson_info.get("language", "vietnamese"))
 
-            local_product_file = await self._generate_product(
-                message, lesson_content, workspace_dir, language=language
-            )
+            product_stage = checkpoint.get_stage("product") if checkpoint else None
+            if product_stage:
+                local_product_file = await checkpoint.fetch_stage_artifact("product")
+            if local_product_file:
+                logger.info(f"Reusing {message.jobType} product from checkpoint: {local_product_file}")
+                duration_seconds = product_stage.get("duration")
+            else:
+                logger.info(f"Generating {message.jobType} product")
+                if (STREAM_PRODUCT_UPLOAD and message.jobType == JobType.VIDEO_LESSON
+                        and not self._is_checkpointed_upload(checkpoint)):
+                    stream_upload = await self.storage.open_block_upload(
+                        self.config.azure_output_container, self._product_blob_name(message), "video/mp4"
+                    )
+                generation_start = time.monotonic()
+                local_product_file, reused_slides = await self._generate_product(
+                    message, lesson_content, workspace_dir, language=language, checkpoint=checkpoint,
+                    output_sink=stream_upload.write if stream_upload else None
+                )
+                if reused_slides:
+                    logger.info(f"Not calibrating the cost model on job {job_id}: {reused_slides} slides came from cache")
+                elif not (checkpoint and checkpoint.resumed):
+                    # Calibrate predictions on full renders only, a resumed job skips most of the work
+                    await asyncio.to_thread(
+                        self.cost_estimator.record, message.jobType, lesson_features(lesson_content),
+                        time.monotonic() - generation_start
+                    )
 
-            duration_seconds = None
-            if message.jobType == JobType.VIDEO_LESSON:
-                duration_seconds = self.get_video_duration(local_product_file)
-            elif message.jobType == JobType.AUDIO_LESSON:
-                duration_seconds = self.get_audio_duration(local_product_file)
+                duration_seconds = None
+                if message.jobType == JobType.VIDEO_LESSON:
+                    duration_seconds = await asyncio.to_thread(self.get_video_duration, local_product_file)
+                elif message.jobType == JobType.AUDIO_LESSON:
+                    duration_seconds = await asyncio.to_thread(self.get_audio_duration, local_product_file)
+
+                if checkpoint:
+                    await checkpoint.complete_stage("product", artifact_path=local_product_file, duration=duration_seconds)
             logger.info(f"Product duration: {duration_seconds} seconds")
 
             # Step 3: Upload product to Azure
-            if local_product_file:
-                product_blob_name = f"ai-product/product_{job_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{self._get_file_extension(message.jobType)}"
+            upload_stage = checkpoint.get_stage("upload") if checkpoint else None
+            if upload_stage:
+                product_blob_name = upload_stage["blob_name"]
+                logger.info(f"Product already uploaded by a previous attempt: {product_blob_name}")
+            elif stream_upload:
+                # Blocks were staged during muxing; the blob appears only once FFmpeg has exited cleanly
+                await stream_upload.commit()
+                product_blob_name = stream_upload.blob_name
+                if checkpoint:
+                    await checkpoint.complete_stage("upload", blob_name=product_blob_name)
+            elif local_product_file:
+                product_blob_name = self._product_blob_name(message)
                 await self.upload_product_file(local_product_file, product_blob_name)
+                if checkpoint:
+                    await checkpoint.complete_stage("upload", blob_name=product_blob_name)
             
             video_output_blob_name = product_blob_name if message.jobType == JobType.VIDEO_LESSON else None
             audio_output_blob_name = product_blob_name if message.jobType == JobType.AUDIO_LESSON else None
@@ -83,13 +170,16 @@ class ProductCreationHandler(BaseTaskHandler):
                 **success_data
             )
             
+            if checkpoint:
+                await checkpoint.discard()
+
             logger.info(f"Successfully completed product creation for job {job_id}")
             return True
         
         except asyncio.CancelledError:
             logger.info(f"Product creation task cancelled for job {job_id}")
-            # Clean up any partial blob upload
-            if product_blob_name:
+            # Clean up any partial blob upload; a checkpointed upload is kept for the redelivered job
+            if product_blob_name and not self._is_checkpointed_upload(checkpoint):
                 try:
                     await self.delete_blob(self.config.azure_output_container, product_blob_name)
                     logger.info(f"Cleaned up partial blob: {product_blob_name}")
@@ -101,8 +191,8 @@ class ProductCreationHandler(BaseTaskHandler):
             error_message = f"Product creation failed for job {job_id}: {str(e)}"
             logger.error(error_message)
             
-            # Delete blob file on Azure if it was uploaded
-            if product_blob_name:
+            # Delete blob file on Azure if it was uploaded, unless the checkpoint hands it to the retry
+            if product_blob_name and not self._is_checkpointed_upload(checkpoint):
                 await self.delete_blob(self.config.azure_output_container, product_blob_name)
 
             # Notify backend of failure
@@ -110,29 +200,70 @@ class ProductCreationHandler(BaseTaskHandler):
             return False
             
         finally:
+            if stream_upload:
+                # No-op after a commit; otherwise only uncommitted blocks are left behind
+                await stream_upload.abort()
             if 'workspace_dir' in locals():
                 force_cleanup_workspace(workspace_dir)
+
+    async def _open_checkpoint(self, message: CreateProductMessage,
+                               lesson_content: Dict[str, Any]) -> Optional[JobCheckpoint]:
+        """
+        Load (or start) the checkpoint of this job, sweeping expired checkpoints of other jobs.
+
+        The fingerprint covers the lesson itself, so a content blob rewritten
+        under the same name between attempts starts over.
+        """
+        if not JOB_CHECKPOINT_ENABLED:
+            return None
+
+        container = self.config.azure_checkpoint_container
+        await cleanup_expired_checkpoints(self.storage, container)
+
+        fingerprint = job_fingerprint(message.contentBlobName, message.jobType.name, message.voiceConfig, lesson_content)
+        checkpoint = JobCheckpoint(message.jobId, fingerprint, blob_service=self.storage, blob_container=container)
+        try:
+            await checkpoint.load()
+        except OSError as e:
+            logger.warning(f"Checkpointing disabled for job {message.jobId}: {e}")
+            return None
+        return checkpoint
+
+    def _product_blob_name(self, message: CreateProductMessage) -> str:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"ai-product/product_{message.jobId}_{timestamp}.{self._get_file_extension(message.jobType)}"
+
+    @staticmethod
+    def _is_checkpointed_upload(checkpoint: Optional[JobCheckpoint]) -> bool:
+        return bool(checkpoint and checkpoint.get_stage("upload"))
     
     async def _generate_product(
         self, 
         message: CreateProductMessage, 
         lesson_content: Dict[str, Any],
         workspace_dir: str,
-        language: str = "vietnamese"
-    ) -> str:
+        language: str = "vietnamese",
+        checkpoint: Optional[JobCheckpoint] = None,
+        output_sink: Optional[Callable[[bytes], Awaitable[None]]] = None
+    ) -> Tuple[str, int]:
         """
         Generate the final product based on job type
         
         Args:
             message: Product creation message
             lesson_content: Lesson content data
+            output_sink: Receives the video bytes as they are muxed (video only)
             
         Returns:
-            str: Path to the generated product file
+            Tuple[str, int]: Path to the generated product file and the number of
+            slides (narration chunks for audio) reused from a checkpoint or cache
         """
         try:
             if message.jobType == JobType.VIDEO_LESSON:
-                return await self._generate_video(message, lesson_content, workspace_dir, language=language)
+                return await self._generate_video(
+                    message, lesson_content, workspace_dir, language=language, checkpoint=checkpoint,
+                    output_sink=output_sink
+                )
             elif message.jobType == JobType.AUDIO_LESSON:
                 return await self._generate_audio(message, lesson_content, workspace_dir)
             else:
@@ -147,17 +278,20 @@ class ProductCreationHandler(BaseTaskHandler):
         message: CreateProductMessage, 
         lesson_content: Dict[str, Any],
         workspace_dir: str,
-        language: str = "vietnamese"
-    ) -> str:
+        language: str = "vietnamese",
+        checkpoint: Optional[JobCheckpoint] = None,
+        output_sink: Optional[Callable[[bytes], Awaitable[None]]] = None
+    ) -> Tuple[str, int]:
         """
         Generate video from lesson content
         
         Args:
             message: Product creation message
             lesson_content: Lesson content data
+            output_sink: Receives the video bytes as they are muxed
             
         Returns:
-            str: Path to the generated video file
+            Tuple[str, int]: Path to the generated video file and the number of slides reused
         """
         try:
             voice_config = message.voiceConfig or {
@@ -173,7 +307,12 @@ class ProductCreationHandler(BaseTaskHandler):
             # Initialize video generator
             logger.info(f"Voice config for video generation: {voice_config}")
         
-            video_generator = VideoGenerator(voice_config=voice_config, language=language)
+            # Slide segments are shared between jobs through the local cache and, if configured, blob storage
+            segment_cache = get_segment_cache(self.storage, self.config.azure_segment_cache_container)
+            video_generator = VideoGenerator(
+                voice_config=voice_config, language=language,
+                segment_cache=segment_cache, scatter=self._slide_scatter()
+            )
 
             # Generate output path
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -190,11 +329,14 @@ class ProductCreationHandler(BaseTaskHandler):
             final_video_path = await video_generator.generate_lesson_video(
                 lesson_content, 
                 output_path,
-                temp_dir=unique_dir
+                temp_dir=unique_dir,
+                job_id=message.jobId,
+                checkpoint=checkpoint,
+                output_sink=output_sink
             )
             
             logger.info(f"Video generated successfully: {final_video_path}")
-            return final_video_path
+            return final_video_path, video_generator.reused_slides
             
         except Exception as e:
             logger.error(f"Failed to generate video: {e}")
@@ -205,9 +347,11 @@ class ProductCreationHandler(BaseTaskHandler):
         message: CreateProductMessage,
         lesson_content: Dict[str, Any],
         workspace_dir: str
-    ) -> str:
+    ) -> Tuple[str, int]:
         """
         Generate audio from lesson content (simplified version)
+
+        Returns the audio path and the number of narration chunks taken from the TTS cache.
         """
         try:
             # Voice config
@@ -274,7 +418,7 @@ class ProductCreationHandler(BaseTaskHandler):
             final_audio = concatenate_audioclips(audio_clips)
             final_audio.write_audiofile(output_path)
             
-            return output_path
+            return output_path, tts_service.get_performance_stats()['cache_hits']
 
         except Exception as e:
             logger.error(f"Failed to generate audio: {e}")
@@ -297,14 +441,7 @@ class ProductCreationHandler(BaseTaskHandler):
         return extension_map.get(job_type, "mp4")
     
     def get_video_duration(self, filepath: str) -> float:
-        clip = VideoFileClip(filepath)
-        duration = clip.duration
-        clip.reader.close()
-        clip.audio.reader.close_proc() if clip.audio else None
-        return duration
+        return get_media_duration(filepath)
 
     def get_audio_duration(self, filepath: str) -> float:
-        clip = AudioFileClip(filepath)
-        duration = clip.duration
-        clip.close()
-        return duration
+        return get_media_duration(filepath)
@@ -0,0 +1,66 @@
+"""
+Slide render handler for the render sub-tasks of scattered video jobs
+"""
+import os
+import uuid
+from typing import Dict, Any, Union
+
+from src.handlers.base_handler import BaseTaskHandler
+from src.models.task_messages import RenderSlideMessage
+from src.services.video_generator import VideoGenerator
+from src.services.segment_cache import get_segment_cache
+from src.utils.logger import logger
+from src.utils.temp_cleanup import force_cleanup_workspace
+
+
+class SlideRenderHandler(BaseTaskHandler):
+    """Handler for render_slide tasks: render one slide segment for a coordinating worker"""
+
+    async def process(self, message: RenderSlideMessage) -> Union[Dict[str, Any], bool]:
+        """
+        Render the slide and upload its segment to message.segmentBlobName
+
+        Returns:
+            Reply for the coordinator, or False if the slide could not be rendered
+        """
+        slide_number = message.slideIndex + 1
+        workspace_dir = os.path.join(
+            self.config.temp_dir, f"render_job_{message.jobId}_{slide_number}_{uuid.uuid4().hex[:8]}"
+        )
+
+        try:
+            os.makedirs(workspace_dir, exist_ok=True)
+            profile = message.renderProfile
+            segment_cache = get_segment_cache(self.storage, self.config.azure_segment_cache_container)
+            video_generator = VideoGenerator(
+                voice_config=message.voiceConfig,
+                language=message.language,
+                render_mode=profile.get("render_mode"),
+                encoding_mode=profile.get("encoding_mode"),
+                segment_cache=segment_cache
+            )
+
+            # Segments from differently configured workers would not concatenate cleanly
+            if video_generator.segment_profile != profile:
+                logger.warning(f"Render profile mismatch for job {message.jobId}, slide {slide_number}: {profile}")
+                return False
+
+            slide_result = await video_generator.render_slide_segment(
+                message.slide, message.slideIndex, message.templateName, workspace_dir
+            )
+            await self.storage.upload_file(
+                self.config.azure_input_container,
+                message.segmentBlobName,
+                slide_result['video_path'],
+                content_type="video/mp4"
+            )
+
+            logger.info(f"Rendered slide {slide_number} of job {message.jobId}")
+            return {"success": True, "cacheable": bool(slide_result.get('cacheable'))}
+
+        except Exception as e:
+            logger.error(f"Slide render failed for job {message.jobId}, slide {slide_number}: {e}")
+            return False
+
+        finally:
+            force_cleanup_workspace(workspace_dir)
@@ -9,6 +9,7 @@ class TaskType(Enum):
     """Types of tasks that can be processed"""
     GENERATE_CONTENT = 0
     CREATE_PRODUCT = 1
+    RENDER_SLIDE = 2  # Sub-task of a scattered CREATE_PRODUCT video render
 
 
 class JobType(Enum):
@@ -66,6 +67,26 @@ class CreateProductMessage(TaskMessage):
             raise ValueError("contentBlobName is required for CreateProductMessage")
 
 
+@dataclass
+class RenderSlideMessage(TaskMessage):
+    """Message for a render_slide sub-task: render one slide segment and upload it"""
+    slide: Dict[str, Any]
+    slideIndex: int
+    segmentBlobName: str
+    renderProfile: Dict[str, Any]
+    templateName: Optional[str] = None
+    voiceConfig: Optional[Dict[str, Any]] = None
+    language: str = "vietnamese"
+
+    def __post_init__(self):
+        super().__post_init__()
+        if self.taskType != TaskType.RENDER_SLIDE:
+            raise ValueError("taskType must be 'render_slide' for RenderSlideMessage")
+
+        if not self.segmentBlobName:
+            raise ValueError("segmentBlobName is required for RenderSlideMessage")
+
+
 def parse_task_message(message_body: Dict[str, Any]) -> TaskMessage:
     """
     Parse raw message body into appropriate TaskMessage object
@@ -146,5 +167,18 @@ def parse_task_message(message_body: Dict[str, Any]) -> TaskMessage:
             voiceConfig=message_body.get("voiceConfig")
         )
     
+    elif task_type == TaskType.RENDER_SLIDE:
+        return RenderSlideMessage(
+            taskType=task_type,
+            jobId=message_body["jobId"],
+            slide=message_body["slide"],
+            slideIndex=int(message_body["slideIndex"]),
+            segmentBlobName=message_body["segmentBlobName"],
+            renderProfile=message_body["renderProfile"],
+            templateName=message_body.get("templateName"),
+            voiceConfig=message_body.get("voiceConfig"),
+            language=message_body.get("language", "vietnamese")
+        )
+    
     else:
         raise ValueError(f"Unknown taskType: {task_type}")
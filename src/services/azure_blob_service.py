@@ -2,108 +2,382 @@
 Azure Blob Storage service for file upload/download operations
 """
 import os
+import uuid
+import base64
 import asyncio
+import hashlib
 import tempfile
-from typing import Optional
-from azure.storage.blob import BlobServiceClient
+from typing import Optional, List, Dict, Any, Set, Tuple
+import aiohttp
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError, ResourceExistsError, ServiceRequestError, ServiceResponseError, IncompleteReadError
+)
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import BlobBlock, ContentSettings
+from azure.storage.blob.aio import BlobClient, BlobServiceClient, StorageStreamDownloader
+from src.services.blob_cache import BlobCache, get_blob_cache
 from src.utils.logger import logger
 
+# Parallel block transfers per upload/download
+AZURE_BLOB_MAX_CONCURRENCY = int(os.getenv("AZURE_BLOB_MAX_CONCURRENCY", "4"))
+# Block size for chunked uploads and ranged downloads
+AZURE_BLOB_BLOCK_SIZE_MB = int(os.getenv("AZURE_BLOB_BLOCK_SIZE_MB", "4"))
+# Connections kept by the process-wide HTTP pool shared by every client
+AZURE_HTTP_POOL_SIZE = int(os.getenv("AZURE_HTTP_POOL_SIZE", "32"))
+# Attempts per download range; a range that fails mid-body resumes from its last received byte
+AZURE_DOWNLOAD_RETRIES = int(os.getenv("AZURE_DOWNLOAD_RETRIES", "3"))
+
+# Network failures worth retrying a download range for (the blob itself did not change)
+_TRANSIENT_DOWNLOAD_ERRORS = (
+    ServiceRequestError, ServiceResponseError, IncompleteReadError,
+    aiohttp.ClientError, ConnectionError, asyncio.TimeoutError
+)
+
+_transport: Optional[AioHttpTransport] = None
+_transport_loop: Optional[asyncio.AbstractEventLoop] = None
+_session: Optional[aiohttp.ClientSession] = None
+
+# Containers known to exist, so uploads skip the exists() round-trip
+_ensured_containers: Set[str] = set()
+
+
+def get_blob_transport() -> AioHttpTransport:
+    """
+    Process-wide HTTP transport for the blob clients, over one pooled aiohttp session.
+
+    Bound to the running event loop; a new loop gets a new pool.
+    """
+    global _transport, _transport_loop, _session
+    loop = asyncio.get_running_loop()
+    if _transport is None or _transport_loop is not loop or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=AZURE_HTTP_POOL_SIZE, ttl_dns_cache=300)
+        )
+        _transport = AioHttpTransport(session=_session, session_owner=False)
+        _transport_loop = loop
+        _ensured_containers.clear()
+    return _transport
+
+
+async def close_blob_transport():
+    """Close the shared HTTP pool (worker shutdown)"""
+    global _transport, _transport_loop, _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _transport = _transport_loop = _session = None
+
+
+def _file_md5(path: str) -> bytes:
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class BlockBlobStreamUpload:
+    """
+    Block blob written while its content is still being produced.
+
+    write() cuts the stream into blocks and stages up to `max_concurrency` of
+    them in parallel, each sent with its MD5 for the service to verify. Nothing
+    is visible until commit(); an aborted upload leaves only uncommitted blocks,
+    which Azure discards after a week.
+    """
+
+    def __init__(self, blob_client: BlobClient, content_type: Optional[str], block_size: int, max_concurrency: int):
+        self.blob_client = blob_client
+        self.content_type = content_type
+        self.block_size = block_size
+        self.block_ids: List[str] = []
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._staging: Set[asyncio.Task] = set()
+        self._failure: Optional[BaseException] = None
+        # Block ids must be unique per blob and of equal length
+        self._id_prefix = uuid.uuid4().hex[:8]
+
+    @property
+    def url(self) -> str:
+        return self.blob_client.url
+
+    @property
+    def blob_name(self) -> str:
+        return self.blob_client.blob_name
+
+    async def write(self, data: bytes):
+        """Append data, staging every full block (waits while max_concurrency blocks are in flight)"""
+        self._raise_failure()
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            await self._stage(block)
+
+    async def _stage(self, block: bytes):
+        await self._slots.acquire()
+        self._raise_failure()
+        block_id = base64.b64encode(f"{self._id_prefix}-{len(self.block_ids):08d}".encode()).decode()
+        self.block_ids.append(block_id)
+        task = asyncio.create_task(self._stage_block(block_id, block))
+        self._staging.add(task)
+        task.add_done_callback(self._staging.discard)
+
+    async def _stage_block(self, block_id: str, block: bytes):
+        try:
+            await self.blob_client.stage_block(block_id, block, validate_content=True)
+        except Exception as e:
+            self._failure = self._failure or e
+        finally:
+            self._slots.release()
+
+    def _raise_failure(self):
+        if self._failure is not None:
+            raise RuntimeError(f"Staging a block of {self.blob_client.blob_name} failed: {self._failure}")
+
+    async def commit(self) -> str:
+        """Stage the last block, wait for all of them and commit the block list"""
+        if self._buffer:
+            await self._stage(bytes(self._buffer))
+            self._buffer.clear()
+        if self._staging:
+            await asyncio.gather(*self._staging)
+        self._raise_failure()
+
+        await self.blob_client.commit_block_list(
+            [BlobBlock(block_id) for block_id in self.block_ids],
+            content_settings=ContentSettings(content_type=self.content_type) if self.content_type else None
+        )
+        logger.info(
+            f"Committed {len(self.block_ids)} streamed blocks ({self.bytes_written / (1024 * 1024):.1f} MB) "
+            f"to {self.blob_client.url}"
+        )
+        return self.blob_client.url
+
+    async def abort(self):
+        """Stop staging; the blob is left without committed content"""
+        for task in list(self._staging):
+            task.cancel()
+        if self._staging:
+            await asyncio.gather(*self._staging, return_exceptions=True)
+        self._buffer.clear()
+
 
 class AzureBlobService:
     """Service for handling Azure Blob Storage operations"""
-    
-    def __init__(self, connection_string: str):
-        """Initialize Azure Blob Service"""
+
+    def __init__(self, connection_string: str, max_concurrency: int = AZURE_BLOB_MAX_CONCURRENCY,
+                 cache: Optional[BlobCache] = None):
+        """Initialize Azure Blob Service (from a coroutine: the client uses the loop's shared HTTP pool)"""
         self.connection_string = connection_string
-        self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        
-    async def upload_file(self, container_name: str, blob_name: str, file_path: str, 
+        self.max_concurrency = max(1, max_concurrency)
+        self.cache = cache if cache is not None else get_blob_cache()
+        block_size = AZURE_BLOB_BLOCK_SIZE_MB * 1024 * 1024
+        self.block_size = block_size
+        self.blob_service_client = BlobServiceClient.from_connection_string(
+            connection_string,
+            transport=get_blob_transport(),
+            max_block_size=block_size,
+            max_single_put_size=block_size * 2,
+            max_chunk_get_size=block_size,
+            max_single_get_size=block_size * 2
+        )
+        self._container_lock = asyncio.Lock()
+
+    async def upload_file(self, container_name: str, blob_name: str, file_path: str,
                          content_type: Optional[str] = None) -> str:
         try:
             # Ensure container exists
             await self._ensure_container_exists(container_name)
-            
+
             # Get blob client
             blob_client = self.blob_service_client.get_blob_client(
-                container=container_name, 
+                container=container_name,
                 blob=blob_name
             )
-            
-            # Upload file
+
+            # Upload file, in parallel blocks when it is large
             with open(file_path, 'rb') as data:
-                await asyncio.to_thread(
-                    blob_client.upload_blob,
+                await blob_client.upload_blob(
                     data,
                     overwrite=True,
-                    content_type=content_type
+                    content_settings=ContentSettings(content_type=content_type) if content_type else None,
+                    max_concurrency=self.max_concurrency
                 )
-            
+
             blob_url = blob_client.url
             logger.info(f"Successfully uploaded file to Azure Blob: {blob_url}")
             return blob_url
-            
+
         except Exception as e:
             logger.error(f"Failed to upload file to Azure Blob: {e}")
             raise
-    
+
     async def download_file(
-            self, container_name: str, 
+            self, container_name: str,
             blob_name: str,
             local_path: Optional[str] = None) -> str:
         try:
             # Create local path if not provided
             if local_path is None:
                 local_path = os.path.join(tempfile.gettempdir(), blob_name)
-            
+
             # Ensure local directory exists
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            
+
             # Get blob client
             blob_client = self.blob_service_client.get_blob_client(
                 container=container_name,
                 blob=blob_name
             )
-            
-            # Download file
+
+            cache = self.cache if self.cache is not None and self.cache.enabled_for(container_name) else None
+            cached_etag = cache.cached_etag(container_name, blob_name) if cache else None
+            try:
+                # Revalidate the cached copy in the same request that would start the download
+                first_stream = await self._download_first_range(blob_client, cached_etag)
+            except HttpResponseError as e:
+                if e.status_code != 304:
+                    raise
+                cache_key = cache.make_key(container_name, blob_name, cached_etag)
+                if await asyncio.to_thread(cache.get, cache_key, local_path):
+                    logger.info(f"Blob cache hit: {container_name}/{blob_name} -> {local_path}")
+                    return local_path
+                # Still current, but the cached copy was evicted in the meantime
+                cache.record_miss()
+                first_stream = await self._download_first_range(blob_client)
+            else:
+                if cache:
+                    cache.record_miss(stale=cached_etag is not None)
+            properties = first_stream.properties
+            size = int(properties.content_range.rsplit('/', 1)[-1])
+
+            # Preallocate, then fill block-sized ranges in parallel; every range is pinned to this ETag
             with open(local_path, 'wb') as download_file:
-                download_stream = await asyncio.to_thread(blob_client.download_blob)
-                await asyncio.to_thread(download_stream.readinto, download_file)
-            
-            logger.info(f"Successfully downloaded file from Azure Blob: {local_path}")
+                download_file.truncate(size)
+            ranges = [(offset, min(self.block_size, size - offset)) for offset in range(0, size, self.block_size)]
+            slots = asyncio.Semaphore(self.max_concurrency)
+
+            async def fetch(byte_range: Tuple[int, int]):
+                async with slots:
+                    stream = first_stream if byte_range[0] == 0 else None
+                    await self._download_range(blob_client, properties.etag, local_path, *byte_range, stream=stream)
+
+            fetches = [asyncio.ensure_future(fetch(byte_range)) for byte_range in ranges]
+            try:
+                await asyncio.gather(*fetches)
+                expected_md5 = properties.content_settings.content_md5
+                if expected_md5:
+                    actual_md5 = await asyncio.to_thread(_file_md5, local_path)
+                    if actual_md5 != bytes(expected_md5):
+                        raise ValueError(f"MD5 mismatch for {container_name}/{blob_name}")
+            except BaseException:
+                # One failed range fails the download; stop the others before the partial file goes away
+                for task in fetches:
+                    task.cancel()
+                await asyncio.gather(*fetches, return_exceptions=True)
+                os.remove(local_path)
+                raise
+
+            if cache and properties.etag:
+                await asyncio.to_thread(cache.store, container_name, blob_name, properties.etag, local_path)
+
+            logger.info(
+                f"Successfully downloaded file from Azure Blob: {local_path} "
+                f"({len(ranges)} ranges{', MD5 verified' if expected_md5 else ''})"
+            )
             return local_path
-            
+
         except Exception as e:
             logger.error(f"Failed to download file from Azure Blob: {e}")
             raise
-    
+
+    async def _download_first_range(self, blob_client: BlobClient,
+                                    if_none_match: Optional[str] = None) -> StorageStreamDownloader:
+        """
+        First block of a blob; its response also carries the total size, ETag and MD5.
+
+        With if_none_match, raises HttpResponseError with status 304 while the blob still has that ETag.
+        """
+        conditions = {"etag": if_none_match, "match_condition": MatchConditions.IfModified} if if_none_match else {}
+        try:
+            return await blob_client.download_blob(offset=0, length=self.block_size, **conditions)
+        except HttpResponseError as e:
+            if e.status_code != 416:
+                raise
+            # Empty blob, no range is satisfiable
+            return await blob_client.download_blob(**conditions)
+
+    async def _download_range(self, blob_client: BlobClient, etag: str, local_path: str, offset: int, length: int,
+                              stream: Optional[StorageStreamDownloader] = None):
+        """Write one byte range into the preallocated file, resuming where a failed attempt stopped"""
+        received = 0
+        attempt = 1
+        with open(local_path, 'r+b') as download_file:
+            download_file.seek(offset)
+            while received < length:
+                try:
+                    if stream is None:
+                        stream = await blob_client.download_blob(
+                            offset=offset + received, length=length - received,
+                            etag=etag, match_condition=MatchConditions.IfNotModified
+                        )
+                    async for chunk in stream.chunks():
+                        download_file.write(chunk)
+                        received += len(chunk)
+                except _TRANSIENT_DOWNLOAD_ERRORS as e:
+                    if attempt >= AZURE_DOWNLOAD_RETRIES:
+                        raise
+                    logger.warning(
+                        f"Range {offset}+{length} of {blob_client.blob_name} failed after {received} bytes "
+                        f"(attempt {attempt}/{AZURE_DOWNLOAD_RETRIES}), resuming: {e}"
+                    )
+                    attempt += 1
+                    download_file.seek(offset + received)
+                    await asyncio.sleep(attempt - 1)
+                finally:
+                    stream = None
+
     async def upload_content(self, container_name: str, blob_name: str, content: bytes,
                             content_type: Optional[str] = None) -> str:
         try:
             # Ensure container exists
             await self._ensure_container_exists(container_name)
-            
+
             # Get blob client
             blob_client = self.blob_service_client.get_blob_client(
                 container=container_name,
                 blob=blob_name
             )
-            
+
             # Upload content
-            await asyncio.to_thread(
-                blob_client.upload_blob,
+            await blob_client.upload_blob(
                 content,
                 overwrite=True,
-                content_type=content_type
+                content_settings=ContentSettings(content_type=content_type) if content_type else None,
+                max_concurrency=self.max_concurrency
             )
-            
+
             blob_url = blob_client.url
             logger.info(f"Successfully uploaded content to Azure Blob: {blob_url}")
             return blob_url
-            
+
         except Exception as e:
             logger.error(f"Failed to upload content to Azure Blob: {e}")
             raise
-    
+
+    async def open_block_upload(self, container_name: str, blob_name: str,
+                                content_type: Optional[str] = None) -> BlockBlobStreamUpload:
+        """Start a streamed upload of a blob whose size is not known up front"""
+        await self._ensure_container_exists(container_name)
+        blob_client = self.blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+        return BlockBlobStreamUpload(
+            blob_client, content_type, AZURE_BLOB_BLOCK_SIZE_MB * 1024 * 1024, self.max_concurrency
+        )
+
     async def blob_exists(self, container_name: str, blob_name: str) -> bool:
         """Check if a blob exists"""
         try:
@@ -111,10 +385,10 @@ class AzureBlobService:
                 container=container_name,
                 blob=blob_name
             )
-            return await asyncio.to_thread(blob_client.exists)
+            return await blob_client.exists()
         except Exception:
             return False
-    
+
     async def delete_blob(self, container_name: str, blob_name: str) -> bool:
         """Delete a blob"""
         try:
@@ -122,24 +396,41 @@ class AzureBlobService:
                 container=container_name,
                 blob=blob_name
             )
-            await asyncio.to_thread(blob_client.delete_blob)
+            await blob_client.delete_blob()
             logger.info(f"Successfully deleted blob: {container_name}/{blob_name}")
             return True
         except Exception as e:
             logger.error(f"Failed to delete blob: {e}")
             return False
-    
+
+    async def list_blobs(self, container_name: str, prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List blob names and last-modified times under a prefix"""
+        container_client = self.blob_service_client.get_container_client(container_name)
+        return [
+            {"name": blob.name, "last_modified": blob.last_modified}
+            async for blob in container_client.list_blobs(name_starts_with=prefix)
+        ]
+
     async def _ensure_container_exists(self, container_name: str):
-        """Ensure that a container exists, create if it doesn't"""
-        try:
-            container_client = self.blob_service_client.get_container_client(container_name)
-            if not await asyncio.to_thread(container_client.exists):
-                await asyncio.to_thread(container_client.create_container)
-                logger.info(f"Created container: {container_name}")
-        except Exception as e:
-            logger.error(f"Failed to ensure container exists: {e}")
-            raise
-    
+        """Ensure that a container exists, create if it doesn't (checked once per process)"""
+        if container_name in _ensured_containers:
+            return
+        async with self._container_lock:
+            if container_name in _ensured_containers:
+                return
+            try:
+                container_client = self.blob_service_client.get_container_client(container_name)
+                if not await container_client.exists():
+                    try:
+                        await container_client.create_container()
+                        logger.info(f"Created container: {container_name}")
+                    except ResourceExistsError:
+                        pass  # Created by another worker in the meantime
+                _ensured_containers.add(container_name)
+            except Exception as e:
+                logger.error(f"Failed to ensure container exists: {e}")
+                raise
+
     def get_blob_url(self, container_name: str, blob_name: str) -> str:
         """Get the URL of a blob"""
         blob_client = self.blob_service_client.get_blob_client(
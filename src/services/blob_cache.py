@@ -0,0 +1,114 @@
+"""
+Read-through on-disk cache of downloaded blobs, keyed by blob name and ETag
+"""
+import os
+import base64
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+from src.services.disk_cache import DiskLRUCache
+from src.utils.logger import logger
+
+BLOB_CACHE_ENABLED = os.getenv("BLOB_CACHE_ENABLED", "true").lower() == "true"
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "eduva_blob_cache"))
+BLOB_CACHE_MAX_MB = int(os.getenv("BLOB_CACHE_MAX_MB", "1024"))
+# Comma-separated containers whose downloads are cached (sources and lesson content by default)
+BLOB_CACHE_CONTAINERS = os.getenv("BLOB_CACHE_CONTAINERS", os.getenv("AZURE_INPUT_CONTAINER", "eduva-temp-storage"))
+
+
+class BlobCache(DiskLRUCache):
+    """
+    Local copies of blobs, each stored under a hash of its name plus its ETag.
+
+    The ETag is part of the file name, so after a restart the cache still knows
+    which version of a blob it holds and can revalidate it with If-None-Match.
+    A blob that changed gets a new entry and the old one is dropped.
+    """
+
+    suffix = ".blob"
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 1024, containers: str = ""):
+        self.containers = {name.strip() for name in containers.split(",") if name.strip()}
+        self._versions: Dict[str, str] = {}
+        super().__init__(cache_dir, max_size_mb)
+        self.stale = 0
+
+    @staticmethod
+    def _name_hash(container_name: str, blob_name: str) -> str:
+        return hashlib.sha256(f"{container_name}/{blob_name}".encode("utf-8")).hexdigest()[:40]
+
+    @classmethod
+    def make_key(cls, container_name: str, blob_name: str, etag: str) -> str:
+        """Key of one version of a blob: name hash, then the ETag in file-name-safe base64"""
+        etag_token = base64.urlsafe_b64encode(etag.encode("utf-8")).decode("ascii").rstrip("=")
+        return f"{cls._name_hash(container_name, blob_name)}-{etag_token}"
+
+    def _load_index(self):
+        super()._load_index()
+        for key in self._entries:
+            self._versions[key.split("-", 1)[0]] = key
+
+    def enabled_for(self, container_name: str) -> bool:
+        return container_name in self.containers
+
+    def cached_etag(self, container_name: str, blob_name: str) -> Optional[str]:
+        """ETag of the cached version of a blob, None if it is not cached"""
+        with self._lock:
+            key = self._versions.get(self._name_hash(container_name, blob_name))
+            if key is None or key not in self._entries:
+                return None
+        etag_token = key.split("-", 1)[1]
+        return base64.urlsafe_b64decode(etag_token + "=" * (-len(etag_token) % 4)).decode("utf-8")
+
+    def get(self, key: str, output_path: str) -> bool:
+        """Copy a revalidated version to output_path. A failed copy is not counted, the caller records the miss."""
+        if not self._copy_entry(key, output_path):
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def record_miss(self, stale: bool = False):
+        """Count a lookup answered by the service (stale: the cached version had changed)"""
+        with self._lock:
+            self.misses += 1
+            if stale:
+                self.stale += 1
+
+    def store(self, container_name: str, blob_name: str, etag: str, source_path: str):
+        """Cache a downloaded blob, replacing any older version of it"""
+        key = self.make_key(container_name, blob_name, etag)
+        name_hash = key.split("-", 1)[0]
+        with self._lock:
+            previous = self._versions.get(name_hash)
+        self.put_file(key, source_path)
+        if self.contains(key):
+            with self._lock:
+                self._versions[name_hash] = key
+        if previous and previous != key:
+            self.discard(previous)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['stale'] = self.stale
+        return stats
+
+
+_cache: Optional[BlobCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_blob_cache() -> Optional[BlobCache]:
+    """Process-wide blob cache, or None when caching is disabled or the directory is unusable"""
+    global _cache
+    if not BLOB_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = BlobCache(BLOB_CACHE_DIR, BLOB_CACHE_MAX_MB, BLOB_CACHE_CONTAINERS)
+            except OSError as e:
+                logger.warning(f"Blob cache disabled, cannot use {BLOB_CACHE_DIR}: {e}")
+                return None
+        return _cache
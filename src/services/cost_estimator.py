@@ -0,0 +1,132 @@
+"""
+Render time prediction for product jobs, calibrated from completed jobs
+"""
+import os
+import json
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional
+import numpy as np
+from src.models.task_messages import JobType
+from src.utils.logger import logger
+
+COST_MODEL_PATH = os.getenv("COST_MODEL_PATH", os.path.join(tempfile.gettempdir(), "eduva_cost_model.json"))
+# Samples kept per job type; the model is refit from them after every recorded job
+COST_MODEL_MAX_SAMPLES = int(os.getenv("COST_MODEL_MAX_SAMPLES", "200"))
+COST_MODEL_MIN_SAMPLES = 8
+
+# Seconds = intercept + per slide + per 1000 narration characters + per image keyword
+FEATURE_NAMES = ("intercept", "slides", "tts_kchars", "image_keywords")
+DEFAULT_COEFFICIENTS = {
+    JobType.VIDEO_LESSON.name: [10.0, 6.0, 20.0, 0.5],
+    JobType.AUDIO_LESSON.name: [3.0, 0.0, 10.0, 0.0],
+}
+# Features of a lesson whose message carries no statistics, until jobs of its type have been recorded
+TYPICAL_LESSON_FEATURES = [1.0, 12.0, 4.0, 12.0]
+
+
+def lesson_features(lesson_content: Dict[str, Any]) -> List[float]:
+    """Feature vector of a lesson, in FEATURE_NAMES order"""
+    slides = lesson_content.get("slides", [])
+    tts_chars = sum(len(slide.get("tts_script", "") or "") for slide in slides)
+    image_keywords = sum(len(slide.get("image_keywords", []) or []) for slide in slides)
+    return [1.0, float(len(slides)), tts_chars / 1000.0, float(image_keywords)]
+
+
+def message_features(message_body: Dict[str, Any]) -> Optional[List[float]]:
+    """
+    Feature vector from the lesson statistics a producer put in a create_product
+    message (slideCount, narrationChars, imageKeywordCount), None without slideCount.
+    """
+    def number(field: str) -> float:
+        value = float(message_body.get(field) or 0)
+        return value if value >= 0 else 0.0
+
+    try:
+        if message_body.get("slideCount") is None:
+            return None
+        return [1.0, number("slideCount"), number("narrationChars") / 1000.0, number("imageKeywordCount")]
+    except (TypeError, ValueError):
+        return None
+
+
+class JobCostEstimator:
+    """Linear model of job duration per job type, refit by least squares as samples come in"""
+
+    def __init__(self, model_path: str = COST_MODEL_PATH, max_samples: int = COST_MODEL_MAX_SAMPLES):
+        self.model_path = model_path
+        self.max_samples = max_samples
+        self.samples: Dict[str, List[List[float]]] = {}
+        self.coefficients: Dict[str, List[float]] = dict(DEFAULT_COEFFICIENTS)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.model_path, "r", encoding="utf-8") as model_file:
+                self.samples = json.load(model_file).get("samples", {})
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cost model {self.model_path}: {e}")
+            return
+        for job_type in self.samples:
+            self._fit(job_type)
+
+    def _save_locked(self):
+        temp_path = f"{self.model_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as model_file:
+                json.dump({"features": FEATURE_NAMES, "samples": self.samples}, model_file)
+            os.replace(temp_path, self.model_path)
+        except OSError as e:
+            logger.warning(f"Could not save cost model: {e}")
+
+    def _fit(self, job_type: str):
+        samples = self.samples.get(job_type, [])
+        if len(samples) < COST_MODEL_MIN_SAMPLES:
+            return
+        data = np.array(samples, dtype=np.float64)
+        features, seconds = data[:, :-1], data[:, -1]
+        coefficients, *_ = np.linalg.lstsq(features, seconds, rcond=None)
+        self.coefficients[job_type] = coefficients.tolist()
+
+    def predict(self, job_type: JobType, features: List[float]) -> float:
+        """Predicted processing time in seconds"""
+        coefficients = self.coefficients.get(job_type.name) or DEFAULT_COEFFICIENTS[JobType.VIDEO_LESSON.name]
+        return max(1.0, float(np.dot(coefficients, features)))
+
+    def typical_features(self, job_type: JobType) -> List[float]:
+        """Mean features of the recorded jobs of a type, for messages without lesson statistics"""
+        with self._lock:
+            samples = self.samples.get(job_type.name)
+            if not samples:
+                return list(TYPICAL_LESSON_FEATURES)
+            return np.mean(np.array(samples, dtype=np.float64)[:, :-1], axis=0).tolist()
+
+    def record(self, job_type: JobType, features: List[float], seconds: float):
+        """Add the measured duration of a completed job and refit its model"""
+        with self._lock:
+            samples = self.samples.setdefault(job_type.name, [])
+            samples.append(list(features) + [float(seconds)])
+            del samples[:-self.max_samples]
+            self._fit(job_type.name)
+            self._save_locked()
+
+        logger.debug(
+            f"Cost model for {job_type.name}: "
+            + ", ".join(f"{name}={value:.2f}" for name, value in zip(FEATURE_NAMES, self.coefficients[job_type.name]))
+        )
+
+
+_estimator: Optional[JobCostEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_cost_estimator() -> JobCostEstimator:
+    """Process-wide cost estimator"""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = JobCostEstimator()
+        return _estimator
@@ -0,0 +1,165 @@
+"""
+Size-capped on-disk LRU cache for content-addressed files
+"""
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+from src.utils.logger import logger
+
+
+class DiskLRUCache:
+    """
+    Directory of files stored under content-addressed keys.
+
+    Entries are evicted least-recently-used once the cache exceeds max_size_mb.
+    Recency is kept in memory and mirrored to file mtimes, so the order survives
+    a worker restart. Writes go to a temp file first and are renamed into place,
+    so readers never see a partial entry.
+    """
+
+    suffix = ".entry"
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 512):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size_bytes = max(1, max_size_mb) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def _load_index(self):
+        """Rebuild the LRU index from the files already on disk, oldest first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                # Leftover from an interrupted write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(self.suffix)], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size_bytes += size
+
+        if entries:
+            logger.info(f"{type(self).__name__} loaded: {len(entries)} entries, {self._size_bytes / 1024 / 1024:.1f} MB")
+
+    def get(self, key: str, output_path: str) -> bool:
+        """Copy a cached entry to output_path. Returns False on a miss."""
+        hit = self._copy_entry(key, output_path)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit
+
+    def _copy_entry(self, key: str, output_path: str) -> bool:
+        """Copy an entry and mark it recently used, without counting the lookup"""
+        path = self._entry_path(key)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+
+        try:
+            shutil.copyfile(path, output_path)
+            os.utime(path, None)
+        except OSError as e:
+            # Entry removed behind our back (another worker evicted it)
+            logger.warning(f"Cache entry {key} unreadable, dropping it: {e}")
+            with self._lock:
+                self._size_bytes -= self._entries.pop(key, 0)
+            return False
+        return True
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def discard(self, key: str):
+        """Remove an entry if present"""
+        with self._lock:
+            if key not in self._entries:
+                return
+            self._size_bytes -= self._entries.pop(key)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def put(self, key: str, content: bytes):
+        """Store bytes atomically, then evict down to the size cap"""
+        self._store(key, lambda temp_file: temp_file.write(content))
+
+    def put_file(self, key: str, source_path: str):
+        """Store a copy of a file atomically, then evict down to the size cap"""
+        def copy(temp_file):
+            with open(source_path, "rb") as source:
+                shutil.copyfileobj(source, temp_file, 1024 * 1024)
+        self._store(key, copy)
+
+    def _store(self, key: str, write):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                write(temp_file)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, self._entry_path(key))
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {key}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._size_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._size_bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self._size_bytes > self.max_size_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_mb': self._size_bytes / 1024 / 1024,
+                'max_size_mb': self.max_size_bytes / 1024 / 1024,
+            }
@@ -0,0 +1,242 @@
+"""
+Single-pass FFmpeg renderer for lesson videos
+"""
+import os
+import asyncio
+import subprocess
+from typing import List, Dict, Any, Optional
+from src.utils.cancellation import CancellationToken
+from src.utils.logger import logger
+
+# Encoding modes: "cfr" emits fps frames per second, "static" emits one long-duration frame per image change
+ENCODING_MODES = ("cfr", "static")
+
+
+class FFmpegRenderer:
+    """Renders a whole lesson (every slide image + narration) in one FFmpeg invocation"""
+
+    def __init__(self, resolution: tuple = (1280, 720), fps: int = 10,
+                 preset: str = 'medium', crf: int = 23, audio_sample_rate: int = 44100,
+                 encoding_mode: str = "cfr"):
+        if encoding_mode not in ENCODING_MODES:
+            raise ValueError(f"Unsupported encoding mode: {encoding_mode}. Available: {ENCODING_MODES}")
+
+        self.resolution = resolution
+        self.fps = fps
+        self.encoding_mode = encoding_mode
+        self.preset = preset
+        self.crf = crf
+        self.audio_sample_rate = audio_sample_rate
+
+    def build_plan(self, slide_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build a render plan from timed slide results.
+
+        Each slide result must carry the images and durations computed by
+        SlideProcessor.calculate_slide_timing plus the slide's 'audio_path'.
+        All times are placed on one lesson timeline in milliseconds so that
+        per-slide rounding never accumulates into audio/video drift.
+        """
+        video_inputs = []
+        audio_inputs = []
+        cursor_ms = 0
+        # Exact lesson time; slide boundaries are rounded from it, not from per-slide durations
+        timeline_s = 0.0
+
+        for slide_result in slide_results:
+            images = [img for img in slide_result.get('images', []) if os.path.exists(img['path'])]
+            slide_duration = slide_result.get('total_duration') or sum(img['duration'] for img in images)
+            if not images or slide_duration <= 0:
+                logger.warning(f"Skipping slide without images or duration in render plan: {slide_result.get('slide_id')}")
+                continue
+
+            slide_start_ms = cursor_ms
+            timeline_s += slide_duration
+            slide_end_ms = int(round(timeline_s * 1000))
+
+            # Image durations may be off from the audio by up to 0.5s after timing, scale them to fit exactly
+            images_total = sum(img['duration'] for img in images) or 1.0
+            scale = slide_duration / images_total
+
+            elapsed = 0.0
+            image_start_ms = slide_start_ms
+            for i, img in enumerate(images):
+                elapsed += img['duration'] * scale
+                image_end_ms = slide_end_ms if i == len(images) - 1 else slide_start_ms + int(round(elapsed * 1000))
+                if image_end_ms <= image_start_ms:
+                    continue
+                video_input = {
+                    'path': os.path.abspath(img['path']),
+                    'start_ms': image_start_ms,
+                    'duration_ms': image_end_ms - image_start_ms,
+                }
+                if img.get('pix_fmt'):
+                    # Raw frame buffer rendered in memory
+                    video_input['pix_fmt'] = img['pix_fmt']
+                    video_input['size'] = img['size']
+                video_inputs.append(video_input)
+                image_start_ms = image_end_ms
+
+            audio_inputs.append({
+                'path': os.path.abspath(slide_result['audio_path']),
+                'duration_ms': slide_end_ms - slide_start_ms,
+            })
+            cursor_ms = slide_end_ms
+
+        if not video_inputs:
+            raise ValueError("Render plan has no images")
+
+        return {
+            'video_inputs': video_inputs,
+            'audio_inputs': audio_inputs,
+            'total_duration': cursor_ms / 1000,
+        }
+
+    def build_command(self, plan: Dict[str, Any], output_path: str) -> List[str]:
+        """Build the FFmpeg command line for a render plan"""
+        width, height = self.resolution
+        video_inputs = plan['video_inputs']
+        audio_inputs = plan['audio_inputs']
+
+        cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error']
+        filters = []
+
+        for i, item in enumerate(video_inputs):
+            duration = item['duration_ms'] / 1000
+            # The last image gets a second frame at the end of the timeline so its duration is kept
+            input_duration = duration * 2 if i == len(video_inputs) - 1 else duration
+            if item.get('pix_fmt'):
+                # Raw frames carry no header, FFmpeg needs the format and size up front
+                cmd += [
+                    '-stream_loop', '-1',
+                    '-f', 'rawvideo',
+                    '-pix_fmt', item['pix_fmt'],
+                    '-video_size', f"{item['size'][0]}x{item['size'][1]}",
+                ]
+            else:
+                cmd += ['-loop', '1']
+            cmd += [
+                '-framerate', f"1000/{item['duration_ms']}",
+                '-t', f"{input_duration:.3f}",
+                '-i', item['path'],
+            ]
+            filters.append(
+                f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1,format=yuv420p,"
+                f"settb=1/1000,setpts=PTS-STARTPTS+{item['start_ms'] / 1000:.3f}/TB[v{i}]"
+            )
+
+        for j, item in enumerate(audio_inputs):
+            input_index = len(video_inputs) + j
+            cmd += ['-i', item['path']]
+            filters.append(
+                f"[{input_index}:a]aformat=sample_rates={self.audio_sample_rate}:channel_layouts=stereo,"
+                f"apad,atrim=0:{item['duration_ms'] / 1000:.3f},asetpts=PTS-STARTPTS[a{j}]"
+            )
+
+        video_labels = ''.join(f"[v{i}]" for i in range(len(video_inputs)))
+        audio_labels = ''.join(f"[a{j}]" for j in range(len(audio_inputs)))
+        filters.append(f"{video_labels}interleave=n={len(video_inputs)}[vout]")
+        filters.append(f"{audio_labels}concat=n={len(audio_inputs)}:v=0:a=1[aout]")
+
+        cmd += [
+            '-filter_complex', ';'.join(filters),
+            '-map', '[vout]',
+            '-map', '[aout]',
+        ]
+        cmd += self._video_encoder_args()
+        cmd += [
+            '-c:a', 'aac',
+            '-b:a', '128k',
+            '-shortest',
+            '-movflags', '+faststart',
+            output_path,
+        ]
+        return cmd
+
+    def _video_encoder_args(self) -> List[str]:
+        """Encoder arguments for the video stream"""
+        if self.encoding_mode == "static":
+            # Variable frame rate: every image is encoded once as a keyframe that lasts until the next image.
+            # B-frames are disabled so decode order equals presentation order for these long frames.
+            return [
+                '-c:v', 'libx264',
+                '-preset', self.preset,
+                '-tune', 'stillimage',
+                '-crf', str(self.crf),
+                '-pix_fmt', 'yuv420p',
+                '-bf', '0',
+                '-g', '1',
+                '-fps_mode', 'vfr',
+                '-video_track_timescale', '1000',
+            ]
+
+        return [
+            '-c:v', 'libx264',
+            '-preset', self.preset,
+            '-crf', str(self.crf),
+            '-pix_fmt', 'yuv420p',
+            '-r', str(self.fps),
+        ]
+
+    def render_blocking(self, plan: Dict[str, Any], output_path: str,
+                        cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Render the plan from a worker thread or process (used for per-slide segments).
+
+        FFmpeg is killed as soon as `cancel_token` is cancelled.
+        """
+        output_path = os.path.abspath(output_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        cancel_token = cancel_token or CancellationToken()
+        cancel_token.raise_if_cancelled()
+        process = subprocess.Popen(self.build_command(plan, output_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with cancel_token.track(process):
+            _, stderr = process.communicate()
+
+        cancel_token.raise_if_cancelled()
+        if process.returncode != 0:
+            logger.error(f"FFmpeg segment render failed: {stderr.decode(errors='ignore')}")
+            raise RuntimeError("FFmpeg segment render failed")
+
+        if not os.path.exists(output_path):
+            raise FileNotFoundError(f"Rendered segment not created: {output_path}")
+        return output_path
+
+    async def render(self, plan: Dict[str, Any], output_path: str) -> str:
+        """Render the plan to output_path with a single FFmpeg process"""
+        output_path = os.path.abspath(output_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        cmd = self.build_command(plan, output_path)
+        logger.info(
+            f"Rendering {len(plan['video_inputs'])} images and {len(plan['audio_inputs'])} audio tracks "
+            f"({plan['total_duration']:.1f}s) in a single FFmpeg pass..."
+        )
+
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+
+            if process.returncode != 0:
+                logger.error(f"FFmpeg render failed: {stderr.decode(errors='ignore')}")
+                raise RuntimeError("FFmpeg single-pass render failed")
+
+        except asyncio.CancelledError:
+            logger.info("FFmpeg render cancelled, cleaning up...")
+            if process and process.returncode is None:
+                process.terminate()
+                await asyncio.sleep(1)  # Give time to terminate
+            raise
+
+        if not os.path.exists(output_path):
+            raise FileNotFoundError(f"Rendered video not created: {output_path}")
+
+        logger.info(f"Single-pass render saved: {output_path}")
+        return output_path
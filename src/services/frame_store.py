@@ -0,0 +1,114 @@
+"""
+Raw RGB frame files for handing rendered slides to the encoder
+
+Rendered slides are written as headerless rgb24 buffers, in shared memory
+(/dev/shm) when the platform has it. FFmpeg reads them as rawvideo inputs,
+so a slide goes from PIL to the encoder without any image codec. A frame
+that does not fit in shared memory (64 MB by default in Docker) is written
+to the temp dir instead.
+"""
+import os
+import uuid
+import shutil
+import tempfile
+from typing import Optional
+import numpy as np
+from PIL import Image
+from src.utils.logger import logger
+
+FRAME_PIX_FMT = "rgb24"
+FRAME_EXTENSION = ".rgb"
+
+# Keep a lossless PNG copy of every rendered slide for inspection
+SLIDE_DEBUG_FRAMES = os.getenv("SLIDE_DEBUG_FRAMES", "false").lower() == "true"
+SLIDE_DEBUG_DIR = os.getenv("SLIDE_DEBUG_DIR", os.path.join(tempfile.gettempdir(), "eduva_debug_frames"))
+
+_SHM_DIR = "/dev/shm"
+_FRAME_SUBDIR = "eduva_frames"
+
+
+def frame_dir() -> str:
+    """Directory for raw frames: shared memory when available, the temp dir otherwise"""
+    base = _SHM_DIR if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK) else tempfile.gettempdir()
+    path = os.path.join(base, _FRAME_SUBDIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _fallback_path(path: str) -> str:
+    """Where a frame (or frame directory) under shared memory goes when shared memory is full"""
+    shm_frames = os.path.join(_SHM_DIR, _FRAME_SUBDIR)
+    fallback_frames = os.path.join(tempfile.gettempdir(), _FRAME_SUBDIR)
+    if os.path.commonpath([os.path.abspath(path), shm_frames]) != shm_frames:
+        return path
+    return os.path.join(fallback_frames, os.path.relpath(path, shm_frames))
+
+
+def create_job_frame_dir() -> str:
+    """Private frame directory for one video, removed as a whole with remove_frame_dir"""
+    return tempfile.mkdtemp(prefix="job_", dir=frame_dir())
+
+
+def remove_frame_dir(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+    fallback_dir = _fallback_path(path)
+    if fallback_dir != path:
+        shutil.rmtree(fallback_dir, ignore_errors=True)
+
+
+def new_frame_path(prefix: str = "frame", directory: Optional[str] = None) -> str:
+    return os.path.join(directory or frame_dir(), f"{prefix}_{uuid.uuid4().hex[:12]}{FRAME_EXTENSION}")
+
+
+def is_raw_frame(path: str) -> bool:
+    return path.endswith(FRAME_EXTENSION)
+
+
+def _write_raw(path: str, data: bytes):
+    try:
+        with open(path, 'wb') as frame_file:
+            frame_file.write(data)
+    except OSError:
+        remove_frame(path)
+        raise
+
+
+def write_frame(img: Image.Image, path: str) -> str:
+    """
+    Write an image as a raw rgb24 frame (plus a PNG copy when frame debugging is on).
+
+    Returns the path written, which is under the temp dir instead of `path`
+    when shared memory is full.
+    """
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    data = img.tobytes()
+    try:
+        _write_raw(path, data)
+    except OSError as e:
+        fallback = _fallback_path(path)
+        if fallback == path:
+            raise
+        logger.warning(f"Could not write frame to shared memory ({e}), using {os.path.dirname(fallback)}")
+        os.makedirs(os.path.dirname(fallback), exist_ok=True)
+        _write_raw(fallback, data)
+        path = fallback
+
+    if SLIDE_DEBUG_FRAMES:
+        os.makedirs(SLIDE_DEBUG_DIR, exist_ok=True)
+        debug_path = os.path.join(SLIDE_DEBUG_DIR, os.path.basename(path)[:-len(FRAME_EXTENSION)] + ".png")
+        img.save(debug_path, 'PNG')
+        logger.debug(f"Debug frame saved: {debug_path}")
+    return path
+
+
+def read_frame(path: str, size: tuple) -> np.ndarray:
+    """Read a raw rgb24 frame as an (height, width, 3) array"""
+    return np.fromfile(path, dtype=np.uint8).reshape(size[1], size[0], 3)
+
+
+def remove_frame(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
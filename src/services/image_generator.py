@@ -42,11 +42,16 @@ class ImageGenerator:
     # Core functionality
     def create_content_image(self, title: str, contents: List[str], output_path: str, 
                            size: tuple = (1280, 720), content_type: str = "normal", 
-                           add_disclaimer: bool = False, slide_id: Optional[int] = None, language: str = "vietnamese") -> str:
+                           add_disclaimer: bool = False, slide_id: Optional[int] = None, language: str = "vietnamese",
+                           template_name: Optional[str] = None) -> str:
         """Create content slide image with smart template selection"""
         return self.template_manager.create_slide_image(
-            title, contents, output_path, size, content_type, add_disclaimer, slide_id, language
+            title, contents, output_path, size, content_type, add_disclaimer, slide_id, language, template_name
         )
+
+    def plan_templates(self, slide_seeds: List[str]) -> List[str]:
+        """Assign templates to all slides of a video, one seed per slide (see slide_template_seed)"""
+        return self.template_manager.plan_templates(slide_seeds)
     
     def reset_for_new_video(self) -> None:
         """Reset template manager for new video"""
@@ -61,6 +66,10 @@ class ImageGenerator:
         """Get available templates"""
         return self.template_manager.get_available_templates()
     
+    def set_render_executor(self, executor) -> None:
+        """Render content images on the given executor (e.g. a process pool)"""
+        self.template_manager.set_render_executor(executor)
+
     def get_template_status(self) -> Dict[str, Any]:
         """Get current template status"""
         return self.template_manager.get_status()
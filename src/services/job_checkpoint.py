@@ -0,0 +1,271 @@
+"""
+Checkpoint manifests for resumable product jobs
+
+A retried or redelivered job finds the manifest left by the previous attempt
+and skips the stages and slides it already completed. Artifacts live on local
+disk and, when a checkpoint container is configured, in blob storage so that a
+retry picked up by another worker can resume as well.
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional
+from src.utils.logger import logger
+from src.utils.temp_cleanup import cleanup_old_temp_files
+
+JOB_CHECKPOINT_ENABLED = os.getenv("JOB_CHECKPOINT_ENABLED", "true").lower() == "true"
+JOB_CHECKPOINT_DIR = os.getenv("JOB_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "eduva_checkpoints"))
+JOB_CHECKPOINT_TTL_HOURS = int(os.getenv("JOB_CHECKPOINT_TTL_HOURS", "24"))
+
+MANIFEST_NAME = "manifest.json"
+BLOB_PREFIX = "checkpoints"
+# Expired checkpoints are swept at most this often per process
+CLEANUP_INTERVAL_SECONDS = 3600
+
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+
+def job_fingerprint(*parts: Any) -> str:
+    """Hash of the job inputs; a manifest written for different inputs is discarded"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobCheckpoint:
+    """
+    Manifest of the completed stages and slides of one job, with their artifacts.
+
+    Stage artifacts are stored from the event loop and mirrored to blob storage
+    right away. Slides are recorded from pipeline threads into the local
+    directory only; flush() mirrors them afterwards.
+    """
+
+    def __init__(self, job_id: str, fingerprint: str, root_dir: str = JOB_CHECKPOINT_DIR,
+                 blob_service=None, blob_container: Optional[str] = None):
+        self.job_id = job_id
+        self.fingerprint = fingerprint
+        self.directory = os.path.join(root_dir, f"job_{job_id}")
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self.blob_service = blob_service
+        self.blob_container = blob_container if blob_service else None
+        self.manifest = self._empty_manifest()
+        self.resumed = False
+        self._lock = threading.Lock()
+        self._unflushed = set()
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'job_id': self.job_id,
+            'fingerprint': self.fingerprint,
+            'created_at': now,
+            'updated_at': now,
+            'stages': {},
+            'slides': {},
+        }
+
+    def _blob_name(self, file_name: str) -> str:
+        return f"{BLOB_PREFIX}/{self.job_id}/{file_name}"
+
+    async def load(self) -> bool:
+        """Load the manifest of a previous attempt. Returns True when there is something to resume."""
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = await asyncio.to_thread(self._read_local_manifest)
+        if manifest is None and self.blob_container:
+            manifest = await self._read_blob_manifest()
+
+        if manifest is None:
+            return False
+        if manifest.get('fingerprint') != self.fingerprint:
+            logger.info(f"Checkpoint for job {self.job_id} was written for different inputs, starting over")
+            await self.discard()
+            os.makedirs(self.directory, exist_ok=True)
+            return False
+
+        self.manifest = manifest
+        self.resumed = True
+        logger.info(
+            f"Resuming job {self.job_id} from checkpoint: stages {list(manifest['stages'])}, "
+            f"{len(manifest['slides'])} slides done"
+        )
+        return True
+
+    def _read_local_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint manifest {self.manifest_path}: {e}")
+            return None
+
+    async def _read_blob_manifest(self) -> Optional[Dict[str, Any]]:
+        blob_name = self._blob_name(MANIFEST_NAME)
+        try:
+            if not await self.blob_service.blob_exists(self.blob_container, blob_name):
+                return None
+            await self.blob_service.download_file(self.blob_container, blob_name, self.manifest_path)
+            return await asyncio.to_thread(self._read_local_manifest)
+        except Exception as e:
+            logger.warning(f"Could not read checkpoint manifest from blob storage: {e}")
+            return None
+
+    def _save_locked(self):
+        self.manifest['updated_at'] = time.time()
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(self.manifest, manifest_file, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
+
+    async def _upload(self, file_name: str, content_type: Optional[str] = None) -> bool:
+        try:
+            await self.blob_service.upload_file(
+                self.blob_container, self._blob_name(file_name),
+                os.path.join(self.directory, file_name), content_type=content_type
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Checkpoint upload failed for {file_name}: {e}")
+            return False
+
+    async def _fetch(self, file_name: str) -> Optional[str]:
+        """Local path of a checkpointed file, downloaded from blob storage if needed"""
+        local_path = os.path.join(self.directory, file_name)
+        if os.path.exists(local_path):
+            return local_path
+        if not self.blob_container:
+            return None
+        try:
+            await self.blob_service.download_file(self.blob_container, self._blob_name(file_name), local_path)
+            return local_path
+        except Exception as e:
+            logger.warning(f"Checkpointed file {file_name} is not available: {e}")
+            return None
+
+    @staticmethod
+    def _copy_in(source_path: str, target_path: str):
+        temp_path = f"{target_path}.tmp"
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, target_path)
+
+    # Stages
+
+    def get_stage(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.manifest['stages'].get(name)
+
+    async def complete_stage(self, name: str, artifact_path: Optional[str] = None, **data) -> Dict[str, Any]:
+        """Record a completed stage, copying its artifact (if any) into the checkpoint"""
+        stage = dict(data)
+        if artifact_path:
+            file_name = f"{name}{os.path.splitext(artifact_path)[1]}"
+            await asyncio.to_thread(self._copy_in, artifact_path, os.path.join(self.directory, file_name))
+            stage['artifact'] = file_name
+            if self.blob_container:
+                await self._upload(file_name)
+
+        with self._lock:
+            self.manifest['stages'][name] = stage
+            self._save_locked()
+        if self.blob_container:
+            await self._upload(MANIFEST_NAME, content_type="application/json")
+        return stage
+
+    async def fetch_stage_artifact(self, name: str) -> Optional[str]:
+        """Local path of a completed stage's artifact, or None when it has to be redone"""
+        stage = self.get_stage(name)
+        if not stage or not stage.get('artifact'):
+            return None
+        return await self._fetch(stage['artifact'])
+
+    # Slides
+
+    async def restore_slide(self, slide_index: int, slide_key: str, output_path: str) -> bool:
+        """Copy a completed slide to output_path if it was checkpointed with the same key"""
+        entry = self.manifest['slides'].get(str(slide_index))
+        if not entry or entry.get('key') != slide_key:
+            return False
+        local_path = await self._fetch(entry['file'])
+        if not local_path:
+            return False
+        await asyncio.to_thread(shutil.copyfile, local_path, output_path)
+        return True
+
+    def record_slide(self, slide_index: int, slide_key: str, source_path: str):
+        """Record a completed slide; called from pipeline threads, mirrored to blob storage by flush()"""
+        file_name = f"slide_{slide_index}{os.path.splitext(source_path)[1]}"
+        try:
+            self._copy_in(source_path, os.path.join(self.directory, file_name))
+            with self._lock:
+                self.manifest['slides'][str(slide_index)] = {'key': slide_key, 'file': file_name}
+                self._save_locked()
+                self._unflushed.add(file_name)
+        except OSError as e:
+            logger.warning(f"Could not checkpoint slide {slide_index}: {e}")
+
+    async def flush(self) -> int:
+        """Upload the slides recorded since the last flush, then the manifest"""
+        if not self.blob_container:
+            return 0
+        with self._lock:
+            file_names = list(self._unflushed)
+            self._unflushed.clear()
+        if not file_names:
+            return 0
+
+        uploaded = sum(await asyncio.gather(*(self._upload(name) for name in file_names)))
+        await self._upload(MANIFEST_NAME, content_type="application/json")
+        return uploaded
+
+    async def discard(self):
+        """Remove the checkpoint once the job is done (or its inputs changed)"""
+        file_names = [MANIFEST_NAME]
+        file_names += [stage['artifact'] for stage in self.manifest['stages'].values() if stage.get('artifact')]
+        file_names += [entry['file'] for entry in self.manifest['slides'].values()]
+
+        await asyncio.to_thread(shutil.rmtree, self.directory, True)
+        if self.blob_container:
+            await asyncio.gather(*(
+                self.blob_service.delete_blob(self.blob_container, self._blob_name(name)) for name in file_names
+            ))
+        self.manifest = self._empty_manifest()
+        self._unflushed.clear()
+
+
+async def cleanup_expired_checkpoints(blob_service=None, blob_container: Optional[str] = None,
+                                      root_dir: str = JOB_CHECKPOINT_DIR,
+                                      ttl_hours: int = JOB_CHECKPOINT_TTL_HOURS, force: bool = False) -> int:
+    """
+    Remove checkpoints abandoned for longer than the TTL (jobs that ran out of retries).
+
+    Runs at most once per CLEANUP_INTERVAL_SECONDS unless forced.
+    Returns the number of expired blobs deleted.
+    """
+    global _last_cleanup
+    with _cleanup_lock:
+        if not force and time.time() - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return 0
+        _last_cleanup = time.time()
+
+    await asyncio.to_thread(cleanup_old_temp_files, root_dir, ttl_hours)
+    if not (blob_service and blob_container):
+        return 0
+
+    try:
+        blobs: List[Dict[str, Any]] = await blob_service.list_blobs(blob_container, prefix=f"{BLOB_PREFIX}/")
+    except Exception as e:
+        logger.warning(f"Could not list checkpoint blobs: {e}")
+        return 0
+
+    cutoff = time.time() - ttl_hours * 3600
+    expired = [blob['name'] for blob in blobs if blob['last_modified'].timestamp() < cutoff]
+    deleted = sum(await asyncio.gather(*(blob_service.delete_blob(blob_container, name) for name in expired)))
+    if expired:
+        logger.info(f"Removed {deleted}/{len(expired)} expired checkpoint blobs")
+    return deleted
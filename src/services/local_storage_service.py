@@ -0,0 +1,197 @@
+"""
+Local filesystem storage backend, for running workers, load tests and benchmarks offline
+"""
+import os
+import uuid
+import shutil
+import asyncio
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+from src.utils.logger import logger
+
+# Suffix of files still being written; they are renamed into place when complete
+PARTIAL_SUFFIX = ".uploading"
+
+
+def _partial_path(path: str) -> str:
+    return f"{path}.{uuid.uuid4().hex[:8]}{PARTIAL_SUFFIX}"
+
+
+class LocalStreamUpload:
+    """Streamed upload written to a partial file and renamed to the blob path on commit()"""
+
+    def __init__(self, blob_name: str, path: str):
+        self.blob_name = blob_name
+        self.path = path
+        self.bytes_written = 0
+        self._partial_path = _partial_path(path)
+        self._file = open(self._partial_path, 'wb')
+
+    @property
+    def url(self) -> str:
+        return Path(self.path).as_uri()
+
+    async def write(self, data: bytes):
+        await asyncio.to_thread(self._file.write, data)
+        self.bytes_written += len(data)
+
+    def _finish(self):
+        self._file.close()
+        os.replace(self._partial_path, self.path)
+
+    def _discard(self):
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self._partial_path)
+        except OSError:
+            pass
+
+    async def commit(self) -> str:
+        await asyncio.to_thread(self._finish)
+        logger.info(f"Committed streamed upload ({self.bytes_written / (1024 * 1024):.1f} MB) to {self.path}")
+        return self.url
+
+    async def abort(self):
+        """Drop the partial file; no-op after commit()"""
+        await asyncio.to_thread(self._discard)
+
+
+class LocalStorageService:
+    """
+    Storage backend keeping each container as a directory under root_dir.
+
+    Blob names map to relative paths ("a/b.mp4" is a file in subdirectory a).
+    Writes go to a partial file renamed into place, so readers never see a
+    half-written blob. Content types are not stored.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = os.path.abspath(root_dir)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _blob_path(self, container_name: str, blob_name: str) -> str:
+        container_dir = os.path.join(self.root_dir, container_name)
+        path = os.path.abspath(os.path.join(container_dir, blob_name))
+        if not path.startswith(container_dir + os.sep):
+            raise ValueError(f"Blob name escapes its container: {container_name}/{blob_name}")
+        return path
+
+    @staticmethod
+    def _publish(path: str, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = _partial_path(path)
+        try:
+            with open(partial_path, 'wb') as partial_file:
+                write(partial_file)
+            os.replace(partial_path, path)
+        except BaseException:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            raise
+
+    async def upload_file(self, container_name: str, blob_name: str, file_path: str,
+                          content_type: Optional[str] = None) -> str:
+        try:
+            path = self._blob_path(container_name, blob_name)
+
+            def copy(target):
+                with open(file_path, 'rb') as source:
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+
+            await asyncio.to_thread(self._publish, path, copy)
+            logger.info(f"Successfully uploaded file to local storage: {path}")
+            return self.get_blob_url(container_name, blob_name)
+
+        except Exception as e:
+            logger.error(f"Failed to upload file to local storage: {e}")
+            raise
+
+    async def upload_content(self, container_name: str, blob_name: str, content: bytes,
+                             content_type: Optional[str] = None) -> str:
+        try:
+            path = self._blob_path(container_name, blob_name)
+            await asyncio.to_thread(self._publish, path, lambda target: target.write(content))
+            logger.info(f"Successfully uploaded content to local storage: {path}")
+            return self.get_blob_url(container_name, blob_name)
+
+        except Exception as e:
+            logger.error(f"Failed to upload content to local storage: {e}")
+            raise
+
+    async def download_file(self, container_name: str, blob_name: str, local_path: Optional[str] = None) -> str:
+        try:
+            if local_path is None:
+                local_path = os.path.join(tempfile.gettempdir(), blob_name)
+            blob_path = self._blob_path(container_name, blob_name)
+
+            def copy():
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                shutil.copyfile(blob_path, local_path)
+
+            await asyncio.to_thread(copy)
+            logger.info(f"Successfully downloaded file from local storage: {local_path}")
+            return local_path
+
+        except Exception as e:
+            logger.error(f"Failed to download file from local storage: {e}")
+            raise
+
+    async def open_block_upload(self, container_name: str, blob_name: str,
+                                content_type: Optional[str] = None) -> LocalStreamUpload:
+        """Start a streamed upload of a blob whose size is not known up front"""
+        path = self._blob_path(container_name, blob_name)
+
+        def open_upload() -> LocalStreamUpload:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return LocalStreamUpload(blob_name, path)
+
+        return await asyncio.to_thread(open_upload)
+
+    async def blob_exists(self, container_name: str, blob_name: str) -> bool:
+        """Check if a blob exists"""
+        try:
+            return await asyncio.to_thread(os.path.isfile, self._blob_path(container_name, blob_name))
+        except ValueError:
+            return False
+
+    async def delete_blob(self, container_name: str, blob_name: str) -> bool:
+        """Delete a blob"""
+        try:
+            await asyncio.to_thread(os.remove, self._blob_path(container_name, blob_name))
+            logger.info(f"Successfully deleted blob: {container_name}/{blob_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete blob: {e}")
+            return False
+
+    async def list_blobs(self, container_name: str, prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List blob names and last-modified times under a prefix"""
+        container_dir = os.path.join(self.root_dir, container_name)
+
+        def scan() -> List[Dict[str, Any]]:
+            blobs = []
+            for dir_path, _, file_names in os.walk(container_dir):
+                for file_name in file_names:
+                    if file_name.endswith(PARTIAL_SUFFIX):
+                        continue
+                    path = os.path.join(dir_path, file_name)
+                    name = os.path.relpath(path, container_dir).replace(os.sep, "/")
+                    if prefix and not name.startswith(prefix):
+                        continue
+                    try:
+                        modified = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+                    except OSError:
+                        continue
+                    blobs.append({"name": name, "last_modified": modified})
+            return sorted(blobs, key=lambda blob: blob["name"])
+
+        return await asyncio.to_thread(scan)
+
+    def get_blob_url(self, container_name: str, blob_name: str) -> str:
+        """file:// URL of a blob"""
+        return Path(self._blob_path(container_name, blob_name)).as_uri()
@@ -0,0 +1,135 @@
+"""
+MoviePy slide encoder used by the per-slide (moviepy) render mode
+"""
+import os
+import gc
+import time
+import platform
+from contextlib import contextmanager
+from typing import Dict, Any
+from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
+from src.utils.logger import logger
+from src.services import frame_store
+from PIL import Image
+
+if not hasattr(Image, 'ANTIALIAS'):
+    Image.ANTIALIAS = Image.Resampling.LANCZOS
+
+
+class MoviePySlideEncoder:
+    """
+    Encodes one slide (timed images + narration) into an MP4 with MoviePy.
+    Holds only plain settings so it can be sent to a render process pool.
+    """
+
+    def __init__(self, image_resolution: tuple = (1280, 720), video_fps: int = 10):
+        self.image_resolution = image_resolution
+        self.video_fps = video_fps
+        self.is_windows = platform.system() == "Windows"
+
+    @contextmanager
+    def _safe_moviepy_context(self):
+        """Context manager for safe MoviePy operations with aggressive cleanup"""
+        clips_to_cleanup = []
+        try:
+            yield clips_to_cleanup
+        finally:
+            # Aggressive cleanup
+            for clip in clips_to_cleanup:
+                try:
+                    if hasattr(clip, 'close'):
+                        clip.close()
+                    if hasattr(clip, 'reader') and clip.reader:
+                        clip.reader.close()
+                except Exception as e:
+                    logger.warning(f"Error closing clip: {e}")
+            
+            # Clear the list
+            clips_to_cleanup.clear()
+            
+            # Force garbage collection multiple times - OPTIMIZED
+            for _ in range(2):
+                gc.collect()
+            
+            # Reduced delay on Windows for file handle release
+            if self.is_windows:
+                time.sleep(0.2)
+
+    def _safe_file_operation(self, operation, *args, **kwargs):
+        """Safely perform file operations with retry logic for Windows"""
+        max_retries = kwargs.pop('max_retries', 3)
+        
+        for attempt in range(max_retries):
+            try:
+                return operation(*args, **kwargs)
+            except (PermissionError, OSError, FileNotFoundError) as e:
+                if attempt < max_retries - 1:
+                    delay = 0.5 * (attempt + 1)
+                    logger.warning(f"File operation failed (attempt {attempt + 1}), retrying in {delay}s: {e}")
+                    time.sleep(delay)
+                    gc.collect()
+                else:
+                    logger.error(f"File operation failed after {max_retries} attempts: {e}")
+                    raise
+
+    def encode(self, slide_result: Dict[str, Any], audio_path: str, output_path: str) -> str:
+        """Optimized video creation for slide with flexible image count."""
+        output_path = os.path.normpath(os.path.abspath(output_path))
+        audio_path = os.path.normpath(os.path.abspath(audio_path))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        with self._safe_moviepy_context() as clips:
+            try:
+                audio_clip = AudioFileClip(audio_path)
+                clips.append(audio_clip)
+                total_duration = audio_clip.duration
+
+                images = slide_result.get('images', [])
+                if not images:
+                    raise ValueError("No images provided for video creation")
+
+                image_clips = []
+                for img_info in images:
+                    img_path = os.path.normpath(os.path.abspath(img_info['path']))
+                    if not os.path.exists(img_path):
+                        logger.warning(f"Image file not found: {img_path}")
+                        continue
+                    
+                    try:
+                        # Raw frames are loaded straight into an array, other images are decoded by MoviePy
+                        source = frame_store.read_frame(img_path, img_info['size']) if img_info.get('pix_fmt') else img_path
+                        clip = (
+                            ImageClip(source)
+                            .resize(height=self.image_resolution[1])
+                            .set_duration(img_info['duration'])
+                            .set_fps(self.video_fps)
+                        )
+                        image_clips.append(clip)
+                        clips.append(clip)
+                    except Exception as e:
+                        logger.warning(f"Could not create image clip for {img_path}: {e}")
+
+                if not image_clips:
+                    raise ValueError("No valid image clips could be created")
+
+                video_clip = concatenate_videoclips(image_clips, method="compose")
+                video_clip = video_clip.set_audio(audio_clip)
+                clips.append(video_clip)
+
+                self._safe_file_operation(
+                    video_clip.write_videofile,
+                    output_path,
+                    fps=self.video_fps,
+                    codec='libx264',
+                    audio_codec='aac',
+                    verbose=False,
+                    logger=None,
+                    preset='medium',
+                    ffmpeg_params=['-crf', '23']
+                )
+
+            except Exception as e:
+                logger.error(f"Error creating slide video: {e}")
+                raise
+
+        return output_path
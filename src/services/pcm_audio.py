@@ -0,0 +1,68 @@
+"""
+PCM (WAV) audio helpers for the narration pipeline
+
+Slide narration is kept as 16-bit PCM from TTS to the final muxer, so the only
+lossy step is the AAC encode of the finished video.
+"""
+import os
+import wave
+import numpy as np
+from typing import Tuple
+
+PCM_SAMPLE_WIDTH = 2  # 16-bit LINEAR16
+
+
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit WAV file as an int16 array of shape (frames, channels) and its sample rate"""
+    with wave.open(path, "rb") as wav_file:
+        if wav_file.getsampwidth() != PCM_SAMPLE_WIDTH:
+            raise ValueError(f"Unsupported sample width {wav_file.getsampwidth()} in {path}")
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    samples = np.frombuffer(frames, dtype="<i2").reshape(-1, channels)
+    return samples, sample_rate
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int) -> str:
+    """Write int16 samples of shape (frames, channels) to a WAV file, replacing it atomically"""
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, 1)
+
+    temp_path = f"{path}.tmp"
+    with wave.open(temp_path, "wb") as wav_file:
+        wav_file.setnchannels(samples.shape[1])
+        wav_file.setsampwidth(PCM_SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.astype("<i2", copy=False).tobytes())
+    os.replace(temp_path, path)
+    return path
+
+
+def fade_out(samples: np.ndarray, sample_rate: int, duration: float) -> np.ndarray:
+    """Apply a linear fade-out over the last `duration` seconds"""
+    fade_frames = min(len(samples), int(duration * sample_rate))
+    if fade_frames <= 0:
+        return samples
+
+    faded = samples.copy()
+    ramp = np.linspace(1.0, 0.0, fade_frames, dtype=np.float32)[:, None]
+    faded[-fade_frames:] = (faded[-fade_frames:].astype(np.float32) * ramp).astype(np.int16)
+    return faded
+
+
+def pad_silence(samples: np.ndarray, sample_rate: int, duration: float) -> np.ndarray:
+    """Append `duration` seconds of silence"""
+    silence_frames = int(duration * sample_rate)
+    if silence_frames <= 0:
+        return samples
+    silence = np.zeros((silence_frames, samples.shape[1]), dtype=np.int16)
+    return np.concatenate([samples, silence])
+
+
+def write_silence(path: str, duration: float, sample_rate: int, channels: int = 1) -> str:
+    """Write a silent WAV file"""
+    samples = np.zeros((int(duration * sample_rate), channels), dtype=np.int16)
+    return write_wav(path, samples, sample_rate)
+
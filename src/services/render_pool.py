@@ -0,0 +1,62 @@
+"""
+Process pool for CPU-bound slide rendering and encoding
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from src.utils.logger import logger
+
+# Approximate resident memory of one worker process (interpreter + Pillow/MoviePy working set)
+TEMPLATE_WORKER_MEMORY_MB = 150
+ENCODE_WORKER_MEMORY_MB = 400
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def resolve_process_workers(memory_budget_mb: int, per_worker_mb: int, max_workers: int = 0) -> int:
+    """Size a process pool from the CPU count and a memory budget"""
+    cpu_count = os.cpu_count() or 1
+    by_memory = max(1, memory_budget_mb // max(1, per_worker_mb))
+    workers = min(cpu_count, by_memory)
+    if max_workers > 0:
+        workers = min(workers, max_workers)
+    return max(1, workers)
+
+
+def get_render_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Get the process-wide render pool, creating it on first use.
+
+    Workers are started with the 'spawn' method: the parent holds gRPC clients
+    (TTS, Vertex AI) that must not be forked.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+            logger.info(f"Render process pool started with {workers} workers")
+        return _pool
+
+
+def get_render_pool_size() -> int:
+    """Number of workers in the render pool (0 if not started)"""
+    return _pool_workers if _pool is not None else 0
+
+
+def shutdown_render_pool():
+    """Shut down the render pool, e.g. after a worker process crashed and broke the pool"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            _pool_workers = 0
+            logger.info("Render process pool shut down")
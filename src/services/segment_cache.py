@@ -0,0 +1,141 @@
+"""
+Content-addressed cache of encoded per-slide video segments
+"""
+import os
+import asyncio
+import hashlib
+import json
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional
+from src.services.disk_cache import DiskLRUCache
+from src.utils.logger import logger
+
+SEGMENT_CACHE_ENABLED = os.getenv("SEGMENT_CACHE_ENABLED", "true").lower() == "true"
+SEGMENT_CACHE_DIR = os.getenv("SEGMENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "eduva_segment_cache"))
+SEGMENT_CACHE_MAX_MB = int(os.getenv("SEGMENT_CACHE_MAX_MB", "2048"))
+
+# Bump when the slide rendering changes in a way that makes cached segments stale
+SEGMENT_FORMAT_VERSION = 1
+
+
+class SegmentCache(DiskLRUCache):
+    """
+    Local LRU of encoded slide segments with an optional blob storage tier.
+
+    Lookups and stores from pipeline threads only touch the local directory.
+    The blob tier is synced around the pipeline from the event loop:
+    prefetch() pulls remote segments into the local cache before rendering,
+    publish() uploads the segments rendered by this job afterwards.
+    """
+
+    suffix = ".mp4"
+    blob_prefix = "segments"
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 2048,
+                 blob_service=None, blob_container: Optional[str] = None):
+        super().__init__(cache_dir, max_size_mb)
+        self.blob_service = blob_service
+        self.blob_container = blob_container if blob_service else None
+        self._unpublished = set()
+        self._unpublished_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(slide: Dict[str, Any], voice_config: Dict[str, Any], template_name: Optional[str],
+                 profile: Dict[str, Any], add_disclaimer: bool = False, language: str = "") -> str:
+        """Hash every input that shapes a slide's segment"""
+        payload = json.dumps({
+            'version': SEGMENT_FORMAT_VERSION,
+            'tts_script': slide.get('tts_script', ''),
+            'voice': voice_config or {},
+            'title': slide.get('title', ''),
+            'content': slide.get('content', []),
+            'image_keywords': slide.get('image_keywords', []),
+            'template': template_name,
+            'disclaimer': [add_disclaimer, language if add_disclaimer else ""],
+            'profile': profile,
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def put_file(self, key: str, source_path: str):
+        super().put_file(key, source_path)
+        if self.blob_container and self.contains(key):
+            with self._unpublished_lock:
+                self._unpublished.add(key)
+
+    def _blob_name(self, key: str) -> str:
+        return f"{self.blob_prefix}/{key}{self.suffix}"
+
+    async def prefetch(self, keys: List[str]) -> int:
+        """Download segments missing locally from the blob tier. Returns how many were fetched."""
+        if not self.blob_container:
+            return 0
+
+        async def fetch(key: str) -> bool:
+            blob_name = self._blob_name(key)
+            try:
+                if not await self.blob_service.blob_exists(self.blob_container, blob_name):
+                    return False
+                fd, temp_path = tempfile.mkstemp(suffix=self.suffix)
+                os.close(fd)
+                try:
+                    await self.blob_service.download_file(self.blob_container, blob_name, temp_path)
+                    await asyncio.to_thread(super(SegmentCache, self).put_file, key, temp_path)
+                finally:
+                    os.remove(temp_path)
+                return True
+            except Exception as e:
+                logger.warning(f"Segment prefetch failed for {key[:12]}: {e}")
+                return False
+
+        missing = [key for key in dict.fromkeys(keys) if not self.contains(key)]
+        fetched = sum(await asyncio.gather(*(fetch(key) for key in missing)))
+        if missing:
+            logger.info(f"Segment cache prefetch: {fetched}/{len(missing)} missing segments found in blob storage")
+        return fetched
+
+    async def publish(self) -> int:
+        """Upload segments stored since the last publish to the blob tier"""
+        if not self.blob_container:
+            return 0
+
+        with self._unpublished_lock:
+            keys = list(self._unpublished)
+            self._unpublished.clear()
+
+        async def upload(key: str) -> bool:
+            try:
+                await self.blob_service.upload_file(
+                    self.blob_container, self._blob_name(key), self._entry_path(key), content_type="video/mp4"
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"Segment upload failed for {key[:12]}: {e}")
+                return False
+
+        uploaded = sum(await asyncio.gather(*(upload(key) for key in keys if self.contains(key))))
+        if keys:
+            logger.info(f"Segment cache published {uploaded}/{len(keys)} segments to blob storage")
+        return uploaded
+
+
+_cache: Optional[SegmentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_segment_cache(blob_service=None, blob_container: Optional[str] = None) -> Optional[SegmentCache]:
+    """Process-wide segment cache, or None when caching is disabled or the directory is unusable"""
+    global _cache
+    if not SEGMENT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = SegmentCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_MB)
+            except OSError as e:
+                logger.warning(f"Segment cache disabled, cannot use {SEGMENT_CACHE_DIR}: {e}")
+                return None
+        if blob_service is not None and blob_container:
+            _cache.blob_service = blob_service
+            _cache.blob_container = blob_container
+        return _cache
@@ -0,0 +1,182 @@
+"""
+Stage-separated slide pipeline with independent worker pools and bounded queues
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from src.utils.cancellation import CancellationToken
+from src.utils.logger import logger
+
+# Marks the end of the stream on a stage queue
+_END = object()
+# Seconds a stage worker waits for a cancelled or timed out thread to return before moving on
+STAGE_RELEASE_TIMEOUT = 10
+
+
+class PipelineStage:
+    """
+    A single pipeline stage: a blocking function executed on its own worker pool.
+
+    The function is called with the slide context and a CancellationToken,
+    cancelled when the stage's timeout fires or the pipeline is cancelled.
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any], CancellationToken], Optional[Dict[str, Any]]],
+                 workers: int = 1, timeout: float = 300, executor: Optional[Executor] = None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.executor = executor
+        self._owns_executor = executor is None
+
+    def open(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"slide-{self.name}")
+
+    def close(self):
+        if self._owns_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class SlidePipeline:
+    """
+    Runs slides through a chain of stages. Each stage has its own pool and a
+    bounded input queue, so a slide moves on as soon as its stage is done and
+    slide N+1 can be in TTS while slide N is being encoded.
+
+    A stage function receives the slide context dict and returns it (possibly
+    updated). Returning None or raising drops the slide, matching the existing
+    behaviour of skipping slides that fail to process.
+
+    Work in the stage threads is stopped through cancellation tokens: a timed
+    out stage call has its token cancelled and its thread is waited for before
+    the worker takes the next slide, and cancelling the pipeline cancels every
+    call in flight.
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 2,
+                 cancel_token: Optional[CancellationToken] = None):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.cancel_token = cancel_token
+        self.stage_timings: Dict[str, float] = {}
+
+    async def run(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run all items through the pipeline, returning successful results in input order"""
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results: Dict[int, Dict[str, Any]] = {}
+        self.stage_timings = {stage.name: 0.0 for stage in self.stages}
+
+        for stage in self.stages:
+            stage.open()
+
+        run_token = self.cancel_token.child() if self.cancel_token else CancellationToken()
+        tasks = []
+        try:
+            tasks.append(asyncio.create_task(self._feed(items, queues[0])))
+            for index, stage in enumerate(self.stages):
+                out_queue = queues[index + 1] if index + 1 < len(queues) else None
+                tasks.append(asyncio.create_task(
+                    self._run_stage(stage, queues[index], out_queue, results, run_token)
+                ))
+
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the stage threads too, not just the tasks waiting on them
+            run_token.cancel("slide pipeline cancelled")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            run_token.close()
+            for stage in self.stages:
+                stage.close()
+
+        timings = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in self.stage_timings.items())
+        logger.info(f"Slide pipeline finished: {len(results)}/{len(items)} slides ({timings})")
+        return [results[i] for i in sorted(results)]
+
+    async def _feed(self, items: List[Dict[str, Any]], queue: asyncio.Queue):
+        for position, item in enumerate(items):
+            await queue.put((position, item))
+        await queue.put(_END)
+
+    async def _run_stage(self, stage: PipelineStage, in_queue: asyncio.Queue,
+                         out_queue: Optional[asyncio.Queue], results: Dict[int, Dict[str, Any]],
+                         run_token: CancellationToken):
+        """Run the workers of one stage, then signal the end of stream downstream"""
+        workers = [
+            asyncio.create_task(self._stage_worker(stage, in_queue, out_queue, results, run_token))
+            for _ in range(stage.workers)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        if out_queue is not None:
+            await out_queue.put(_END)
+
+    async def _stage_worker(self, stage: PipelineStage, in_queue: asyncio.Queue,
+                            out_queue: Optional[asyncio.Queue], results: Dict[int, Dict[str, Any]],
+                            run_token: CancellationToken):
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await in_queue.get()
+            if entry is _END:
+                # Let sibling workers of this stage see the end marker too
+                await in_queue.put(_END)
+                return
+
+            position, item = entry
+            if run_token.cancelled:
+                # Drain the queue without starting work that would be cancelled right away
+                continue
+            start_time = time.time()
+            token = run_token.child()
+            future = loop.run_in_executor(stage.executor, stage.func, item, token)
+            # Its error is expected, and may arrive after this worker was cancelled
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            try:
+                # Shielded: on timeout the thread is stopped through its token, then waited for
+                item = await asyncio.wait_for(asyncio.shield(future), timeout=stage.timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Stage '{stage.name}' timed out for slide {position + 1}")
+                token.cancel(f"stage '{stage.name}' timed out")
+                await self._wait_released(stage, future, position)
+                item = None
+            except asyncio.CancelledError:
+                # Stop the thread, which outlives the cancelled worker otherwise
+                token.cancel("slide pipeline cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Stage '{stage.name}' failed for slide {position + 1}: {e}")
+                item = None
+            finally:
+                token.close()
+                self.stage_timings[stage.name] += time.time() - start_time
+
+            if item is None:
+                continue
+
+            if out_queue is not None:
+                await out_queue.put((position, item))
+            else:
+                results[position] = item
+
+    @staticmethod
+    async def _wait_released(stage: PipelineStage, future: asyncio.Future, position: int):
+        """Wait for a cancelled stage call to return, so its thread is free before the next slide"""
+        done, _ = await asyncio.wait({future}, timeout=STAGE_RELEASE_TIMEOUT)
+        if not done:
+            logger.warning(
+                f"Stage '{stage.name}' is still busy with slide {position + 1} "
+                f"{STAGE_RELEASE_TIMEOUT}s after it was cancelled"
+            )
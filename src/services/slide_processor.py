@@ -3,9 +3,11 @@ Slide processing utilities for video generation
 """
 import os
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from .image_generator import ImageGenerator
 from .content_formatter import ContentFormatter
+from . import frame_store
+from src.utils.cancellation import CancellationToken
 from src.utils.logger import logger
 
 class SlideProcessor:
@@ -20,78 +22,116 @@ class SlideProcessor:
         """
         Process all images for a slide
         """
-        keywords = slide.get('image_keywords', [])
+        content_image = self.render_content_image(slide, temp_dir, slide_id, image_resolution, add_disclaimer, language)
+        source_images = self.source_slide_images(slide, temp_dir, slide_id, image_resolution)
+        return self.assemble_slide_result(slide, temp_dir, slide_id, content_image, source_images, image_resolution)
+
+    def render_content_image(self, slide: Dict[str, Any], temp_dir: str, slide_id: int, image_resolution: tuple = (1280, 720),
+                             add_disclaimer: bool = False, language: str = "vietnamese",
+                             frame_dir: Optional[str] = None, template_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Render the main content image of a slide with the template engine (CPU bound)
+        """
         title = slide.get('title', '')
         content = slide.get('content', [])
-        tts_script = slide.get('tts_script', '')
         temp_dir = os.path.normpath(temp_dir)
 
         if len(content) > 10:
             content = content[:10]
             logger.warning(f"Slide {slide_id} content truncated from {len(slide.get('content', []))} to 10 elements")
 
-        # Calculate content duration for display
-        content_duration = self.content_formatter.calculate_content_display_duration(tts_script)
-        
-        result = {
-            'images': [],
-            'content_duration': content_duration,
-            'total_images': 0
-        }
+        content_duration = self.content_formatter.calculate_content_display_duration(slide.get('tts_script', ''))
 
-        # 1. Create main content image with smart template selection
-        content_image_path = os.path.normpath(os.path.join(temp_dir, f"content_{slide_id}.jpg"))
+        # Content image is handed to the encoder as a raw rgb24 frame, no image codec in between
+        content_image_path = frame_store.new_frame_path(f"content_{slide_id}", frame_dir)
         try:
             # Smart template selection based on slide position and content type
             content_type = "normal"  # You can make this dynamic based on slide content
             
-            self.image_generator.create_content_image(
+            # The frame may land outside shared memory when that is full
+            content_image_path = self.image_generator.create_content_image(
                 title, content, content_image_path, image_resolution, 
-                content_type, add_disclaimer, slide_id, language
+                content_type, add_disclaimer, slide_id, language, template_name
             )
             
             if os.path.exists(content_image_path):
-                result['images'].append({
+                return {
                     'path': content_image_path,
                     'type': 'content',
-                    'duration': content_duration
-                })
+                    'duration': content_duration,
+                    'pix_fmt': frame_store.FRAME_PIX_FMT,
+                    'size': tuple(image_resolution)
+                }
         except Exception as e:
             logger.warning(f"Content image creation failed for slide {slide_id}: {e}")
-        
-        generated_image_path = None
-        if keywords:
-            ai_prompt = keywords[0] 
-            
-            image_path = os.path.join(temp_dir, f"ai_{slide_id}_{uuid.uuid4().hex[:8]}.png")
-            generated_image_path = self.image_generator.generate_ai_image(
-                prompt=ai_prompt,
-                output_path=image_path,
-                aspect_ratio="16:9",
-            )
+        return None
+
+    def source_slide_images(self, slide: Dict[str, Any], temp_dir: str, slide_id: int,
+                            image_resolution: tuple = (1280, 720),
+                            cancel_token: Optional[CancellationToken] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch illustration images for a slide: Vertex AI first, Unsplash as fallback (I/O bound)
+        """
+        keywords = slide.get('image_keywords', [])
+        temp_dir = os.path.normpath(temp_dir)
+        images = []
 
-            if generated_image_path:
-                result['images'].append({
-                    'path': generated_image_path,
-                    'type': 'ai_generated',
-                    'duration': 3.0
-                })
+        if not keywords:
+            return images
 
-        # 2. Get up to 1 Unsplash image (optimized)
-        if not generated_image_path and keywords and len(result['images']) < 2:
-            try:
-                image_url = self.image_generator.get_unsplash_image_url(keywords[1])
-                if image_url:
-                    image_path = os.path.join(temp_dir, f"unsplash_{slide_id}_{uuid.uuid4().hex[:8]}.jpg")
-                    downloaded_path = self.image_generator.download_and_resize_image(image_url, image_path, image_resolution)
-                    if downloaded_path and os.path.exists(downloaded_path):
-                        result['images'].append({
-                            'path': downloaded_path,
-                            'type': 'unsplash',
-                            'duration': 3.0
-                        })
-            except Exception as e:
-                logger.warning(f"Unsplash processing failed for slide {slide_id}: {e}")
+        ai_prompt = keywords[0]
+        image_path = os.path.join(temp_dir, f"ai_{slide_id}_{uuid.uuid4().hex[:8]}.png")
+        generated_image_path = self.image_generator.generate_ai_image(
+            prompt=ai_prompt,
+            output_path=image_path,
+            aspect_ratio="16:9",
+        )
+
+        if generated_image_path:
+            images.append({
+                'path': generated_image_path,
+                'type': 'ai_generated',
+                'duration': 3.0
+            })
+            return images
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        # Get up to 1 Unsplash image (optimized)
+        try:
+            image_url = self.image_generator.get_unsplash_image_url(keywords[1])
+            if image_url:
+                image_path = os.path.join(temp_dir, f"unsplash_{slide_id}_{uuid.uuid4().hex[:8]}.jpg")
+                downloaded_path = self.image_generator.download_and_resize_image(image_url, image_path, image_resolution)
+                if downloaded_path and os.path.exists(downloaded_path):
+                    images.append({
+                        'path': downloaded_path,
+                        'type': 'unsplash',
+                        'duration': 3.0
+                    })
+        except Exception as e:
+            logger.warning(f"Unsplash processing failed for slide {slide_id}: {e}")
+
+        return images
+
+    def assemble_slide_result(self, slide: Dict[str, Any], temp_dir: str, slide_id: int,
+                              content_image: Optional[Dict[str, Any]], source_images: List[Dict[str, Any]],
+                              image_resolution: tuple = (1280, 720)) -> Dict[str, Any]:
+        """
+        Combine the content image and illustration images, creating a fallback if nothing is available
+        """
+        title = slide.get('title', '')
+        temp_dir = os.path.normpath(temp_dir)
+
+        # Calculate content duration for display
+        content_duration = self.content_formatter.calculate_content_display_duration(slide.get('tts_script', ''))
+        
+        result = {
+            'images': ([content_image] if content_image else []) + list(source_images),
+            'content_duration': content_duration,
+            'total_images': 0
+        }
 
         # Fallback if no images were created
         if not result['images']:
@@ -178,3 +218,11 @@ class SlideProcessor:
     def set_template_preference(self, template_name: str) -> bool:
         """Set user template preference"""
         return self.image_generator.set_user_template_preference(template_name)
+
+    def plan_templates(self, slide_seeds: List[str]) -> List[str]:
+        """Assign templates to all slides of a video, one seed per slide (see slide_template_seed)"""
+        return self.image_generator.plan_templates(slide_seeds)
+
+    def set_render_executor(self, executor) -> None:
+        """Render content images on the given executor (e.g. a process pool)"""
+        self.image_generator.set_render_executor(executor)
@@ -0,0 +1,83 @@
+"""
+Scatter/gather of per-slide segment renders across product workers
+
+The coordinating worker publishes render sub-tasks for some of a lesson's
+slides to the render queue. Any product worker (including the coordinator)
+renders the slide, uploads the segment to blob storage and replies. The
+coordinator downloads the segments and concatenates them with the slides it
+rendered itself. Sub-tasks that fail or time out are rendered locally.
+"""
+import os
+import asyncio
+from typing import Dict, Any, List, Tuple
+from src.models.task_messages import TaskType
+from src.utils.logger import logger
+
+# Lessons with fewer slides left to render than this are rendered locally
+SCATTER_MIN_SLIDES = int(os.getenv("SCATTER_MIN_SLIDES", "4"))
+# Slides the coordinator keeps for its own pipeline while peers render the rest
+SCATTER_LOCAL_SLIDES = int(os.getenv("SCATTER_LOCAL_SLIDES", "2"))
+# Seconds to wait for a peer's segment before rendering the slide locally
+SCATTER_SLIDE_TIMEOUT = float(os.getenv("SCATTER_SLIDE_TIMEOUT", "180"))
+
+SEGMENT_BLOB_PREFIX = "render-segments"
+
+
+def segment_blob_name(job_id: str, slide_index: int, segment_key: str) -> str:
+    return f"{SEGMENT_BLOB_PREFIX}/{job_id}/slide_{slide_index}_{segment_key[:16]}.mp4"
+
+
+class SlideScatter:
+    """Sends slide renders to peer workers and collects the resulting segments"""
+
+    def __init__(self, publisher, blob_service, blob_container: str, routing_key: str,
+                 timeout: float = SCATTER_SLIDE_TIMEOUT):
+        self.publisher = publisher
+        self.blob_service = blob_service
+        self.blob_container = blob_container
+        self.routing_key = routing_key
+        self.timeout = timeout
+
+    @staticmethod
+    def split(pending: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split the slides still to render into (local, remote)"""
+        if len(pending) < SCATTER_MIN_SLIDES:
+            return pending, []
+        return pending[:SCATTER_LOCAL_SLIDES], pending[SCATTER_LOCAL_SLIDES:]
+
+    async def render_remote(self, job_id: str, ctx: Dict[str, Any], request: Dict[str, Any]) -> bool:
+        """
+        Have a peer render one slide into ctx['video_path'].
+
+        Returns False when the slide has to be rendered locally instead.
+        """
+        slide_index = ctx['slide_index']
+        blob_name = segment_blob_name(job_id, slide_index, ctx['segment_key'])
+        body = dict(request, jobId=job_id, taskType=TaskType.RENDER_SLIDE.value, segmentBlobName=blob_name)
+
+        try:
+            reply = await self.publisher.request(self.routing_key, body, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Remote render of slide {slide_index + 1} timed out after {self.timeout:.0f}s")
+            return False
+        except Exception as e:
+            logger.warning(f"Remote render of slide {slide_index + 1} could not be dispatched: {e}")
+            return False
+
+        if not reply.get("success"):
+            logger.warning(f"Remote render of slide {slide_index + 1} failed on {reply.get('workerId', 'peer')}")
+            return False
+
+        segment_path = os.path.normpath(os.path.join(ctx['temp_dir'], f"segment_{ctx['slide_id']}.mp4"))
+        try:
+            await self.blob_service.download_file(self.blob_container, blob_name, segment_path)
+        except Exception as e:
+            logger.warning(f"Could not fetch remote segment for slide {slide_index + 1}: {e}")
+            return False
+        finally:
+            await self.blob_service.delete_blob(self.blob_container, blob_name)
+
+        ctx['video_path'] = segment_path
+        ctx['cacheable'] = bool(reply.get("cacheable"))
+        logger.info(f"Slide {slide_index + 1} rendered by {reply.get('workerId', 'peer')}")
+        return True
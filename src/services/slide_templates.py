@@ -1,94 +1,120 @@
 """
 Slide Templates for beautiful video generation
 """
-from typing import Dict, List, Any
-from PIL import Image, ImageDraw, ImageFont
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Tuple, Optional
+from PIL import Image, ImageDraw, ImageColor
 import os
+import json
 import random
+import hashlib
+import threading
+import numpy as np
 from src.utils.logger import logger
+from src.services import text_layout, frame_store
 
-class SlideTemplate:
+# Static background layers per (template class, size), shared by all template instances in the process
+_background_cache: Dict[Tuple[str, tuple], Image.Image] = {}
+_background_lock = threading.Lock()
+
+
+def slide_template_seed(slide: Dict[str, Any]) -> str:
+    """Seed of a slide's template draw, from its own text so an unchanged slide keeps its template across jobs"""
+    payload = json.dumps(
+        [slide.get('title', ''), slide.get('content', []), slide.get('tts_script', '')],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SlideTemplate(ABC):
     """Base class for slide templates"""
+
+    # Fill of the background layer before draw_background runs
+    background_color = '#ffffff'
     
     def __init__(self):
         self.is_windows = os.name == 'nt'
-    
-    def get_fonts(self, title_size: int = 48, content_size: int = 32):
-        """Get fonts with fallback"""
-        try:
-            if self.is_windows:
-                font_path = "arial.ttf"
-            elif os.path.exists("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"):
-                font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-            elif os.path.exists("/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf"):
-                font_path = "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf"
-            else:
-                font_path = None
 
-            if font_path:
-                title_font = ImageFont.truetype(font_path, title_size)
-                content_font = ImageFont.truetype(font_path, content_size)
-            else:
-                raise Exception("Font not found")
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
+        """Draw the static part of the slide. It must only depend on the template and size."""
 
-        except Exception as e:
-            logger.warning(f"Font load failed: {e}")
-            title_font = ImageFont.load_default()
-            content_font = ImageFont.load_default()
+    @abstractmethod
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        """Render the slide as an in-memory RGB image"""
+
+    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
+        """Render the slide and save it as a JPEG file"""
+        img = self.render(title, contents, size)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        img.save(output_path, 'JPEG', quality=95)
+        return output_path
 
-        return title_font, content_font
+    def build_background(self, size: tuple) -> Image.Image:
+        """Build the static background layer"""
+        img = Image.new('RGB', size, color=self.background_color)
+        self.draw_background(img, ImageDraw.Draw(img), size)
+        return img
+
+    def get_background(self, size: tuple) -> Image.Image:
+        """Get a copy of the cached background layer to draw the slide text on"""
+        key = (type(self).__name__, tuple(size))
+        with _background_lock:
+            background = _background_cache.get(key)
+        if background is None:
+            background = self.build_background(tuple(size))
+            with _background_lock:
+                background = _background_cache.setdefault(key, background)
+        return background.copy()
+
+    @staticmethod
+    def vertical_gradient(size: tuple, top: tuple, bottom: tuple) -> np.ndarray:
+        """RGB array fading from top to bottom color, row by row"""
+        alpha = (np.arange(size[1], dtype=np.float32) / size[1])[:, None]
+        rows = (np.array(top, dtype=np.float32) + alpha * (np.array(bottom, dtype=np.float32) - np.array(top, dtype=np.float32)))
+        rows = rows.astype(np.uint8)
+        return np.repeat(rows[:, None, :], size[0], axis=1)
+
+    @staticmethod
+    def draw_grid(arr: np.ndarray, spacing: int, color: str):
+        """Draw 1px vertical and horizontal grid lines every `spacing` pixels"""
+        rgb = ImageColor.getrgb(color)
+        arr[:, ::spacing] = rgb
+        arr[::spacing, :] = rgb
+    
+    def get_fonts(self, title_size: int = 48, content_size: int = 32):
+        """Get fonts from the shared font registry"""
+        return text_layout.get_font(title_size), text_layout.get_font(content_size)
     
     def wrap_text(self, draw, text: str, font, max_width: int) -> List[str]:
         """Smart text wrapping"""
-        words = text.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            if bbox[2] - bbox[0] <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    lines.append(word)
-        
-        if current_line:
-            lines.append(' '.join(current_line))
-        return lines
+        return text_layout.wrap_text(text, font, max_width)
 
 class ModernBlueTemplate(SlideTemplate):
     """Modern blue professional template"""
-    
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#0f172a')  # Dark navy
-        draw = ImageDraw.Draw(img)
-        
-        # Modern gradient
-        for y in range(size[1]):
-            alpha = y / size[1]
-            r = int(15 + alpha * 30)   # 15-45
-            g = int(23 + alpha * 60)   # 23-83  
-            b = int(42 + alpha * 100)  # 42-142
-            draw.line([(0, y), (size[0], y)], fill=(r, g, b))
-        
+
+    background_color = '#0f172a'  # Dark navy
+
+    def build_background(self, size: tuple) -> Image.Image:
+        # Modern gradient: (15, 23, 42) -> (45, 83, 142)
+        arr = self.vertical_gradient(size, (15, 23, 42), (45, 83, 142))
+
+        # Diagonal lines every 80px: pixels where x - y is on the line grid
         line_spacing = 80
-        line_color = '#1e3a8a'
-        line_width = 1
-        
-        for i in range(-size[1], size[0], line_spacing):
-            start_x = i
-            start_y = 0
-            end_x = i + size[1]
-            end_y = size[1]
-            draw.line([(start_x, start_y), (end_x, end_y)], fill=line_color, width=line_width)
-        
+        ys, xs = np.indices((size[1], size[0]))
+        arr[(xs - ys + size[1]) % line_spacing == 0] = ImageColor.getrgb('#1e3a8a')
+
+        img = Image.fromarray(arr, 'RGB')
+        draw = ImageDraw.Draw(img)
+
         # Accent shapes (keep existing)
         draw.ellipse([size[0]-200, -100, size[0]+100, 200], fill='#1e40af', outline=None)
         draw.rectangle([0, size[1]-80, size[0], size[1]], fill='#1e3a8a')
+        return img
+    
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
         
         title_font, content_font = self.get_fonts(40, 26)
         
@@ -120,18 +146,15 @@ class ModernBlueTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#e2e8f0')
                 content_y += 38
             content_y += 10
-        
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class MinimalGreenTemplate(SlideTemplate):
     """Clean minimal green template"""
 
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#f8fafc')  # Very light gray
-        draw = ImageDraw.Draw(img)
+    background_color = '#f8fafc'  # Very light gray
+    header_height = 120
 
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         grid_size = 50
         dot_color = '#d1d5db'
         dot_radius = 1
@@ -142,12 +165,16 @@ class MinimalGreenTemplate(SlideTemplate):
                 draw.ellipse([x-dot_radius, y-dot_radius, x+dot_radius, y+dot_radius], fill=dot_color)
 
         # Header band - increase height
-        header_height = 120
-        draw.rectangle([0, 0, size[0], header_height], fill='#059669')
+        draw.rectangle([0, 0, size[0], self.header_height], fill='#059669')
 
         # # Side accent bar
         # draw.rectangle([0, header_height, 8, size[1]], fill='#10b981')
 
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
+        header_height = self.header_height
+
         title_font, content_font = self.get_fonts(40, 26)
 
         # Draw title - center vertically within header
@@ -179,27 +206,31 @@ class MinimalGreenTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#374151')
                 content_y += 40
             content_y += 8
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class DarkModeTemplate(SlideTemplate):
     """Modern dark mode template"""
-    
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#111827')  # Dark gray
-        draw = ImageDraw.Draw(img)
-        
+
+    background_color = '#111827'  # Dark gray
+
+    def build_background(self, size: tuple) -> Image.Image:
+        arr = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        arr[:] = ImageColor.getrgb(self.background_color)
+
         # Subtle grid pattern
-        for x in range(0, size[0], 40):
-            draw.line([(x, 0), (x, size[1])], fill='#1f2937', width=1)
-        for y in range(0, size[1], 40):
-            draw.line([(0, y), (size[0], y)], fill='#1f2937', width=1)
-        
+        self.draw_grid(arr, 40, '#1f2937')
+
+        img = Image.fromarray(arr, 'RGB')
+        draw = ImageDraw.Draw(img)
+
         # Accent elements
         draw.ellipse([size[0]-150, size[1]-150, size[0]+50, size[1]+50], fill='#7c3aed')
         draw.rectangle([0, 0, 6, size[1]], fill='#a855f7')
+        return img
+    
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
         
         title_font, content_font = self.get_fonts(40, 26)
         
@@ -233,22 +264,22 @@ class DarkModeTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#d1d5db')
                 content_y += 38
             content_y += 12
-        
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class CreativeOrangeTemplate(SlideTemplate):
     """Creative orange template with shapes"""
-    
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#fef3c7')  # Light orange
-        draw = ImageDraw.Draw(img)
-        
+
+    background_color = '#fef3c7'  # Light orange
+
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         # Creative shapes
         draw.ellipse([size[0]-300, -100, size[0]+100, 300], fill='#f59e0b')
         draw.ellipse([size[0]-250, -50, size[0]+50, 250], fill='#fbbf24')
         draw.polygon([(0, 0), (200, 0), (150, 150), (0, 100)], fill='#d97706')
+    
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
         
         title_font, content_font = self.get_fonts(40, 26)
         
@@ -287,33 +318,32 @@ class CreativeOrangeTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#78350f')
                 content_y += 40
             content_y += 8
-        
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class CleanWhiteTemplate(SlideTemplate):
     """Clean and professional white template with subtle accents."""
-    
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#ffffff')  # Pure white background
+
+    background_color = '#ffffff'  # Pure white background
+
+    def build_background(self, size: tuple) -> Image.Image:
+        arr = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        arr[:] = ImageColor.getrgb(self.background_color)
+        self.draw_grid(arr, 40, '#f5f5f5')
+
+        img = Image.fromarray(arr, 'RGB')
         draw = ImageDraw.Draw(img)
-        
-        grid_size = 40
-        grid_color = '#f5f5f5'
-        
-        for x in range(0, size[0], grid_size):
-            draw.line([(x, 0), (x, size[1])], fill=grid_color, width=1)
-        
-        for y in range(0, size[1], grid_size):
-            draw.line([(0, y), (size[0], y)], fill=grid_color, width=1)
-        
+
         # Subtle light gray footer/header
         draw.rectangle([0, 0, size[0], 20], fill='#e0e0e0')
         draw.rectangle([0, size[1]-20, size[0], size[1]], fill='#e0e0e0')
 
         # A thin accent line on the left
         draw.rectangle([0, 0, 10, size[1]], fill='#4285F4') # Google Blue-ish
+        return img
+    
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
 
         title_font, content_font = self.get_fonts(40, 26)
         
@@ -350,25 +380,24 @@ class CleanWhiteTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#555555') # Medium gray text
                 content_y += 40
             content_y += 15
-
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 
 class BlueAccentTemplate(SlideTemplate):
     """Template designed to mimic the provided image with a large blue accent."""
-    
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#0F172A')  # Deep navy background
-        draw = ImageDraw.Draw(img)
 
+    background_color = '#0F172A'  # Deep navy background
+
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         # Accent shape (big ellipse on right)
         accent = Image.new("RGBA", size, (0, 0, 0, 0))
         accent_draw = ImageDraw.Draw(accent)
         accent_draw.ellipse([size[0] - 450, -100, size[0] + 250, size[1] // 2 + 200], fill=(99, 102, 241, 90))  # blur-style shape
         img.paste(accent, (0, 0), accent)
+    
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
 
         title_font, content_font = self.get_fonts(40, 26)
 
@@ -404,18 +433,14 @@ class BlueAccentTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#E2E8F0')
                 content_y += 38
             content_y += 12
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class GeometricAccentTemplate(SlideTemplate):
     """Modern template with strong geometric accents."""
-    
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#f0f2f5') # Light gray background
-        draw = ImageDraw.Draw(img)
-        
+
+    background_color = '#f0f2f5' # Light gray background
+
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         # Large triangle accent in top-left
         draw.polygon([(0, 0), (size[0] // 4, 0), (0, size[1] // 4)], fill='#EF4444') # Red accent
         
@@ -424,6 +449,10 @@ class GeometricAccentTemplate(SlideTemplate):
         
         # Thin line at the bottom
         draw.rectangle([0, size[1]-10, size[0], size[1]], fill='#3B82F6') # Blue accent
+    
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
         
         title_font, content_font = self.get_fonts(40, 26)
         
@@ -462,24 +491,23 @@ class GeometricAccentTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#4B5563') # Darker gray text
                 content_y += 40
             content_y += 15
-
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 
 class NatureGreenTemplate(SlideTemplate):
     """Modern, clean template with green tones — no font size change."""
 
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#F0FDF4')  # Gentle mint background
-        draw = ImageDraw.Draw(img)
+    background_color = '#F0FDF4'  # Gentle mint background
 
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         # Subtle decoration — remove gradient, keep soft ellipses
         draw.ellipse([size[0] - 220, -100, size[0] + 100, 160], fill='#A7F3D0')  # Top-right soft green
         draw.ellipse([-120, size[1] - 220, 100, size[1] + 40], fill='#6EE7B7')   # Bottom-left green
 
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
+
         # Get fonts (keep sizes as before)
         title_font, content_font = self.get_fonts(40, 26)
 
@@ -517,18 +545,21 @@ class NatureGreenTemplate(SlideTemplate):
                 content_y += 40
 
             content_y += 15  # Space between content items
-
-        # Save image
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 
 class ModernQuestionSlideTemplate(SlideTemplate):
     """Modern, professional question slide with clean layout and consistent style."""
 
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='white')
+    background_color = 'white'
+
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
+        # --- DESIGN: Left accent bar
+        accent_bar_width = 6
+        draw.rectangle([60, 60, 60 + accent_bar_width, size[1] - 60], fill='#3B82F6')
+
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
         draw = ImageDraw.Draw(img)
 
         # Fonts
@@ -539,10 +570,6 @@ class ModernQuestionSlideTemplate(SlideTemplate):
         margin_right = 100
         max_title_width = size[0] - margin_left - margin_right
 
-        # --- DESIGN: Left accent bar
-        accent_bar_width = 6
-        draw.rectangle([60, 60, 60 + accent_bar_width, size[1] - 60], fill='#3B82F6')
-
         # --- Title
         if len(title) > 80:
             title = title[:77] + "..."
@@ -584,10 +611,7 @@ class ModernQuestionSlideTemplate(SlideTemplate):
                     y_text += content_font.getbbox(line)[3] - content_font.getbbox(line)[1] + line_spacing
 
             y_text += 15  # Extra spacing
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class ElegantCardTemplate(SlideTemplate):
     """
@@ -596,15 +620,16 @@ class ElegantCardTemplate(SlideTemplate):
     to maximize content area.
     """
 
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        BG_COLOR = '#FDF8F5'
+    background_color = '#FDF8F5'
+
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
         CARD_COLOR = '#FFFFFF'
         TEXT_PRIMARY_COLOR = '#4A4A4A'
         TEXT_SECONDARY_COLOR = '#6E6E6E'
         ACCENT_COLOR = '#E87A5D'
         SHADOW_COLOR = '#D1C7C2'
 
-        img = Image.new('RGB', size, color=BG_COLOR)
+        img = self.get_background(size)
         draw = ImageDraw.Draw(img)
 
         width, height = size
@@ -669,21 +694,22 @@ class ElegantCardTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill=TEXT_SECONDARY_COLOR)
                 content_y += line_spacing
             content_y += 10
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
 
 class ModernEduTemplate(SlideTemplate):
     """Modern, clean education slide template"""
 
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        img = Image.new('RGB', size, color='#f1f5f9')  # Soft light blue-gray
-        draw = ImageDraw.Draw(img)
+    background_color = '#f1f5f9'  # Soft light blue-gray
+    header_height = 110
 
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         # Header bar
-        header_height = 110
-        draw.rectangle([0, 0, size[0], header_height], fill='#1e3a8a')  # Navy blue
+        draw.rectangle([0, 0, size[0], self.header_height], fill='#1e3a8a')  # Navy blue
+
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
+        header_height = self.header_height
 
         title_font, content_font = self.get_fonts(40, 26)
 
@@ -718,22 +744,23 @@ class ModernEduTemplate(SlideTemplate):
                 draw.text((x, content_y), line, font=content_font, fill='#1f2937')  # Slate text
                 content_y += line_spacing
             content_y += 10
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, 'JPEG', quality=95)
-        return output_path
+        return img
     
 class FocusBlockEducationTemplate(SlideTemplate):
     """Split-style professional slide with a colored block for title"""
 
-    def create(self, title: str, contents: List[str], output_path: str, size: tuple = (1280, 720)) -> str:
-        width, height = size
-        img = Image.new('RGB', size, color='#ffffff')  # White background
-        draw = ImageDraw.Draw(img)
+    background_color = '#ffffff'  # White background
+    block_width = 380
 
+    def draw_background(self, img: Image.Image, draw: ImageDraw.ImageDraw, size: tuple):
         # Left block background
-        block_width = 380
-        draw.rectangle([0, 0, block_width, height], fill='#004d40')  # Dark teal
+        draw.rectangle([0, 0, self.block_width, size[1]], fill='#004d40')  # Dark teal
+
+    def render(self, title: str, contents: List[str], size: tuple = (1280, 720)) -> Image.Image:
+        width, height = size
+        img = self.get_background(size)
+        draw = ImageDraw.Draw(img)
+        block_width = self.block_width
 
         # Fonts
         title_font, content_font = self.get_fonts(38, 26)
@@ -761,10 +788,7 @@ class FocusBlockEducationTemplate(SlideTemplate):
                 draw.text((x, content_y), f"{bullet} {line}".strip(), font=content_font, fill='#263238')
                 content_y += spacing
             content_y += 10
-
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        img.save(output_path, "JPEG", quality=95)
-        return output_path
+        return img
 
 class SlideTemplateManager:
     """Manager for slide templates with smart selection"""
@@ -794,6 +818,7 @@ class SlideTemplateManager:
     }
     
     def __init__(self):
+        self.render_executor = None
         self.templates = {
             'modern_blue': ModernBlueTemplate(),
             'minimal_green': MinimalGreenTemplate(),
@@ -869,60 +894,101 @@ class SlideTemplateManager:
         self.slide_counter += 1
         return self.current_template
     
+    def plan_templates(self, slide_seeds: List[str],
+                       content_types: Optional[List[str]] = None) -> List[str]:
+        """
+        Assign a template to every slide of a video up front.
+
+        Follows the same rules as select_next_template (user preference on the
+        first slide, content-type suggestions, no template twice in a row) but
+        does not touch the manager state, so slides can be rendered in any order
+        or in parallel. Each slide ranks the templates with a generator seeded by
+        its own seed (slide_template_seed) and takes the first one its
+        predecessor does not use. A slide that did not change keeps its template,
+        and its cached segment, in any job, unless the slide before it switched
+        to that very template.
+        """
+        plan = []
+        previous = None
+
+        for index, seed in enumerate(slide_seeds):
+            content_type = content_types[index] if content_types and index < len(content_types) else "normal"
+
+            if index == 0 and self.user_choice_template:
+                template_name = self.user_choice_template
+            else:
+                ranked = list(self.CONTENT_TYPE_TEMPLATES.get(content_type, list(self.templates.keys())))
+                random.Random(seed).shuffle(ranked)
+                template_name = next((t for t in ranked if t != previous), previous or self.current_template)
+
+            plan.append(template_name)
+            previous = template_name
+
+        logger.info(f"Template plan for {len(slide_seeds)} slides: {plan}")
+        return plan
+
     def create_slide_image(self, title: str, contents: List[str], output_path: str, 
                           size: tuple = (1280, 720), content_type: str = "normal", 
-                          add_disclaimer: bool = False, slide_id: int = None, language: str = "vietnamese") -> str:
-        """Main method to create slide image with smart template selection"""
+                          add_disclaimer: bool = False, slide_id: int = None, language: str = "vietnamese",
+                          template_name: Optional[str] = None) -> str:
+        """
+        Main method to create slide image with smart template selection.
+
+        With a template_name from plan_templates the render is a pure function
+        of its arguments; without one the next template is picked from the
+        shared selection state.
+        """
         
         is_first_slide = (slide_id == 1) if slide_id is not None else (self.slide_counter == 0)
         
-        self.select_next_template(content_type)
-        
-        # Create image
-        template = self.templates[self.current_template]
-        result_path = template.create(title, contents, output_path, size)
-        
-        # Add disclaimer for first slide - use slide_id for thread safety
-        if add_disclaimer and is_first_slide:
-            logger.info(f"Adding disclaimer to slide {slide_id or 'first'}...")
-            result_path = self._add_disclaimer(result_path, size, language)
+        if template_name not in self.templates:
+            template_name = self.select_next_template(content_type)
+        with_disclaimer = add_disclaimer and is_first_slide
+
+        # Render in the process pool when one is attached, only file paths cross the process boundary
+        if self.render_executor is not None:
+            try:
+                return self.render_executor.submit(
+                    render_slide_image, template_name, title, contents, output_path, size, with_disclaimer, language
+                ).result()
+            except Exception as e:
+                logger.warning(f"Process pool render failed for slide {slide_id}, rendering in-process: {e}")
+
+        return self.render_template(template_name, title, contents, output_path, size, with_disclaimer, language)
+
+    def render_template(self, template_name: str, title: str, contents: List[str], output_path: str,
+                        size: tuple = (1280, 720), add_disclaimer: bool = False, language: str = "vietnamese") -> str:
+        """
+        Render a slide with a given template, without touching the selection state.
+
+        The slide stays in memory until it is written: as a raw rgb24 frame when
+        output_path is a frame path, as a JPEG otherwise.
+        """
+        template = self.templates[template_name]
+        img = template.render(title, contents, size)
         
-        return result_path
+        # Add disclaimer for first slide
+        if add_disclaimer:
+            logger.info("Adding disclaimer to first slide...")
+            img = self._add_disclaimer(img, size, language)
+
+        if frame_store.is_raw_frame(output_path):
+            return frame_store.write_frame(img, output_path)
 
-    def _add_disclaimer(self, image_path: str, size: tuple, language: str = "vietnamese") -> str:
-        """Add disclaimer to slide image"""
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        img.save(output_path, 'JPEG', quality=95)
+        return output_path
+
+    def set_render_executor(self, executor) -> None:
+        """Attach an executor (e.g. a process pool) used to render slide images"""
+        self.render_executor = executor
+
+    def _add_disclaimer(self, img: Image.Image, size: tuple, language: str = "vietnamese") -> Image.Image:
+        """Add disclaimer to an in-memory slide image"""
         try:
-            img = Image.open(image_path)
             draw = ImageDraw.Draw(img)
             
-            # Get font with better fallback
-            font_size = 18
-            try:
-                if os.name == 'nt':  # Windows
-                    # Try different Windows fonts
-                    for font_name in ["arial.ttf", "calibri.ttf", "segoeui.ttf"]:
-                        try:
-                            font = ImageFont.truetype(font_name, font_size)
-                            break
-                        except:
-                            continue
-                    else:
-                        font = ImageFont.load_default()
-                else:
-                    # Linux/Mac fonts
-                    font_paths = [
-                        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                        "/System/Library/Fonts/Arial.ttf"
-                    ]
-                    font = ImageFont.load_default()
-                    for font_path in font_paths:
-                        if os.path.exists(font_path):
-                            font = ImageFont.truetype(font_path, font_size)
-                            break
-            except Exception as font_error:
-                logger.warning(f"Font loading failed: {font_error}")
-                font = ImageFont.load_default()
+            font = text_layout.get_font(18)
             
             if language == "vietnamese":
                 disclaimer_text = "Hình ảnh trong video mang tính minh họa"
@@ -944,32 +1010,27 @@ class SlideTemplateManager:
             bg_x2 = x + text_width + padding
             bg_y2 = y + text_height + padding
             
-            # Semi-transparent dark background for better contrast
-            overlay = Image.new('RGBA', size, (0, 0, 0, 0))
+            # Semi-transparent dark background, composited only over the box region
+            box = (bg_x1, bg_y1, bg_x2 + 1, bg_y2 + 1)
+            overlay = Image.new('RGBA', (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
             overlay_draw = ImageDraw.Draw(overlay)
             overlay_draw.rounded_rectangle(
-                [bg_x1, bg_y1, bg_x2, bg_y2],
+                [0, 0, bg_x2 - bg_x1, bg_y2 - bg_y1],
                 radius=6, 
                 fill=(0, 0, 0, 180)
             )
-            
-            # Composite overlay onto image
-            img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-            draw = ImageDraw.Draw(img)
+            region = Image.alpha_composite(img.crop(box).convert('RGBA'), overlay).convert('RGB')
+            img.paste(region, box[:2])
             
             # Draw text in bright white for maximum contrast
             draw.text((x, y), disclaimer_text, font=font, fill='white')
             
-            # Save with high quality
-            img.save(image_path, 'JPEG', quality=95, optimize=True)
-            img.close()
-            
             logger.info(f"✅ Added disclaimer to slide: '{disclaimer_text}'")
-            return image_path
+            return img
             
         except Exception as e:
             logger.error(f"❌ Failed to add disclaimer: {e}", exc_info=True)
-            return image_path
+            return img
     
     def reset_for_new_video(self):
         """Reset state for new video generation"""
@@ -992,3 +1053,18 @@ class SlideTemplateManager:
             'slide_count': self.slide_counter,
             'total_templates': len(self.templates)
         }
+
+
+# Template manager of a render worker process, created on first use
+_process_template_manager = None
+
+
+def render_slide_image(template_name: str, title: str, contents: List[str], output_path: str,
+                       size: tuple = (1280, 720), add_disclaimer: bool = False, language: str = "vietnamese") -> str:
+    """Render a slide image with a named template. Module-level so it can run in a process pool."""
+    global _process_template_manager
+    if _process_template_manager is None:
+        _process_template_manager = SlideTemplateManager()
+    return _process_template_manager.render_template(
+        template_name, title, contents, output_path, size, add_disclaimer, language
+    )
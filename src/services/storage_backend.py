@@ -0,0 +1,58 @@
+"""
+Storage backend interface and the factory selecting it from the worker configuration
+"""
+from typing import Protocol, Optional, List, Dict, Any
+from src.config.worker_config import WorkerConfig
+from src.services.azure_blob_service import AzureBlobService
+from src.services.local_storage_service import LocalStorageService
+
+
+class StreamUpload(Protocol):
+    """Blob written piece by piece while its content is produced, visible only once committed"""
+
+    @property
+    def blob_name(self) -> str: ...
+
+    @property
+    def url(self) -> str: ...
+
+    async def write(self, data: bytes): ...
+
+    async def commit(self) -> str: ...
+
+    async def abort(self): ...
+
+
+class StorageBackend(Protocol):
+    """
+    Named blobs grouped in containers.
+
+    Implemented by AzureBlobService and LocalStorageService; handlers and
+    caches only use these methods, so either can back a worker.
+    """
+
+    async def upload_file(self, container_name: str, blob_name: str, file_path: str,
+                          content_type: Optional[str] = None) -> str: ...
+
+    async def upload_content(self, container_name: str, blob_name: str, content: bytes,
+                             content_type: Optional[str] = None) -> str: ...
+
+    async def download_file(self, container_name: str, blob_name: str, local_path: Optional[str] = None) -> str: ...
+
+    async def open_block_upload(self, container_name: str, blob_name: str,
+                                content_type: Optional[str] = None) -> StreamUpload: ...
+
+    async def blob_exists(self, container_name: str, blob_name: str) -> bool: ...
+
+    async def delete_blob(self, container_name: str, blob_name: str) -> bool: ...
+
+    async def list_blobs(self, container_name: str, prefix: Optional[str] = None) -> List[Dict[str, Any]]: ...
+
+    def get_blob_url(self, container_name: str, blob_name: str) -> str: ...
+
+
+def create_storage_backend(config: WorkerConfig) -> StorageBackend:
+    """Storage backend named by STORAGE_BACKEND (from a coroutine: the Azure client binds to the running loop)"""
+    if config.storage_backend == "local":
+        return LocalStorageService(config.local_storage_dir)
+    return AzureBlobService(config.azure_storage_connection_string)
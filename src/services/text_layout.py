@@ -0,0 +1,137 @@
+"""
+Text layout for slide rendering: shared font registry, glyph advance cache and word wrapping
+"""
+import os
+import threading
+import weakref
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from PIL import ImageFont
+from src.utils.logger import logger
+
+# Font files tried in order; Windows resolves bare names from the system font directory
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/System/Library/Fonts/Arial.ttf",
+]
+WINDOWS_FONT_CANDIDATES = ["arial.ttf", "calibri.ttf", "segoeui.ttf"]
+
+FONT_CACHE_SIZE = 64
+
+# Glyph advances per loaded font, dropped together with the font when it leaves the registry
+_advance_cache: "weakref.WeakKeyDictionary[ImageFont.FreeTypeFont, Dict[str, float]]" = weakref.WeakKeyDictionary()
+# Ink extents past the advance box per glyph: (left bearing, right overhang)
+_ink_edge_cache: "weakref.WeakKeyDictionary[ImageFont.FreeTypeFont, Dict[str, Tuple[float, float]]]" = weakref.WeakKeyDictionary()
+_advance_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def resolve_font_path() -> Optional[str]:
+    """Find the first usable font file on this system (checked once per process)"""
+    if os.name == 'nt':
+        for font_name in WINDOWS_FONT_CANDIDATES:
+            try:
+                ImageFont.truetype(font_name, 12)
+                return font_name
+            except OSError:
+                continue
+        return None
+
+    for font_path in FONT_CANDIDATES:
+        if os.path.exists(font_path):
+            return font_path
+    return None
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(size: int, font_path: Optional[str] = None):
+    """Get a font from the process-wide registry, loading it on first use"""
+    font_path = font_path or resolve_font_path()
+    try:
+        if not font_path:
+            raise OSError("Font not found")
+        return ImageFont.truetype(font_path, size)
+    except Exception as e:
+        logger.warning(f"Font load failed: {e}")
+        return ImageFont.load_default()
+
+
+def _per_font(cache: weakref.WeakKeyDictionary, font) -> dict:
+    with _advance_lock:
+        entries = cache.get(font)
+        if entries is None:
+            entries = {}
+            cache[font] = entries
+        return entries
+
+
+def _glyph_advances(font) -> Dict[str, float]:
+    return _per_font(_advance_cache, font)
+
+
+def _ink_edges(char: str, font) -> Tuple[float, float]:
+    """Where a glyph's ink starts left of its origin and ends past its advance"""
+    edges = _per_font(_ink_edge_cache, font)
+    edge = edges.get(char)
+    if edge is None:
+        left, _, right, _ = font.getbbox(char)
+        edge = (left, right - font.getlength(char))
+        edges[char] = edge
+    return edge
+
+
+def text_width(text: str, font) -> float:
+    """Width of text as the sum of its cached glyph advances"""
+    advances = _glyph_advances(font)
+    width = 0.0
+    for char in text:
+        advance = advances.get(char)
+        if advance is None:
+            advance = font.getlength(char)
+            advances[char] = advance
+        width += advance
+    return width
+
+
+def wrap_text(text: str, font, max_width: int) -> List[str]:
+    """
+    Greedy word wrap that measures every word once.
+
+    A line fits when its ink box (as draw.textbbox reports it) is at most
+    max_width: the advance sum, less the first glyph's left bearing, plus
+    the last glyph's overhang. A word wider than max_width ends up on a
+    line of its own.
+    """
+    space_width = text_width(' ', font)
+    lines = []
+    current_line = []
+    current_width = 0.0
+    line_left = 0.0
+
+    for word in text.split():
+        word_width = text_width(word, font)
+        word_left, _ = _ink_edges(word[0], font)
+        _, word_overhang = _ink_edges(word[-1], font)
+        if current_line:
+            candidate_width = current_width + space_width + word_width
+            candidate_left = line_left
+        else:
+            candidate_width = word_width
+            candidate_left = word_left
+        if candidate_width + word_overhang - candidate_left <= max_width:
+            current_line.append(word)
+            current_width = candidate_width
+            line_left = candidate_left
+        elif current_line:
+            lines.append(' '.join(current_line))
+            current_line = [word]
+            current_width = word_width
+            line_left = word_left
+        else:
+            lines.append(word)
+
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines
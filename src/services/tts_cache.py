@@ -0,0 +1,50 @@
+"""
+Content-addressed on-disk cache for synthesized TTS audio
+"""
+import os
+import hashlib
+import json
+import tempfile
+import threading
+from typing import Optional
+from src.services.disk_cache import DiskLRUCache
+from src.utils.logger import logger
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "eduva_tts_cache"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+
+
+class TTSCache(DiskLRUCache):
+    """Stores TTS audio under a hash of everything that affects the synthesized bytes"""
+
+    suffix = ".audio"
+
+    @staticmethod
+    def make_key(text: str, voice_name: str, language_code: str, speaking_rate: float,
+                 sample_rate: int, encoding: str) -> str:
+        """Hash the synthesis inputs into a cache key"""
+        payload = json.dumps(
+            [text, voice_name or "", language_code or "", float(speaking_rate), int(sample_rate or 0), encoding],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_cache: Optional[TTSCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    """Process-wide TTS cache, or None when caching is disabled or the directory is unusable"""
+    global _cache
+    if not TTS_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_MB)
+            except OSError as e:
+                logger.warning(f"TTS cache disabled, cannot use {TTS_CACHE_DIR}: {e}")
+                return None
+        return _cache
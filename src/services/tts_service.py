@@ -11,15 +11,28 @@ from google.cloud import texttospeech
 from moviepy.editor import AudioClip
 import asyncio
 from src.utils.logger import logger
+from src.services.tts_cache import get_tts_cache, TTSCache
+from src.services.pcm_audio import write_silence
+from src.utils.cancellation import CancellationToken
 from google.api_core.exceptions import ServiceUnavailable
 
 MAX_RETRIES = 5
 
+# Output encodings: "mp3" for standalone audio files, "linear16" (16-bit PCM WAV) for audio that is processed further
+AUDIO_ENCODINGS = {
+    "mp3": texttospeech.AudioEncoding.MP3,
+    "linear16": texttospeech.AudioEncoding.LINEAR16,
+}
+
 class TTSService:
     """Google Cloud Text-to-Speech Service"""
     
-    def __init__(self, voice_config: Optional[Dict[str, Any]] = None):
+    def __init__(self, voice_config: Optional[Dict[str, Any]] = None, audio_encoding: str = "mp3"):
         """Initialize TTS Service with voice configuration"""
+        if audio_encoding not in AUDIO_ENCODINGS:
+            raise ValueError(f"Unsupported audio encoding: {audio_encoding}. Available: {list(AUDIO_ENCODINGS)}")
+        self.audio_encoding = audio_encoding
+
         try:
             self.tts_client = texttospeech.TextToSpeechClient()
             logger.info("TTS Service initialized successfully")
@@ -30,10 +43,15 @@ class TTSService:
         # Configure voice settings
         self._setup_voice_config(voice_config or {})
         
+        # Shared on-disk cache of synthesized audio
+        self.cache = get_tts_cache()
+
         # Performance tracking
         self._call_count = 0
         self._total_chars = 0
         self._total_duration = 0.0
+        self._cache_hits = 0
+        self._cache_misses = 0
     
     def _setup_voice_config(self, voice_config: Dict[str, Any]):
         """Setup voice and audio configuration"""
@@ -55,18 +73,32 @@ class TTSService:
         
         # Audio configuration - optimized for performance
         self.audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
+            audio_encoding=AUDIO_ENCODINGS[self.audio_encoding],
             speaking_rate=voice_config.get('speakingRate', 1.1),
             sample_rate_hertz=22050 
         )
 
-    def synthesize_text(self, text: str, output_path: Optional[str] = None) -> str:
-        """Convert text to speech and save as audio file with retry"""
+    def _cache_key(self, text: str) -> str:
+        """Cache key for text synthesized with the current voice and audio config"""
+        voice_name = self.voice.name or f"default-{texttospeech.SsmlVoiceGender(self.voice.ssml_gender).name}"
+        return TTSCache.make_key(
+            text,
+            voice_name,
+            self.voice.language_code,
+            self.audio_config.speaking_rate,
+            self.audio_config.sample_rate_hertz,
+            texttospeech.AudioEncoding(self.audio_config.audio_encoding).name
+        )
+
+    def synthesize_text(self, text: str, output_path: Optional[str] = None,
+                        cancel_token: Optional[CancellationToken] = None) -> str:
+        """Convert text to speech and save as audio file with retry (retries stop when cancel_token is cancelled)"""
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
 
         if output_path is None:
-            fd, output_path = tempfile.mkstemp(suffix='.mp3', prefix='tts_')
+            suffix = '.wav' if self.audio_encoding == "linear16" else '.mp3'
+            fd, output_path = tempfile.mkstemp(suffix=suffix, prefix='tts_')
             os.close(fd)
         else:
             output_dir = os.path.dirname(output_path)
@@ -74,9 +106,21 @@ class TTSService:
                 os.makedirs(output_dir, exist_ok=True)
 
         output_path = os.path.normpath(os.path.abspath(output_path))
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(text)
+            if self.cache.get(cache_key, output_path):
+                self._cache_hits += 1
+                logger.debug(f"TTS cache hit: {len(text)} chars -> {output_path}")
+                return output_path
+            self._cache_misses += 1
+
         last_exc = None
+        cancel_token = cancel_token or CancellationToken()
 
         for attempt in range(MAX_RETRIES):
+            cancel_token.raise_if_cancelled()
             start_time = time.time()
             try:
                 response = self.tts_client.synthesize_speech(
@@ -91,6 +135,9 @@ class TTSService:
                 if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
                     raise IOError(f"Failed to create audio file: {output_path}")
 
+                if cache_key is not None:
+                    self.cache.put(cache_key, response.audio_content)
+
                 duration = time.time() - start_time
                 self._call_count += 1
                 self._total_chars += len(text)
@@ -102,7 +149,7 @@ class TTSService:
                 last_exc = e
                 wait_time = 2 ** attempt
                 logger.warning(f"TTS API unavailable, retrying in {wait_time}s... (Attempt {attempt+1}/{MAX_RETRIES})")
-                time.sleep(wait_time)
+                cancel_token.sleep(wait_time)
             except Exception as e:
                 last_exc = e
                 logger.error(f"TTS synthesis failed on attempt {attempt+1}: {e}")
@@ -122,6 +169,12 @@ class TTSService:
             if output_dir:  # Only create directory if it's not empty
                 os.makedirs(output_dir, exist_ok=True)
             output_path = os.path.normpath(os.path.abspath(output_path))
+
+            if output_path.lower().endswith('.wav'):
+                # PCM silence at the TTS sample rate, no encoder needed
+                write_silence(output_path, duration, self.audio_config.sample_rate_hertz)
+                logger.debug(f"Silent audio created: {duration}s -> {output_path}")
+                return output_path
             
             # Create silent audio using MoviePy
             fps = 44100
@@ -161,6 +214,7 @@ class TTSService:
         avg_chars_per_call = self._total_chars / max(1, self._call_count)
         avg_duration_per_call = self._total_duration / max(1, self._call_count)
         chars_per_second = self._total_chars / max(0.1, self._total_duration)
+        cache_lookups = self._cache_hits + self._cache_misses
         
         return {
             'total_calls': self._call_count,
@@ -169,6 +223,10 @@ class TTSService:
             'average_characters_per_call': avg_chars_per_call,
             'average_duration_per_call': avg_duration_per_call,
             'characters_per_second': chars_per_second,
+            'cache_hits': self._cache_hits,
+            'cache_misses': self._cache_misses,
+            'cache_hit_ratio': self._cache_hits / cache_lookups if cache_lookups else 0.0,
+            'cache': self.cache.get_stats() if self.cache is not None else None,
             'voice_config': {
                 'languageCode': self.voice.language_code,
                 'speakingRate': self.audio_config.speaking_rate,
@@ -181,6 +239,8 @@ class TTSService:
         self._call_count = 0
         self._total_chars = 0
         self._total_duration = 0.0
+        self._cache_hits = 0
+        self._cache_misses = 0
 
     @staticmethod
     def get_available_voices(language_code: str = None) -> List[Dict[str, Any]]:
@@ -1,31 +1,63 @@
 import asyncio
 import os
 import gc
-import time
 import uuid
 import platform
-from typing import List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips, concatenate_audioclips
-from moviepy.audio.AudioClip import AudioArrayClip
-from moviepy.audio.fx.audio_fadeout import audio_fadeout
-import numpy as np
-from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Set, Callable, Awaitable
+from concurrent.futures.process import BrokenProcessPool
 import subprocess
 # Import our new helper modules
 from .content_formatter import ContentFormatter
 from .slide_processor import SlideProcessor
 from .tts_service import TTSService
+from . import pcm_audio, frame_store
+from .ffmpeg_renderer import FFmpegRenderer, ENCODING_MODES
+from .slide_pipeline import SlidePipeline, PipelineStage
+from .moviepy_encoder import MoviePySlideEncoder
+from .segment_cache import SegmentCache, get_segment_cache
+from .slide_templates import slide_template_seed
+from .job_checkpoint import JobCheckpoint
+from .slide_scatter import SlideScatter
+from .render_pool import (
+    get_render_pool, resolve_process_workers, shutdown_render_pool,
+    TEMPLATE_WORKER_MEMORY_MB, ENCODE_WORKER_MEMORY_MB
+)
+from src.utils.cancellation import CancellationToken
 from src.utils.logger import logger
+from src.utils.media_info import get_media_duration
 from PIL import Image
 
 if not hasattr(Image, 'ANTIALIAS'):
     Image.ANTIALIAS = Image.Resampling.LANCZOS
 
+# Render modes: "segments" encodes each slide with FFmpeg into a cacheable segment then concatenates,
+# "ffmpeg" renders the whole lesson in one FFmpeg pass, "moviepy" encodes each slide with MoviePy then concatenates
+DEFAULT_RENDER_MODE = "segments"
+VIDEO_RENDER_MODE = os.getenv("VIDEO_RENDER_MODE", DEFAULT_RENDER_MODE).lower()
+RENDER_MODES = ("segments", "ffmpeg", "moviepy")
+# Encoding used by the ffmpeg render mode: "static" (one frame per image change) or "cfr" (fixed video_fps)
+VIDEO_ENCODING_MODE = os.getenv("VIDEO_ENCODING_MODE", "static").lower()
+# Where CPU-bound template rendering and MoviePy encoding run: "process" (all cores) or "thread" (GIL-bound)
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "process").lower()
+RENDER_EXECUTORS = ("process", "thread")
+RENDER_MEMORY_BUDGET_MB = int(os.getenv("RENDER_MEMORY_BUDGET_MB", "2048"))
+RENDER_PROCESS_WORKERS = int(os.getenv("RENDER_PROCESS_WORKERS", "0"))  # 0 = size from CPU count and memory budget
+# Seconds one slide may spend in a pipeline stage; the stage's work is stopped and the slide dropped when exceeded
+SLIDE_TTS_TIMEOUT = float(os.getenv("SLIDE_TTS_TIMEOUT", "120"))
+SLIDE_IMAGES_TIMEOUT = float(os.getenv("SLIDE_IMAGES_TIMEOUT", "120"))
+SLIDE_RENDER_TIMEOUT = float(os.getenv("SLIDE_RENDER_TIMEOUT", "120"))
+SLIDE_ENCODE_TIMEOUT = float(os.getenv("SLIDE_ENCODE_TIMEOUT", "300"))
+# Bytes read from the muxer per write to an output sink
+MUX_READ_SIZE = 1024 * 1024
+
 class VideoGenerator:
-    def __init__(self, unsplash_access_key: str = None, voice_config: Dict[str, Any] = None, language: str = "vietnamese"):
+    def __init__(self, unsplash_access_key: str = None, voice_config: Dict[str, Any] = None, language: str = "vietnamese",
+                 render_mode: str = None, encoding_mode: str = None, render_executor: str = None,
+                 segment_cache: Optional[SegmentCache] = None, scatter: Optional[SlideScatter] = None):
         # Initialize TTS service
-        self.tts_service = TTSService(voice_config)
+        # Narration stays 16-bit PCM until the final mux, which does the only (AAC) encode
+        self.tts_service = TTSService(voice_config, audio_encoding="linear16")
+        self.voice_config = voice_config or {}
         
         # Get Unsplash key from environment if not provided
         self.unsplash_access_key = unsplash_access_key or os.getenv('UNSPLASH_ACCESS_KEY')
@@ -36,7 +68,20 @@ class VideoGenerator:
         
         # Performance optimizations
         self.max_workers_optimized = min(3, os.cpu_count())
-        self.batch_size_optimized = 3
+        # Worker pool size per pipeline stage: TTS and image sourcing wait on the network, render/encode use CPU
+        self.stage_workers = {
+            'tts': 4,
+            'images': 3,
+            'render': min(2, os.cpu_count()),
+            'encode': self.max_workers_optimized,
+        }
+        self.stage_timeouts = {
+            'tts': SLIDE_TTS_TIMEOUT,
+            'images': SLIDE_IMAGES_TIMEOUT,
+            'render': SLIDE_RENDER_TIMEOUT,
+            'encode': SLIDE_ENCODE_TIMEOUT,
+        }
+        self.pipeline_queue_size = 2
         self.video_fps = 10
         self.image_resolution = (1280, 720)
         
@@ -46,174 +91,400 @@ class VideoGenerator:
 
         self.language = language
 
-    @contextmanager
-    def _safe_moviepy_context(self):
-        """Context manager for safe MoviePy operations with aggressive cleanup"""
-        clips_to_cleanup = []
-        try:
-            yield clips_to_cleanup
-        finally:
-            # Aggressive cleanup
-            for clip in clips_to_cleanup:
-                try:
-                    if hasattr(clip, 'close'):
-                        clip.close()
-                    if hasattr(clip, 'reader') and clip.reader:
-                        clip.reader.close()
-                except Exception as e:
-                    logger.warning(f"Error closing clip: {e}")
-            
-            # Clear the list
-            clips_to_cleanup.clear()
-            
-            # Force garbage collection multiple times - OPTIMIZED
-            for _ in range(2):
-                gc.collect()
-            
-            # Reduced delay on Windows for file handle release
-            if self.is_windows:
-                time.sleep(0.2)
+        self.render_mode = (render_mode or VIDEO_RENDER_MODE).lower()
+        if self.render_mode not in RENDER_MODES:
+            logger.warning(f"Unknown render mode '{self.render_mode}', falling back to {DEFAULT_RENDER_MODE}")
+            self.render_mode = DEFAULT_RENDER_MODE
+        self.encoding_mode = (encoding_mode or VIDEO_ENCODING_MODE).lower()
+        if self.encoding_mode not in ENCODING_MODES:
+            logger.warning(f"Unknown encoding mode '{self.encoding_mode}', falling back to static")
+            self.encoding_mode = "static"
+        self.ffmpeg_renderer = FFmpegRenderer(self.image_resolution, self.video_fps, encoding_mode=self.encoding_mode)
+        self.slide_encoder = MoviePySlideEncoder(self.image_resolution, self.video_fps)
+
+        # Per-slide segments can be reused across jobs; the single-pass render has no segments to cache
+        self.segment_cache = None
+        if self.render_mode != "ffmpeg":
+            self.segment_cache = segment_cache or get_segment_cache()
+        self.checkpoint: Optional[JobCheckpoint] = None
+        # Indexes of slides restored from the job checkpoint or the segment cache instead of rendered
+        self._reused_slide_indexes: Set[int] = set()
+        # Peers can only render standalone segments, which the single-pass render does not use
+        self.scatter = scatter if self.render_mode != "ffmpeg" else None
+        self.segment_profile = {
+            'render_mode': self.render_mode,
+            'encoding_mode': self.encoding_mode if self.render_mode == "segments" else None,
+            'resolution': list(self.image_resolution),
+            'fps': self.video_fps,
+            'preset': self.ffmpeg_renderer.preset,
+            'crf': self.ffmpeg_renderer.crf,
+            'audio_sample_rate': self.ffmpeg_renderer.audio_sample_rate,
+        }
+
+        # Cancelled with the job; every pipeline stage call runs under a child token of it
+        self.cancel_token = CancellationToken()
+
+        self.render_executor = (render_executor or RENDER_EXECUTOR).lower()
+        if self.render_executor not in RENDER_EXECUTORS:
+            logger.warning(f"Unknown render executor '{self.render_executor}', falling back to process")
+            self.render_executor = "process"
+        if self.render_executor == "process":
+            # CPU stages get one worker per process in the pool instead of a GIL-bound thread count
+            render_workers = resolve_process_workers(RENDER_MEMORY_BUDGET_MB, TEMPLATE_WORKER_MEMORY_MB, RENDER_PROCESS_WORKERS)
+            encode_workers = resolve_process_workers(RENDER_MEMORY_BUDGET_MB, ENCODE_WORKER_MEMORY_MB, RENDER_PROCESS_WORKERS)
+            self.stage_workers['render'] = render_workers
+            self.stage_workers['encode'] = encode_workers
+            self.slide_processor.set_render_executor(get_render_pool(max(render_workers, encode_workers)))
+
+    async def generate_lesson_video(self, lesson_data: Dict[str, Any], output_path: str, temp_dir: str,
+                                    job_id: Optional[str] = None, checkpoint: Optional[JobCheckpoint] = None,
+                                    output_sink: Optional[Callable[[bytes], Awaitable[None]]] = None) -> str:
+        """
+        Generate complete video from lesson JSON data. Each slide's template is drawn
+        from its own content, so unchanged slides reuse cached segments across jobs.
 
-    def _safe_file_operation(self, operation, *args, **kwargs):
-        """Safely perform file operations with retry logic for Windows"""
-        max_retries = kwargs.pop('max_retries', 3)
-        
-        for attempt in range(max_retries):
-            try:
-                return operation(*args, **kwargs)
-            except (PermissionError, OSError, FileNotFoundError) as e:
-                if attempt < max_retries - 1:
-                    delay = 0.5 * (attempt + 1)
-                    logger.warning(f"File operation failed (attempt {attempt + 1}), retrying in {delay}s: {e}")
-                    time.sleep(delay)
-                    gc.collect()
-                else:
-                    logger.error(f"File operation failed after {max_retries} attempts: {e}")
-                    raise
+        With a checkpoint, slides completed by a previous attempt of the job are
+        restored and every newly encoded slide is recorded.
 
-    async def generate_lesson_video(self, lesson_data: Dict[str, Any], output_path: str, temp_dir: str) -> str:
-        """Generate complete video from lesson JSON data"""
+        With an output_sink, the video bytes are also passed to it as they are
+        written: the concatenation muxes a fragmented MP4 so it can be streamed
+        while FFmpeg runs (the single-pass render is passed on once done).
+        """
+        # Rendered slides live as raw frames (in shared memory when available) until the encode is done
+        frames_dir = frame_store.create_job_frame_dir()
         try:
             slides = lesson_data.get('slides', [])
             if not slides:
                 raise ValueError("No slides found in lesson data")
             
             self.slide_processor.reset_for_new_video()
-            
-            # Process all slides concurrently with reduced concurrency
-            slide_video_paths = await self._process_slides_concurrent(slides, temp_dir)
-            
-            # Filter out None values (failed slides)
-            valid_paths = [path for path in slide_video_paths if path and os.path.exists(path)]
+            template_plan = self.slide_processor.plan_templates([slide_template_seed(slide) for slide in slides])
+
+            # Run slides through the TTS -> images -> render (-> encode) pipeline
+            slide_results = await self._process_slides_concurrent(
+                slides, temp_dir, frames_dir, template_plan, checkpoint, job_id=job_id
+            )
+
+            if self.render_mode == "ffmpeg":
+                # Encode the whole lesson once from the prepared audio + timed images
+                if not slide_results:
+                    raise ValueError("No slides were successfully prepared")
+
+                plan = self.ffmpeg_renderer.build_plan(slide_results)
+                final_video_path = await self.ffmpeg_renderer.render(plan, output_path)
+                if output_sink is not None:
+                    await self._copy_to_sink(final_video_path, output_sink)
+
+                logger.info(f"Video generation completed: {final_video_path}")
+                return final_video_path
+
+            # Filter out failed slides
+            valid_paths = [result['video_path'] for result in slide_results if os.path.exists(result['video_path'])]
             if not valid_paths:
                 raise ValueError("No slide videos were successfully created")
             
             # Combine all slide videos
-            final_video_path = await self._combine_videos(valid_paths, output_path)
+            final_video_path = await self._combine_videos(valid_paths, output_path, output_sink)
             
             logger.info(f"Video generation completed: {final_video_path}")
             return final_video_path
-                    
+
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
         except Exception as e:
             logger.error(f"Error generating lesson video: {e}")
             raise
+        finally:
+            frame_store.remove_frame_dir(frames_dir)
 
-    async def _process_slides_concurrent(self, slides: List[Dict], temp_dir: str) -> List[str]:
-        """Process slides with optimized memory usage and improved concurrency"""
-        max_workers = self.max_workers_optimized
-        batch_size = self.batch_size_optimized
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            loop = asyncio.get_event_loop()
-            
-            # Process in optimized batches
-            all_valid_paths = []
-            
-            for i in range(0, len(slides), batch_size):
-                batch = slides[i:i + batch_size]
-                logger.info(f"Processing batch {i//batch_size + 1}: slides {i+1}-{min(i+batch_size, len(slides))}")
-                
-                # Create tasks for current batch
-                tasks = []
-                for j, slide in enumerate(batch):
-                    task = loop.run_in_executor(
-                        executor,
-                        self._process_single_slide, 
-                        slide, 
-                        i + j, 
-                        temp_dir
-                    )
-                    tasks.append(task)
-                
-                try:
-                    batch_results = await asyncio.wait_for(
-                        asyncio.gather(*tasks, return_exceptions=True), 
-                        timeout=300 
-                    )
-                    
-                    # Process batch results
-                    for result in batch_results:
-                        if isinstance(result, Exception):
-                            logger.error(f"Slide processing error: {result}")
-                        elif result:
-                            all_valid_paths.append(result)
-                    
-                    gc.collect()
-                    time.sleep(0.2)
-                    
-                except asyncio.TimeoutError:
-                    logger.error(f"Batch {i//batch_size + 1} processing timed out")
-                    for task in tasks:
-                        task.cancel()
-            
-            return all_valid_paths
+    async def render_slide_segment(self, slide: Dict[str, Any], slide_index: int,
+                                   template_name: Optional[str], temp_dir: str) -> Dict[str, Any]:
+        """Render a single slide into a segment (render sub-task of a scattered lesson)"""
+        frames_dir = frame_store.create_job_frame_dir()
+        try:
+            items = self._build_slide_items([slide], temp_dir, frames_dir, [template_name], first_index=slide_index)
+            await self._reuse_segments(items)
+            results = await self._run_pipeline(items)
+            if not results or not results[0].get('video_path'):
+                raise ValueError(f"Slide {slide_index + 1} could not be rendered")
+            if self.segment_cache is not None:
+                await self.segment_cache.publish()
+            return results[0]
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        finally:
+            frame_store.remove_frame_dir(frames_dir)
 
-    def _process_single_slide(self, slide: Dict, slide_index: int, temp_dir: str) -> str:
-        """Process a single slide: TTS -> Images -> Video"""
+    @property
+    def reused_slides(self) -> int:
+        """Slides whose segment came from the job checkpoint or the segment cache instead of a render"""
+        return len(self._reused_slide_indexes)
 
-        slide_id = int(slide.get('slide_id', slide_index + 1))
-        slide_temp_dir = os.path.join(temp_dir, f"slide_{slide_index + 1}")
-        os.makedirs(slide_temp_dir, exist_ok=True)
+    def cancel(self):
+        """
+        Stop the work still running in pipeline threads after the job was cancelled.
 
-        audio_path = os.path.normpath(os.path.join(slide_temp_dir, f"audio_{slide_id}_{uuid.uuid4().hex[:8]}.mp3"))
-        video_path = os.path.normpath(os.path.join(slide_temp_dir, f"slide_{slide_id}_{uuid.uuid4().hex[:8]}.mp4"))
+        Segment renders are killed and TTS retry waits end. TTS and image requests
+        already in flight finish, but the slide goes no further.
+        """
+        if not self.cancel_token.cancelled:
+            self.cancel_token.cancel("video generation cancelled")
+            logger.info("Video generation cancelled, stopping slide work")
+
+    def _build_slide_items(self, slides: List[Dict], temp_dir: str, frames_dir: str = None,
+                           template_plan: Optional[List[str]] = None, first_index: int = 0) -> List[Dict[str, Any]]:
+        """Pipeline context for each slide"""
+        items = []
+        for offset, slide in enumerate(slides):
+            slide_index = first_index + offset
+            slide_id = int(slide.get('slide_id', slide_index + 1))
+            slide_temp_dir = os.path.join(temp_dir, f"slide_{slide_index + 1}")
+            os.makedirs(slide_temp_dir, exist_ok=True)
+            items.append({
+                'slide': slide,
+                'slide_index': slide_index,
+                'slide_id': slide_id,
+                'temp_dir': slide_temp_dir,
+                'frames_dir': frames_dir,
+                'template_name': template_plan[offset] if template_plan else None,
+                'cacheable': True,
+            })
+        return items
+
+    async def _run_pipeline(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run slides through the TTS -> images -> render (-> encode) stages"""
+        stages = [
+            PipelineStage("tts", self._stage_tts, workers=self.stage_workers['tts'],
+                          timeout=self.stage_timeouts['tts']),
+            PipelineStage("images", self._stage_source_images, workers=self.stage_workers['images'],
+                          timeout=self.stage_timeouts['images']),
+            PipelineStage("render", self._stage_render, workers=self.stage_workers['render'],
+                          timeout=self.stage_timeouts['render']),
+        ]
+        if self.render_mode != "ffmpeg":
+            stages.append(PipelineStage("encode", self._stage_encode, workers=self.stage_workers['encode'],
+                                        timeout=self.stage_timeouts['encode']))
+
+        pipeline = SlidePipeline(stages, queue_size=self.pipeline_queue_size, cancel_token=self.cancel_token)
+        try:
+            return await pipeline.run(items)
+        finally:
+            gc.collect()
+
+    async def _process_slides_concurrent(self, slides: List[Dict], temp_dir: str, frames_dir: str = None,
+                                         template_plan: Optional[List[str]] = None,
+                                         checkpoint: Optional[JobCheckpoint] = None,
+                                         job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Process slides through a staged pipeline, each stage with its own worker pool"""
+        items = self._build_slide_items(slides, temp_dir, frames_dir, template_plan)
+
+        # The single-pass render has no per-slide segments to reuse or checkpoint
+        if self.render_mode != "ffmpeg":
+            self.checkpoint = checkpoint
+            await self._reuse_segments(items)
+
+        local_items, remote_items = items, []
+        if self.scatter is not None and job_id:
+            pending = [ctx for ctx in items if not ctx.get('video_path')]
+            _, remote_items = self.scatter.split(pending)
+            remote_indices = {ctx['slide_index'] for ctx in remote_items}
+            local_items = [ctx for ctx in items if ctx['slide_index'] not in remote_indices]
 
         try:
-            # 1. Generate TTS
-            self._generate_tts_audio(slide.get('tts_script', ''), audio_path)
-
-            # 2. Get audio duration
-            audio_duration = 5.0
-            if os.path.exists(audio_path):
-                try:
-                    with AudioFileClip(audio_path) as audio_clip:
-                        audio_duration = audio_clip.duration
-                except Exception as e:
-                    logger.warning(f"Could not get duration for slide {slide_id}: {e}")
-
-            # 3. Process slide images
-            is_first_slide = (slide_id == 1)
-            slide_result = self.slide_processor.process_slide_images(
-                slide, slide_temp_dir, slide_id,
-                self.image_resolution,
-                add_disclaimer=is_first_slide,
-                language=self.language
+            remote_renders = [
+                asyncio.create_task(self.scatter.render_remote(job_id, ctx, self._render_request(ctx)))
+                for ctx in remote_items
+            ]
+            if remote_items:
+                logger.info(f"Scattered {len(remote_items)}/{len(items)} slides to peer workers")
+
+            try:
+                results = await self._run_pipeline(local_items)
+                rendered = await asyncio.gather(*remote_renders)
+            except BaseException:
+                for task in remote_renders:
+                    task.cancel()
+                raise
+
+            stragglers = []
+            for ctx, ok in zip(remote_items, rendered):
+                if ok:
+                    await asyncio.to_thread(self._store_segment, ctx)
+                    results.append(ctx)
+                else:
+                    stragglers.append(ctx)
+            if stragglers:
+                logger.warning(f"Rendering {len(stragglers)} scattered slides locally")
+                results += await self._run_pipeline(stragglers)
+        finally:
+            if self.checkpoint is not None:
+                # Mirror the slides finished so far even if the pipeline failed, the retry resumes from them
+                await self.checkpoint.flush()
+
+        if self.segment_cache is not None:
+            await self.segment_cache.publish()
+        return sorted(results, key=lambda result: result['slide_index'])
+
+    def _render_request(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """Render sub-task fields for a peer worker"""
+        return {
+            'slide': ctx['slide'],
+            'slideIndex': ctx['slide_index'],
+            'templateName': ctx['template_name'],
+            'voiceConfig': self.voice_config,
+            'language': self.language,
+            'renderProfile': self.segment_profile,
+        }
+
+    async def _reuse_segments(self, items: List[Dict[str, Any]]):
+        """
+        Key every slide and pick up already encoded segments, so only changed slides are rendered.
+
+        Slides completed by a previous attempt of the job come from its checkpoint,
+        the rest from the segment cache.
+        """
+        for ctx in items:
+            ctx['segment_key'] = SegmentCache.make_key(
+                ctx['slide'], self.voice_config, ctx['template_name'], self.segment_profile,
+                add_disclaimer=(ctx['slide_id'] == 1), language=self.language
             )
 
-            slide_result = self.slide_processor.calculate_slide_timing(slide_result, audio_duration)
+        def segment_path(ctx: Dict[str, Any]) -> str:
+            return os.path.normpath(os.path.join(ctx['temp_dir'], f"segment_{ctx['slide_id']}.mp4"))
+
+        resumed = 0
+        if self.checkpoint is not None:
+            for ctx in items:
+                if await self.checkpoint.restore_slide(ctx['slide_index'], ctx['segment_key'], segment_path(ctx)):
+                    ctx['video_path'] = segment_path(ctx)
+                    self._reused_slide_indexes.add(ctx['slide_index'])
+                    resumed += 1
+
+        if self.segment_cache is None:
+            reused = 0
+        else:
+            pending = [ctx for ctx in items if not ctx.get('video_path')]
+            await self.segment_cache.prefetch([ctx['segment_key'] for ctx in pending])
+
+            def restore(ctx: Dict[str, Any]) -> bool:
+                if self.segment_cache.get(ctx['segment_key'], segment_path(ctx)):
+                    ctx['video_path'] = segment_path(ctx)
+                    self._reused_slide_indexes.add(ctx['slide_index'])
+                    return True
+                return False
 
-            self._create_slide_video_with_timing(slide_result, audio_path, video_path)
+            reused = sum(await asyncio.gather(*(asyncio.to_thread(restore, ctx) for ctx in pending)))
 
-            if not os.path.exists(video_path):
-                raise FileNotFoundError(f"Video file not created: {video_path}")
+        rendering = len(items) - resumed - reused
+        logger.info(f"Segments: {resumed} resumed from checkpoint, {reused} from cache, rendering {rendering}/{len(items)}")
 
-            return video_path
+    def _stage_tts(self, ctx: Dict[str, Any], token: CancellationToken) -> Dict[str, Any]:
+        """Pipeline stage 1: narration audio and its duration (I/O bound)"""
+        token.raise_if_cancelled()
+        if ctx.get('video_path'):
+            return ctx  # Cached segment
 
+        slide_id = ctx['slide_id']
+        audio_path = os.path.normpath(os.path.join(ctx['temp_dir'], f"audio_{slide_id}_{uuid.uuid4().hex[:8]}.wav"))
+
+        try:
+            self._generate_tts_audio(ctx['slide'].get('tts_script', ''), audio_path, strict=True, cancel_token=token)
         except Exception as e:
-            logger.error(f"Error processing slide {slide_index + 1}: {e}")
-            return None
+            # A cancelled slide must not be finished with silence
+            token.raise_if_cancelled()
+            logger.error(f"TTS error: {e}")
+            self.tts_service.create_silent_audio(audio_path, duration=3.0)
+            # Never cache a slide narrated by the silence fallback
+            ctx['cacheable'] = False
 
-    def _generate_tts_audio(self, text: str, output_path: str, silence_duration: float = 0.8) -> str:
+        audio_duration = 5.0
+        if os.path.exists(audio_path):
+            try:
+                audio_duration = get_media_duration(audio_path)
+            except Exception as e:
+                logger.warning(f"Could not get duration for slide {slide_id}: {e}")
+
+        ctx['audio_path'] = audio_path
+        ctx['audio_duration'] = audio_duration
+        return ctx
+
+    def _stage_source_images(self, ctx: Dict[str, Any], token: CancellationToken) -> Dict[str, Any]:
+        """Pipeline stage 2: illustration images from Vertex AI / Unsplash (I/O bound)"""
+        token.raise_if_cancelled()
+        if ctx.get('video_path'):
+            return ctx
+        ctx['source_images'] = self.slide_processor.source_slide_images(
+            ctx['slide'], ctx['temp_dir'], ctx['slide_id'], self.image_resolution, cancel_token=token
+        )
+        return ctx
+
+    def _stage_render(self, ctx: Dict[str, Any], token: CancellationToken) -> Dict[str, Any]:
+        """Pipeline stage 3: template rendering and image timing (CPU bound)"""
+        token.raise_if_cancelled()
+        if ctx.get('video_path'):
+            return ctx
+
+        slide, slide_id = ctx['slide'], ctx['slide_id']
+        is_first_slide = (slide_id == 1)
+
+        content_image = self.slide_processor.render_content_image(
+            slide, ctx['temp_dir'], slide_id,
+            self.image_resolution,
+            add_disclaimer=is_first_slide,
+            language=self.language,
+            frame_dir=ctx.get('frames_dir'),
+            template_name=ctx.get('template_name')
+        )
+        slide_result = self.slide_processor.assemble_slide_result(
+            slide, ctx['temp_dir'], slide_id, content_image, ctx.get('source_images', []), self.image_resolution
+        )
+
+        slide_result = self.slide_processor.calculate_slide_timing(slide_result, ctx['audio_duration'])
+        slide_result['slide_id'] = slide_id
+        slide_result['slide_index'] = ctx['slide_index']
+        slide_result['audio_path'] = ctx['audio_path']
+        slide_result['temp_dir'] = ctx['temp_dir']
+        slide_result['segment_key'] = ctx.get('segment_key')
+        # A slide whose template render failed would be cached with a placeholder image
+        slide_result['cacheable'] = ctx['cacheable'] and any(img['type'] == 'content' for img in slide_result['images'])
+        return slide_result
+
+    def _stage_encode(self, slide_result: Dict[str, Any], token: CancellationToken) -> Dict[str, Any]:
+        """Pipeline stage 4 (segments/moviepy mode): encode the slide video (CPU bound)"""
+        token.raise_if_cancelled()
+        if slide_result.get('video_path'):
+            return slide_result
+
+        video_path = os.path.normpath(os.path.join(
+            slide_result['temp_dir'],
+            f"slide_{slide_result['slide_id']}_{uuid.uuid4().hex[:8]}.mp4"
+        ))
+        if self.render_mode == "segments":
+            plan = self.ffmpeg_renderer.build_plan([slide_result])
+            self.ffmpeg_renderer.render_blocking(plan, video_path, cancel_token=token)
+        else:
+            self._create_slide_video_with_timing(slide_result, slide_result['audio_path'], video_path, token)
+
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not created: {video_path}")
+
+        slide_result['video_path'] = video_path
+        self._store_segment(slide_result)
+        return slide_result
+
+    def _store_segment(self, slide_result: Dict[str, Any]):
+        """Keep a finished slide segment in the segment cache and the job checkpoint"""
+        if not (slide_result.get('segment_key') and slide_result.get('cacheable')):
+            return
+        if self.segment_cache is not None:
+            self.segment_cache.put_file(slide_result['segment_key'], slide_result['video_path'])
+        if self.checkpoint is not None:
+            self.checkpoint.record_slide(slide_result['slide_index'], slide_result['segment_key'], slide_result['video_path'])
+
+    def _generate_tts_audio(self, text: str, output_path: str, silence_duration: float = 0.8, strict: bool = False,
+                            cancel_token: Optional[CancellationToken] = None) -> str:
         text = text.strip()
 
         if not text:
@@ -221,29 +492,17 @@ class VideoGenerator:
             return self.tts_service.create_silent_audio(output_path, duration=2.0)
 
         try:
-            path = self.tts_service.synthesize_text(text, output_path)
+            path = self.tts_service.synthesize_text(text, output_path, cancel_token=cancel_token)
 
             if silence_duration <= 0:
                 return path
 
             try:
-                with AudioFileClip(path) as audio:
-                    audio = audio_fadeout(audio, 0.02)
-
-                    fps = 44100
-                    channels = 2 if audio.nchannels == 2 else 1
-                    silence_samples = np.zeros((int(silence_duration * fps), channels), dtype=np.float32)
-                    silence_clip = AudioArrayClip(silence_samples, fps=fps)
-
-                    with silence_clip as silence:
-                        final_clip = concatenate_audioclips([audio, silence])
-
-                        temp_output = f"{os.path.splitext(path)[0]}_temp.mp3"
-                        final_clip.write_audiofile(temp_output, codec="libmp3lame", logger=None, verbose=False)
-
-                        final_clip.close()
-
-                os.replace(temp_output, path)
+                # Fade and pad the PCM samples in memory, no decode/re-encode round trip
+                samples, sample_rate = pcm_audio.read_wav(path)
+                samples = pcm_audio.fade_out(samples, sample_rate, 0.02)
+                samples = pcm_audio.pad_silence(samples, sample_rate, silence_duration)
+                pcm_audio.write_wav(path, samples, sample_rate)
                 logger.debug(f"Added {silence_duration}s silence to audio: {path}")
 
                 return path
@@ -253,70 +512,40 @@ class VideoGenerator:
                 return path
 
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"TTS error: {e}")
             return self.tts_service.create_silent_audio(output_path, duration=3.0)
 
-    def _create_slide_video_with_timing(self, slide_result: Dict[str, Any], audio_path: str, output_path: str):
-        """Optimized video creation for slide with flexible image count."""
-        output_path = os.path.normpath(os.path.abspath(output_path))
-        audio_path = os.path.normpath(os.path.abspath(audio_path))
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        with self._safe_moviepy_context() as clips:
+    def _create_slide_video_with_timing(self, slide_result: Dict[str, Any], audio_path: str, output_path: str,
+                                        cancel_token: Optional[CancellationToken] = None):
+        """Encode a slide video, on the render process pool when enabled"""
+        if self.render_executor == "process":
+            workers = resolve_process_workers(RENDER_MEMORY_BUDGET_MB, ENCODE_WORKER_MEMORY_MB, RENDER_PROCESS_WORKERS)
+            pool = get_render_pool(workers)
             try:
-                audio_clip = AudioFileClip(audio_path)
-                clips.append(audio_clip)
-                total_duration = audio_clip.duration
-
-                images = slide_result.get('images', [])
-                if not images:
-                    raise ValueError("No images provided for video creation")
-
-                image_clips = []
-                for img_info in images:
-                    img_path = os.path.normpath(os.path.abspath(img_info['path']))
-                    if not os.path.exists(img_path):
-                        logger.warning(f"Image file not found: {img_path}")
-                        continue
-                    
-                    try:
-                        clip = (
-                            ImageClip(img_path)
-                            .resize(height=self.image_resolution[1])
-                            .set_duration(img_info['duration'])
-                            .set_fps(self.video_fps)
-                        )
-                        image_clips.append(clip)
-                        clips.append(clip)
-                    except Exception as e:
-                        logger.warning(f"Could not create image clip for {img_path}: {e}")
-
-                if not image_clips:
-                    raise ValueError("No valid image clips could be created")
-
-                video_clip = concatenate_videoclips(image_clips, method="compose")
-                video_clip = video_clip.set_audio(audio_clip)
-                clips.append(video_clip)
-
-                self._safe_file_operation(
-                    video_clip.write_videofile,
-                    output_path,
-                    fps=self.video_fps,
-                    codec='libx264',
-                    audio_codec='aac',
-                    verbose=False,
-                    logger=None,
-                    preset='medium',
-                    ffmpeg_params=['-crf', '23']
-                )
-
-            except Exception as e:
-                logger.error(f"Error creating slide video: {e}")
-                raise
-
-    async def _combine_videos(self, video_paths: List[str], output_path: str) -> str:
+                future = pool.submit(self.slide_encoder.encode, slide_result, audio_path, output_path)
+                # A queued encode is dropped on cancel; a running one cannot be interrupted in the pool
+                return (cancel_token or CancellationToken()).result(future)
+            except BrokenProcessPool:
+                logger.warning("Render process pool broke, restarting it and encoding in-process")
+                shutdown_render_pool()
+
+        return self.slide_encoder.encode(slide_result, audio_path, output_path)
+
+    @staticmethod
+    async def _copy_to_sink(path: str, output_sink: Callable[[bytes], Awaitable[None]]):
+        with open(path, 'rb') as video_file:
+            while chunk := await asyncio.to_thread(video_file.read, MUX_READ_SIZE):
+                await output_sink(chunk)
+
+    async def _combine_videos(self, video_paths: List[str], output_path: str,
+                              output_sink: Optional[Callable[[bytes], Awaitable[None]]] = None) -> str:
         """
         Combine all slide videos using FFmpeg CLI for memory efficiency.
+
+        With an output_sink the result is a fragmented MP4 read from FFmpeg's
+        stdout, written to output_path and passed to the sink chunk by chunk.
         """
         try:
             if not video_paths:
@@ -341,8 +570,12 @@ class VideoGenerator:
                 '-safe', '0',
                 '-i', list_file_path,
                 '-c', 'copy',
-                output_path
             ]
+            if output_sink is None:
+                cmd += ['-movflags', '+faststart', output_path]
+            else:
+                # faststart needs a second pass over the file; fragments can be sent as soon as they are muxed
+                cmd += ['-movflags', 'frag_keyframe+empty_moov+default_base_moof', '-f', 'mp4', 'pipe:1']
             
             # Run FFmpeg command
             try:
@@ -351,7 +584,23 @@ class VideoGenerator:
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE
                 )
-                stdout, stderr = await process.communicate()
+                if output_sink is None:
+                    stdout, stderr = await process.communicate()
+                else:
+                    stderr_read = asyncio.create_task(process.stderr.read())
+                    try:
+                        with open(output_path, 'wb') as output_file:
+                            while chunk := await process.stdout.read(MUX_READ_SIZE):
+                                await asyncio.to_thread(output_file.write, chunk)
+                                await output_sink(chunk)
+                    except BaseException:
+                        # A failed sink stops reading; FFmpeg would block on the full pipe
+                        process.kill()
+                        await process.wait()
+                        raise
+                    finally:
+                        stderr = await stderr_read
+                    await process.wait()
                 
                 if process.returncode != 0:
                     logger.error(f"FFmpeg failed: {stderr.decode()}")
@@ -0,0 +1,119 @@
+"""
+Cancellation tokens for blocking work running in worker threads
+
+asyncio can stop waiting for a thread but cannot stop the thread. Blocking
+code checks a token between steps instead, and child processes attached to a
+token are killed the moment it is cancelled, so a cancelled or timed out slide
+releases its CPU right away.
+"""
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Optional, Set
+from src.utils.logger import logger
+
+# How often a token checks itself while waiting on a process pool future
+FUTURE_POLL_INTERVAL = 0.2
+
+
+class OperationCancelled(RuntimeError):
+    """Raised by blocking work whose token was cancelled"""
+
+
+class CancellationToken:
+    """
+    Thread-safe cancel flag with child tokens and tracked child processes.
+
+    Cancelling a token cancels its children too: a job token cancels every
+    slide, a slide token only its own stage work.
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        self.parent = parent
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._children: Set["CancellationToken"] = set()
+        self._processes: Set[subprocess.Popen] = set()
+        if parent is not None:
+            parent._adopt(self)
+
+    def _adopt(self, child: "CancellationToken"):
+        with self._lock:
+            if not self._event.is_set():
+                self._children.add(child)
+                return
+        child.cancel(self.reason)
+
+    def child(self) -> "CancellationToken":
+        """Token cancelled with this one, or on its own; close() it when done"""
+        return CancellationToken(self)
+
+    def close(self):
+        """Detach from the parent once the work guarded by this token is over"""
+        if self.parent is not None:
+            with self.parent._lock:
+                self.parent._children.discard(self)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel this token and its children, killing their tracked processes"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            children = list(self._children)
+            processes = list(self._processes)
+            self._children.clear()
+
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        if processes:
+            logger.debug(f"Killed {len(processes)} child processes: {reason}")
+        for child in children:
+            child.cancel(reason)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled(self.reason or "cancelled")
+
+    def sleep(self, seconds: float):
+        """time.sleep() that ends early, raising OperationCancelled, when the token is cancelled"""
+        if self._event.wait(seconds):
+            raise OperationCancelled(self.reason or "cancelled")
+
+    @contextmanager
+    def track(self, process: subprocess.Popen):
+        """Kill `process` if the token is cancelled while the block runs"""
+        with self._lock:
+            cancelled = self._event.is_set()
+            if not cancelled:
+                self._processes.add(process)
+        if cancelled:
+            process.kill()
+        try:
+            yield process
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+    def result(self, future: Future) -> Any:
+        """
+        future.result() that gives up when the token is cancelled.
+
+        A future that has not started is cancelled; one already running in a
+        process pool cannot be interrupted and finishes in the background.
+        """
+        while True:
+            try:
+                return future.result(timeout=FUTURE_POLL_INTERVAL)
+            except FutureTimeoutError:
+                if self._event.is_set():
+                    future.cancel()
+                    raise OperationCancelled(self.reason or "cancelled")
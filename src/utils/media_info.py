@@ -0,0 +1,205 @@
+"""
+Lightweight media duration probing
+
+Reads durations straight from container headers (MP4 mvhd/mdhd atoms, WAV
+fmt/data chunks, MP3 frame headers) instead of opening a decoder. ffprobe is
+only spawned for files none of the parsers understand.
+"""
+import os
+import struct
+import subprocess
+from typing import Optional, BinaryIO
+from src.utils.logger import logger
+
+# MPEG audio bitrate (kbps) and sample-rate tables, indexed by header fields
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],  # MPEG-1 Layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],      # MPEG-2/2.5 Layer III
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def pcm_duration(sample_count: int, sample_rate: int) -> float:
+    """Duration of raw PCM from its per-channel sample count"""
+    return sample_count / float(sample_rate)
+
+
+def get_media_duration(path: str) -> float:
+    """
+    Get the duration of an audio/video file in seconds.
+
+    Raises:
+        ValueError: if the duration cannot be determined
+    """
+    duration = None
+    try:
+        with open(path, "rb") as media_file:
+            head = media_file.read(12)
+            media_file.seek(0)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                duration = _wav_duration(media_file)
+            elif head[4:8] == b"ftyp":
+                duration = _mp4_duration(media_file, os.path.getsize(path))
+            elif head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+                duration = _mp3_duration(media_file, os.path.getsize(path))
+    except (OSError, struct.error) as e:
+        logger.debug(f"Header probe failed for {path}: {e}")
+
+    if duration is None:
+        duration = _ffprobe_duration(path)
+    if duration is None:
+        raise ValueError(f"Could not determine media duration: {path}")
+    return duration
+
+
+def _wav_duration(media_file: BinaryIO) -> Optional[float]:
+    """Duration from the WAV fmt and data chunks"""
+    media_file.seek(12)
+    byte_rate = None
+    while True:
+        chunk_header = media_file.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            fmt = media_file.read(chunk_size)
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            if chunk_size % 2:
+                media_file.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed WAVs may carry a placeholder size, trust the bytes actually present
+            data_start = media_file.tell()
+            media_file.seek(0, os.SEEK_END)
+            data_size = min(chunk_size, media_file.tell() - data_start)
+            return data_size / float(byte_rate)
+        else:
+            media_file.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def _mp4_duration(media_file: BinaryIO, file_size: int) -> Optional[float]:
+    """Duration from the moov/mvhd atom, falling back to the longest track's mdhd"""
+    moov = _find_atom(media_file, b"moov", 0, file_size)
+    if moov is None:
+        return None
+    moov_start, moov_end = moov
+
+    mvhd = _find_atom(media_file, b"mvhd", moov_start, moov_end)
+    if mvhd is not None:
+        duration = _read_header_duration(media_file, mvhd[0])
+        if duration:
+            return duration
+
+    longest = None
+    offset = moov_start
+    while True:
+        trak = _find_atom(media_file, b"trak", offset, moov_end)
+        if trak is None:
+            break
+        mdia = _find_atom(media_file, b"mdia", trak[0], trak[1])
+        mdhd = _find_atom(media_file, b"mdhd", mdia[0], mdia[1]) if mdia else None
+        if mdhd is not None:
+            duration = _read_header_duration(media_file, mdhd[0])
+            if duration and (longest is None or duration > longest):
+                longest = duration
+        offset = trak[1]
+    return longest
+
+
+def _find_atom(media_file: BinaryIO, atom_type: bytes, start: int, end: int):
+    """Find a direct child atom in [start, end), returning its payload (start, end)"""
+    offset = start
+    while offset + 8 <= end:
+        media_file.seek(offset)
+        size, kind = struct.unpack(">I4s", media_file.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", media_file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return None
+        if kind == atom_type:
+            return offset + header_size, offset + size
+        offset += size
+    return None
+
+
+def _read_header_duration(media_file: BinaryIO, payload_start: int) -> Optional[float]:
+    """Read timescale/duration from a full-box mvhd or mdhd payload"""
+    media_file.seek(payload_start)
+    version = media_file.read(4)[0]
+    if version == 1:
+        _, _, timescale, duration = struct.unpack(">QQIQ", media_file.read(28))
+    else:
+        _, _, timescale, duration = struct.unpack(">IIII", media_file.read(16))
+    if not timescale:
+        return None
+    return duration / float(timescale)
+
+
+def _mp3_duration(media_file: BinaryIO, file_size: int) -> Optional[float]:
+    """Duration from the Xing/Info frame count, or from the bitrate for CBR files"""
+    offset = 0
+    head = media_file.read(10)
+    if head[:3] == b"ID3":
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        offset = 10 + tag_size
+
+    media_file.seek(offset)
+    frame = media_file.read(4)
+    if len(frame) < 4 or frame[0] != 0xFF or frame[1] & 0xE0 != 0xE0:
+        return None
+
+    version_bits = (frame[1] >> 3) & 0x03
+    if version_bits == 1 or ((frame[1] >> 1) & 0x03) != 1:
+        # Reserved version or not Layer III
+        return None
+    bitrate_index = frame[2] >> 4
+    sample_rate_index = (frame[2] >> 2) & 0x03
+    if sample_rate_index == 3:
+        return None
+
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    samples_per_frame = 1152 if version_bits == 3 else 576
+    mono = (frame[3] >> 6) == 3
+
+    # The Xing/Info tag follows the side information of the first frame
+    if version_bits == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    media_file.seek(offset + 4 + side_info)
+    tag = media_file.read(12)
+    if tag[:4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", tag[4:8])[0]
+        if flags & 0x1:
+            frame_count = struct.unpack(">I", tag[8:12])[0]
+            return frame_count * samples_per_frame / float(sample_rate)
+
+    bitrate = _MP3_BITRATES[1 if version_bits == 3 else 2][bitrate_index] * 1000
+    if not bitrate:
+        return None
+    return (file_size - offset) * 8 / float(bitrate)
+
+
+def _ffprobe_duration(path: str) -> Optional[float]:
+    """Last resort: ask ffprobe for the container duration"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            capture_output=True, text=True, timeout=30
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return float(result.stdout.strip())
+        logger.warning(f"ffprobe could not read duration of {path}: {result.stderr.strip()}")
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"ffprobe failed for {path}: {e}")
+    return None
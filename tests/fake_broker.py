@@ -0,0 +1,75 @@
+"""
+Stand-ins for aio-pika messages and a broker linking RabbitMQManagers in one process
+"""
+import json
+from contextlib import asynccontextmanager
+from src.config.worker_config import WorkerConfig
+from src.core.rabbitmq_manager import RabbitMQManager
+from src.models.task_messages import TaskType
+
+
+class FakeMessage:
+    """The parts of aio_pika.IncomingMessage the manager uses"""
+
+    def __init__(self, body, reply_to=None, correlation_id=None, headers=None):
+        self.body = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.headers = headers or {}
+        self.reply_to = reply_to
+        self.correlation_id = correlation_id or ("correlation-1" if reply_to else None)
+        self.expiration = None
+        self.timestamp = None
+        self.delivery_mode = 2
+        self.processed = False
+        self.outcome = None
+
+    @asynccontextmanager
+    async def process(self, requeue=False, ignore_processed=False):
+        try:
+            yield
+        except BaseException:
+            self._settle("rejected")
+            raise
+        self._settle("acked")
+
+    async def ack(self):
+        self._settle("acked")
+
+    def _settle(self, outcome):
+        if not self.processed:
+            self.processed = True
+            self.outcome = outcome
+
+
+def make_manager(tmp_path, handler, name="worker", **config):
+    """Product worker manager whose publishes are recorded in manager.published instead of sent"""
+    settings = dict(
+        storage_backend="local", local_storage_dir=str(tmp_path / "storage"), temp_dir=str(tmp_path / name),
+        backend_api_key="test-key", scatter_render_enabled=True, max_retries=1, worker_id=name,
+    )
+    settings.update(config)
+    manager = RabbitMQManager(WorkerConfig(**settings), handler, task_types=[TaskType.CREATE_PRODUCT])
+    manager.published = []
+
+    async def publish(message, routing_key, exchange_name=None, mandatory=False):
+        manager.published.append((routing_key, exchange_name, json.loads(message.body.decode())))
+
+    manager._publish = publish
+    return manager
+
+
+def link(coordinator, peer):
+    """Deliver the coordinator's requests to the peer and the peer's replies back"""
+    coordinator.reply_queue_name = f"amq.gen-{coordinator.config.worker_id}"
+    coordinator.reply_queue_ready.set()
+
+    async def coordinator_publish(message, routing_key, exchange_name=None, mandatory=False):
+        coordinator.published.append((routing_key, exchange_name, json.loads(message.body.decode())))
+        peer._spawn(FakeMessage(message.body, reply_to=message.reply_to, correlation_id=message.correlation_id))
+
+    async def peer_publish(message, routing_key, exchange_name=None, mandatory=False):
+        peer.published.append((routing_key, exchange_name, json.loads(message.body.decode())))
+        if routing_key == coordinator.reply_queue_name:
+            await coordinator._on_reply(FakeMessage(message.body, correlation_id=message.correlation_id))
+
+    coordinator._publish = coordinator_publish
+    peer._publish = peer_publish
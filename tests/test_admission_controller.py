@@ -0,0 +1,182 @@
+"""
+AdmissionController: shortest predicted job first with aging, idle workers always admit
+"""
+import asyncio
+import types
+import pytest
+from src.core import admission_controller
+from src.core.admission_controller import AdmissionController
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Only the controller's clock; the event loop keeps the real one
+    monkeypatch.setattr(admission_controller, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def make_controller(tmp_path, capacity=1, pressure=None):
+    controller = AdmissionController(types.SimpleNamespace(max_concurrent_tasks=capacity, temp_dir=str(tmp_path)))
+    controller._resource_pressure = lambda: pressure
+    return controller
+
+
+async def wait_for_waiters(controller, count):
+    while len(controller._waiters) < count:
+        await asyncio.sleep(0)
+
+
+async def admission_order(controller, clock, jobs):
+    """
+    Queue (label, cost, seconds waited before the next job arrives) behind a running
+    task, release it and return the labels in the order they were admitted.
+    """
+    admitted = []
+
+    async def run(label, cost):
+        async with controller.slot(1, label, cost=cost):
+            admitted.append(label)
+
+    release = asyncio.Event()
+
+    async def blocker():
+        async with controller.slot(1, "blocker", cost=1.0):
+            await release.wait()
+
+    tasks = [asyncio.create_task(blocker())]
+    while controller.running == 0:
+        await asyncio.sleep(0)
+
+    for count, (label, cost, waited) in enumerate(jobs, start=1):
+        tasks.append(asyncio.create_task(run(label, cost)))
+        await wait_for_waiters(controller, count)
+        clock.now += waited
+
+    release.set()
+    await asyncio.gather(*tasks)
+    return admitted
+
+
+def test_shortest_predicted_job_first(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ADMISSION_AGING_FACTOR", 0.0)
+    controller = make_controller(tmp_path)
+    jobs = [("long", 300.0, 1), ("short", 20.0, 1), ("medium", 90.0, 1), ("unknown", 0.0, 1), ("tie", 20.0, 1)]
+
+    order = asyncio.run(admission_order(controller, clock, jobs))
+
+    # Unknown cost first, equal costs in arrival order
+    assert order == ["unknown", "short", "tie", "medium", "long"]
+
+
+def test_aging_lets_long_waiting_job_go_first(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ADMISSION_AGING_FACTOR", 1.0)
+    controller = make_controller(tmp_path)
+    # "long" has waited 295s when "short" arrives: 300 - 295 = 5s aged cost beats 20s
+    jobs = [("long", 300.0, 295), ("short", 20.0, 0)]
+
+    assert asyncio.run(admission_order(controller, clock, jobs)) == ["long", "short"]
+
+
+def test_without_enough_waiting_shorter_job_still_wins(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ADMISSION_AGING_FACTOR", 1.0)
+    controller = make_controller(tmp_path)
+    jobs = [("long", 300.0, 200), ("short", 20.0, 0)]
+
+    assert asyncio.run(admission_order(controller, clock, jobs)) == ["short", "long"]
+
+
+async def stream_order(controller, clock, long_cost, short_jobs):
+    """
+    A long job waits while short jobs keep arriving, one during each 20s run;
+    returns the admission order.
+    """
+    admitted = []
+    tasks = []
+    arrivals = iter(range(short_jobs))
+
+    async def run(label, cost):
+        async with controller.slot(1, label, cost=cost):
+            admitted.append(label)
+            clock.now += 20
+            arrival = next(arrivals, None)
+            if arrival is not None:
+                waiting = len(controller._waiters)
+                tasks.append(asyncio.create_task(run(f"short{arrival}", 10.0)))
+                await wait_for_waiters(controller, waiting + 1)
+
+    release = asyncio.Event()
+
+    async def blocker():
+        async with controller.slot(1, "blocker", cost=1.0):
+            await release.wait()
+
+    first = asyncio.create_task(blocker())
+    while controller.running == 0:
+        await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(run("long", long_cost)))
+    await wait_for_waiters(controller, 1)
+    tasks.append(asyncio.create_task(run(f"short{next(arrivals)}", 10.0)))
+    await wait_for_waiters(controller, 2)
+
+    release.set()
+    await first
+    while not all(task.done() for task in tasks):
+        await asyncio.gather(*tasks)
+    return admitted
+
+
+def test_stream_of_short_jobs_starves_long_job_without_aging(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ADMISSION_AGING_FACTOR", 0.0)
+    order = asyncio.run(stream_order(make_controller(tmp_path), clock, long_cost=100.0, short_jobs=12))
+    assert order[-1] == "long"
+
+
+def test_aging_prevents_starvation_by_a_stream_of_short_jobs(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ADMISSION_AGING_FACTOR", 1.0)
+    order = asyncio.run(stream_order(make_controller(tmp_path), clock, long_cost=100.0, short_jobs=12))
+
+    # Each fresh short job has waited one 20s run (aged cost -10); the long job
+    # overtakes them once its aged cost 100 - waited drops below that
+    assert order.index("long") == 5
+    assert [label for label in order if label != "long"] == [f"short{n}" for n in range(12)]
+
+
+def test_idle_worker_always_admits(tmp_path, monkeypatch):
+    monkeypatch.setattr(admission_controller, "ADMISSION_POLL_INTERVAL", 0.01)
+    controller = make_controller(tmp_path, capacity=2, pressure="CPU at 99%")
+
+    async def scenario():
+        # Over capacity and under resource pressure, but nothing else is running
+        async with controller.slot(5, "video", cost=600.0):
+            assert controller.running == 1
+            assert controller.in_use == 2  # weight is capped at capacity
+
+            # A second task waits while the first one runs
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(controller.slot(1, "audio").__aenter__(), timeout=0.1)
+
+        async with controller.slot(1, "audio"):
+            assert controller.running == 1
+
+    asyncio.run(scenario())
+    assert controller.get_stats() == {"capacity": 2, "in_use": 0, "running": 0, "waiting": 0}
+
+
+def test_second_task_admitted_when_slots_and_resources_allow(tmp_path):
+    controller = make_controller(tmp_path, capacity=3)
+
+    async def scenario():
+        async with controller.slot(2, "video"):
+            async with controller.slot(1, "audio"):
+                assert (controller.in_use, controller.running) == (3, 2)
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
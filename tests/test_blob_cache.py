@@ -0,0 +1,199 @@
+"""
+Blob downloads: ranges pinned to one ETag and resumed after network errors,
+MD5 verified, and a cache revalidated by ETag with one counted lookup per download
+"""
+import asyncio
+import hashlib
+import os
+import types
+import pytest
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceModifiedError
+from src.services import azure_blob_service
+from src.services.azure_blob_service import AzureBlobService
+from src.services.blob_cache import BlobCache
+
+CONTAINER = "eduva-temp-storage"
+
+
+class FakeStream:
+    def __init__(self, data: bytes, offset: int, total: int, etag: str, content_md5=None, fail_after=None):
+        self.data = data
+        self.fail_after = fail_after
+        self.properties = types.SimpleNamespace(
+            etag=etag,
+            content_range=f"bytes {offset}-{offset + max(len(data), 1) - 1}/{total}",
+            content_settings=types.SimpleNamespace(content_md5=content_md5),
+        )
+
+    async def chunks(self):
+        if self.fail_after is None:
+            yield self.data
+            return
+        yield self.data[:self.fail_after]
+        raise ConnectionError("connection reset by peer")
+
+
+class FakeBlobClient:
+    """One blob answering ranged and conditional GETs the way Blob Storage does"""
+
+    blob_name = "lesson.json"
+
+    def __init__(self, data: bytes, etag: str, content_md5=None):
+        self.data = data
+        self.etag = etag
+        self.content_md5 = content_md5
+        self.downloads = 0
+        self.requests = []
+        # Range offset -> bytes sent before the connection drops, once
+        self.drop_connection = {}
+        # Called with the range offset before it is served
+        self.before_range = None
+
+    async def download_blob(self, offset=0, length=None, etag=None, match_condition=None):
+        if self.before_range:
+            self.before_range(self, offset)
+        if match_condition == MatchConditions.IfModified and etag == self.etag:
+            error = HttpResponseError(message="Not Modified")
+            error.status_code = 304
+            raise error
+        if match_condition == MatchConditions.IfNotModified and etag != self.etag:
+            error = ResourceModifiedError(message="The condition specified using HTTP conditional header(s) is not met.")
+            error.status_code = 412
+            raise error
+        self.downloads += 1
+        self.requests.append((offset, length))
+        end = len(self.data) if length is None else offset + length
+        return FakeStream(
+            self.data[offset:end], offset, len(self.data), self.etag,
+            content_md5=self.content_md5, fail_after=self.drop_connection.pop(offset, None)
+        )
+
+
+def make_service(tmp_path, client):
+    service = AzureBlobService.__new__(AzureBlobService)
+    service.cache = BlobCache(str(tmp_path / "cache"), max_size_mb=8, containers=CONTAINER)
+    service.block_size = 4
+    service.max_concurrency = 2
+    service.blob_service_client = types.SimpleNamespace(get_blob_client=lambda container, blob: client)
+    return service
+
+
+def download(service, path):
+    return asyncio.run(service.download_file(CONTAINER, "lesson.json", str(path)))
+
+
+def test_unchanged_blob_comes_from_cache(tmp_path):
+    blob = FakeBlobClient(b'{"slides": [1, 2, 3]}', '"0x1"')
+    service = make_service(tmp_path, blob)
+
+    download(service, tmp_path / "first.json")
+    downloads = blob.downloads
+    download(service, tmp_path / "second.json")
+
+    assert blob.downloads == downloads
+    assert (tmp_path / "second.json").read_bytes() == blob.data
+    stats = service.cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stale']) == (1, 1, 0)
+
+
+def test_evicted_entry_after_304_counts_one_miss(tmp_path):
+    blob = FakeBlobClient(b'{"slides": [1, 2, 3]}', '"0x1"')
+    service = make_service(tmp_path, blob)
+    download(service, tmp_path / "first.json")
+
+    # Another worker sharing the directory evicted the entry, the index still lists it
+    key = BlobCache.make_key(CONTAINER, "lesson.json", '"0x1"')
+    os.remove(service.cache._entry_path(key))
+    download(service, tmp_path / "second.json")
+
+    assert (tmp_path / "second.json").read_bytes() == blob.data
+    stats = service.cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stale']) == (0, 2, 0)
+    # Downloaded again and cached
+    assert service.cache.contains(key)
+
+
+def test_changed_blob_is_a_stale_miss(tmp_path):
+    blob = FakeBlobClient(b"version one", '"0x1"')
+    service = make_service(tmp_path, blob)
+    download(service, tmp_path / "first.txt")
+
+    blob.data, blob.etag = b"version two!", '"0x2"'
+    download(service, tmp_path / "second.txt")
+
+    assert (tmp_path / "second.txt").read_bytes() == b"version two!"
+    stats = service.cache.get_stats()
+    assert (stats['misses'], stats['stale'], stats['entries']) == (2, 1, 1)
+    assert service.cache.cached_etag(CONTAINER, "lesson.json") == '"0x2"'
+
+
+@pytest.fixture
+def no_retry_wait(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_wait(delay):
+        await real_sleep(0)
+
+    monkeypatch.setattr(azure_blob_service.asyncio, "sleep", no_wait)
+
+
+def test_dropped_range_resumes_from_last_byte(tmp_path, no_retry_wait):
+    data = b"0123456789abcdefghijk"
+    blob = FakeBlobClient(data, '"0x1"', content_md5=hashlib.md5(data).digest())
+    blob.drop_connection = {8: 3}
+    service = make_service(tmp_path, blob)
+
+    download(service, tmp_path / "lesson.json")
+
+    assert (tmp_path / "lesson.json").read_bytes() == data
+    # The range at 8 failed after 3 bytes and was asked again for the last one only
+    assert (8, 4) in blob.requests and (11, 1) in blob.requests
+    assert service.cache.cached_etag(CONTAINER, "lesson.json") == '"0x1"'
+
+
+def test_blob_changed_mid_download_fails_without_file_or_cache_entry(tmp_path):
+    blob = FakeBlobClient(b"0123456789abcdefghijk", '"0x1"')
+
+    def overwrite(client, offset):
+        if offset == 8:
+            client.data, client.etag = b"a new version of the lesson", '"0x2"'
+    blob.before_range = overwrite
+    service = make_service(tmp_path, blob)
+
+    with pytest.raises(ResourceModifiedError):
+        download(service, tmp_path / "lesson.json")
+
+    # Ranges of the new version were never mixed into the file or the cache
+    assert not (tmp_path / "lesson.json").exists()
+    assert service.cache.cached_etag(CONTAINER, "lesson.json") is None
+    assert service.cache.get_stats()['entries'] == 0
+
+
+def test_md5_mismatch_fails_without_file_or_cache_entry(tmp_path):
+    blob = FakeBlobClient(b"0123456789abcdefghijk", '"0x1"', content_md5=hashlib.md5(b"other content").digest())
+    service = make_service(tmp_path, blob)
+
+    with pytest.raises(ValueError, match="MD5 mismatch"):
+        download(service, tmp_path / "lesson.json")
+
+    assert not (tmp_path / "lesson.json").exists()
+    assert service.cache.cached_etag(CONTAINER, "lesson.json") is None
+    assert service.cache.get_stats()['entries'] == 0
+
+
+def test_range_failing_every_attempt_fails_the_download(tmp_path, no_retry_wait, monkeypatch):
+    monkeypatch.setattr(azure_blob_service, "AZURE_DOWNLOAD_RETRIES", 2)
+    blob = FakeBlobClient(b"0123456789abcdefghijk", '"0x1"')
+
+    def drop(client, offset):
+        if offset >= 8:
+            client.drop_connection[offset] = 0
+    blob.before_range = drop
+    service = make_service(tmp_path, blob)
+
+    with pytest.raises(ConnectionError):
+        download(service, tmp_path / "lesson.json")
+
+    assert not (tmp_path / "lesson.json").exists()
+    assert service.cache.get_stats()['entries'] == 0
@@ -0,0 +1,96 @@
+"""
+Streamed block blob upload: blocks staged while written, committed only on success
+"""
+import asyncio
+import base64
+import pytest
+from src.services.azure_blob_service import BlockBlobStreamUpload
+
+
+class FakeBlockBlobClient:
+    """Records staged blocks and the committed block list like Blob Storage keeps them"""
+
+    blob_name = "product.mp4"
+    url = "https://example.blob.core.windows.net/products/product.mp4"
+
+    def __init__(self, fail_on_block=None, stage_delay=0.0):
+        self.fail_on_block = fail_on_block
+        self.stage_delay = stage_delay
+        self.staged = {}
+        self.committed = None
+        self.content_type = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def stage_block(self, block_id, data, validate_content=False):
+        assert validate_content
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.stage_delay)
+            if len(self.staged) == self.fail_on_block:
+                raise ConnectionError("connection reset")
+            self.staged[block_id] = data
+        finally:
+            self.in_flight -= 1
+
+    async def commit_block_list(self, blocks, content_settings=None):
+        self.committed = [block.id for block in blocks]
+        self.content_type = content_settings.content_type if content_settings else None
+
+    def content(self):
+        return b"".join(self.staged[block_id] for block_id in self.committed)
+
+
+def test_blocks_are_staged_while_writing_and_committed_in_order():
+    async def scenario():
+        client = FakeBlockBlobClient(stage_delay=0.01)
+        upload = BlockBlobStreamUpload(client, "video/mp4", block_size=4, max_concurrency=2)
+        for chunk in (b"abc", b"defgh", b"ijklmnop", b"qr"):
+            await upload.write(chunk)
+        staged_before_commit = len(upload.block_ids)
+        url = await upload.commit()
+        return client, upload, staged_before_commit, url
+
+    client, upload, staged_before_commit, url = asyncio.run(scenario())
+
+    # Four full blocks went out before commit(), the 2-byte tail with it
+    assert staged_before_commit == 4
+    assert client.content() == b"abcdefghijklmnopqr"
+    assert client.committed == upload.block_ids
+    assert len({len(base64.b64decode(block_id)) for block_id in upload.block_ids}) == 1
+    assert client.max_in_flight <= 2
+    assert client.content_type == "video/mp4"
+    assert url == client.url
+    assert upload.bytes_written == 18
+
+
+def test_failed_block_is_raised_and_nothing_is_committed():
+    async def scenario():
+        client = FakeBlockBlobClient(fail_on_block=1)
+        upload = BlockBlobStreamUpload(client, "video/mp4", block_size=4, max_concurrency=1)
+        with pytest.raises(RuntimeError, match="connection reset"):
+            for _ in range(4):
+                await upload.write(b"abcd")
+            await upload.commit()
+        return client
+
+    client = asyncio.run(scenario())
+
+    assert client.committed is None
+
+
+def test_abort_stops_staging_without_commit():
+    async def scenario():
+        client = FakeBlockBlobClient(stage_delay=10)
+        upload = BlockBlobStreamUpload(client, "video/mp4", block_size=4, max_concurrency=2)
+        await upload.write(b"abcdefgh")
+        await upload.abort()
+        return client, upload
+
+    client, upload = asyncio.run(scenario())
+
+    assert client.committed is None
+    assert client.staged == {}
+    assert client.in_flight == 0
+    assert not upload._staging
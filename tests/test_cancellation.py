@@ -0,0 +1,91 @@
+"""
+Cancellation tokens: cancelling stops waits, kills tracked processes and reaches child tokens
+"""
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from src.services.slide_pipeline import PipelineStage, SlidePipeline
+from src.utils.cancellation import CancellationToken, OperationCancelled
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+def test_cancel_kills_tracked_process():
+    token = CancellationToken()
+    process = subprocess.Popen(SLEEPER)
+    with token.track(process):
+        token.cancel("job cancelled")
+        assert process.wait(timeout=5) != 0
+    assert token.reason == "job cancelled"
+    with pytest.raises(OperationCancelled, match="job cancelled"):
+        token.raise_if_cancelled()
+
+
+def test_process_tracked_after_cancel_is_killed_at_once():
+    token = CancellationToken()
+    token.cancel()
+    process = subprocess.Popen(SLEEPER)
+    with token.track(process):
+        assert process.wait(timeout=5) != 0
+
+
+def test_cancel_reaches_children_but_not_closed_ones():
+    job = CancellationToken()
+    running = job.child()
+    finished = job.child()
+    finished.close()
+
+    job.cancel("job cancelled")
+    late = job.child()
+
+    assert running.cancelled and running.reason == "job cancelled"
+    assert not finished.cancelled
+    assert late.cancelled
+    # A child cancelled on its own leaves its parent alone
+    other = CancellationToken()
+    other.child().cancel()
+    assert not other.cancelled
+
+
+def test_sleep_ends_when_cancelled():
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel, args=("stage timed out",)).start()
+    start = time.monotonic()
+    with pytest.raises(OperationCancelled, match="stage timed out"):
+        token.sleep(30)
+    assert time.monotonic() - start < 5
+
+
+def test_cancelled_job_kills_running_slide_and_skips_queued_ones():
+    job_token = CancellationToken()
+    started = []
+    processes = []
+    render_running = threading.Event()
+
+    def render(ctx, token):
+        started.append(ctx["slide_index"])
+        process = subprocess.Popen(SLEEPER)
+        processes.append(process)
+        with token.track(process):
+            render_running.set()
+            process.wait()
+        token.raise_if_cancelled()
+        return ctx
+
+    def cancel_job():
+        render_running.wait(5)
+        job_token.cancel("job cancelled")
+
+    threading.Thread(target=cancel_job, daemon=True).start()
+    pipeline = SlidePipeline([PipelineStage("render", render, timeout=30)], cancel_token=job_token)
+    start = time.monotonic()
+
+    results = asyncio.run(asyncio.wait_for(pipeline.run([{"slide_index": i} for i in range(5)]), timeout=10))
+
+    assert results == []
+    assert started == [0]
+    assert processes[0].returncode != 0
+    assert time.monotonic() - start < 5
@@ -0,0 +1,109 @@
+"""
+JobCostEstimator: least-squares fit of job durations from lesson features
+"""
+import json
+import pytest
+from src.models.task_messages import JobType
+from src.services.cost_estimator import (
+    JobCostEstimator, lesson_features, message_features, DEFAULT_COEFFICIENTS, COST_MODEL_MIN_SAMPLES,
+    TYPICAL_LESSON_FEATURES
+)
+
+# Seconds = 4 + 3 per slide + 12 per 1000 narration characters + 0.5 per image keyword
+TRUE_COEFFICIENTS = [4.0, 3.0, 12.0, 0.5]
+
+
+def lesson(slides, chars_per_slide, keywords_per_slide):
+    return {
+        "slides": [
+            {"tts_script": "a" * chars_per_slide, "image_keywords": ["k"] * keywords_per_slide}
+            for _ in range(slides)
+        ]
+    }
+
+
+def true_seconds(features):
+    return sum(c * f for c, f in zip(TRUE_COEFFICIENTS, features))
+
+
+LESSONS = [lesson(slides, chars, keywords) for slides, chars, keywords in (
+    (3, 200, 1), (5, 400, 2), (8, 250, 0), (12, 600, 3), (2, 900, 1),
+    (20, 300, 2), (6, 150, 4), (15, 700, 1), (9, 500, 0), (4, 350, 3),
+)]
+
+
+def test_lesson_features():
+    content = {"slides": [{"tts_script": "x" * 1500, "image_keywords": ["a", "b"]}, {"tts_script": None}, {}]}
+    assert lesson_features(content) == [1.0, 3.0, 1.5, 2.0]
+    assert lesson_features({}) == [1.0, 0.0, 0.0, 0.0]
+
+
+def test_message_features():
+    body = {"jobId": "j", "slideCount": 12, "narrationChars": "4500", "imageKeywordCount": 9}
+    assert message_features(body) == [1.0, 12.0, 4.5, 9.0]
+    assert message_features({"slideCount": 3}) == [1.0, 3.0, 0.0, 0.0]
+    # Without a slide count there is nothing to predict from
+    assert message_features({"narrationChars": 100}) is None
+    assert message_features({"slideCount": "many"}) is None
+
+
+def test_typical_features_follow_recorded_jobs(tmp_path):
+    estimator = JobCostEstimator(str(tmp_path / "model.json"))
+    assert estimator.typical_features(JobType.VIDEO_LESSON) == TYPICAL_LESSON_FEATURES
+
+    for content in (lesson(4, 500, 1), lesson(8, 1000, 3)):
+        estimator.record(JobType.VIDEO_LESSON, lesson_features(content), 60.0)
+    assert estimator.typical_features(JobType.VIDEO_LESSON) == pytest.approx([1.0, 6.0, 5.0, 14.0])
+    assert estimator.typical_features(JobType.AUDIO_LESSON) == TYPICAL_LESSON_FEATURES
+
+
+def test_defaults_until_enough_samples(tmp_path):
+    estimator = JobCostEstimator(str(tmp_path / "model.json"))
+    features = lesson_features(LESSONS[0])
+    default = sum(c * f for c, f in zip(DEFAULT_COEFFICIENTS[JobType.VIDEO_LESSON.name], features))
+
+    for content in LESSONS[:COST_MODEL_MIN_SAMPLES - 1]:
+        estimator.record(JobType.VIDEO_LESSON, lesson_features(content), true_seconds(lesson_features(content)))
+
+    assert estimator.predict(JobType.VIDEO_LESSON, features) == pytest.approx(default)
+
+
+def test_fit_recovers_linear_model(tmp_path):
+    estimator = JobCostEstimator(str(tmp_path / "model.json"))
+    for content in LESSONS:
+        estimator.record(JobType.VIDEO_LESSON, lesson_features(content), true_seconds(lesson_features(content)))
+
+    assert estimator.coefficients[JobType.VIDEO_LESSON.name] == pytest.approx(TRUE_COEFFICIENTS)
+    unseen = lesson_features(lesson(30, 800, 2))
+    assert estimator.predict(JobType.VIDEO_LESSON, unseen) == pytest.approx(true_seconds(unseen))
+    # Other job types keep their own model
+    assert estimator.coefficients[JobType.AUDIO_LESSON.name] == DEFAULT_COEFFICIENTS[JobType.AUDIO_LESSON.name]
+
+
+def test_prediction_is_at_least_one_second(tmp_path):
+    estimator = JobCostEstimator(str(tmp_path / "model.json"))
+    for content in LESSONS:
+        estimator.record(JobType.AUDIO_LESSON, lesson_features(content), 0.0)
+    assert estimator.predict(JobType.AUDIO_LESSON, lesson_features(LESSONS[0])) == 1.0
+
+
+def test_samples_persist_and_are_capped(tmp_path):
+    model_path = tmp_path / "model.json"
+    estimator = JobCostEstimator(str(model_path), max_samples=COST_MODEL_MIN_SAMPLES)
+    for content in LESSONS:
+        estimator.record(JobType.VIDEO_LESSON, lesson_features(content), true_seconds(lesson_features(content)))
+
+    saved = json.loads(model_path.read_text())
+    assert len(saved["samples"][JobType.VIDEO_LESSON.name]) == COST_MODEL_MIN_SAMPLES
+    # Only the newest samples are kept
+    assert saved["samples"][JobType.VIDEO_LESSON.name][-1][:-1] == lesson_features(LESSONS[-1])
+
+    restarted = JobCostEstimator(str(model_path))
+    assert restarted.coefficients[JobType.VIDEO_LESSON.name] == pytest.approx(TRUE_COEFFICIENTS)
+
+
+def test_unreadable_model_file_is_ignored(tmp_path):
+    model_path = tmp_path / "model.json"
+    model_path.write_text("{not json")
+    estimator = JobCostEstimator(str(model_path))
+    assert estimator.coefficients == DEFAULT_COEFFICIENTS
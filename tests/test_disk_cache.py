@@ -0,0 +1,85 @@
+"""
+DiskLRUCache eviction and restart recovery, TTSCache keys
+"""
+import os
+from src.services.disk_cache import DiskLRUCache
+from src.services.tts_cache import TTSCache
+
+MB = 1024 * 1024
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_size_mb=2)
+    cache.put("a", b"x" * (MB // 2))
+    cache.put("b", b"x" * (MB // 2))
+    cache.put("c", b"x" * (MB // 2))
+    # Reading "a" makes "b" the oldest entry
+    assert cache.get("a", str(tmp_path / "out"))
+
+    cache.put("d", b"x" * MB)
+
+    assert not cache.contains("b")
+    assert all(cache.contains(key) for key in ("a", "c", "d"))
+    assert not os.path.exists(cache._entry_path("b"))
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_get_copies_entry_and_counts_hits(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"))
+    cache.put("key", b"payload")
+    output = tmp_path / "copy"
+
+    assert cache.get("key", str(output))
+    assert output.read_bytes() == b"payload"
+    assert not cache.get("other", str(output))
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+
+
+def test_index_recovered_after_restart_in_recency_order(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_size_mb=1)
+    for index, key in enumerate(("old", "middle", "new")):
+        cache.put(key, b"x" * (MB // 4))
+        os.utime(cache._entry_path(key), (1000 + index, 1000 + index))
+
+    restarted = DiskLRUCache(str(tmp_path), max_size_mb=1)
+    assert restarted.get_stats()['entries'] == 3
+    assert restarted.get_stats()['size_mb'] == 0.75
+
+    restarted.put("newest", b"x" * (MB // 2))
+    assert not restarted.contains("old")
+    assert all(restarted.contains(key) for key in ("middle", "new", "newest"))
+
+
+def test_leftover_temp_files_removed_on_start(tmp_path):
+    (tmp_path / "tmpabc123.tmp").write_bytes(b"partial write")
+    (tmp_path / "kept.entry").write_bytes(b"complete")
+
+    cache = DiskLRUCache(str(tmp_path))
+
+    assert not (tmp_path / "tmpabc123.tmp").exists()
+    assert cache.contains("kept")
+
+
+def test_discard_removes_entry(tmp_path):
+    cache = DiskLRUCache(str(tmp_path))
+    cache.put("key", b"payload")
+    cache.discard("key")
+    cache.discard("missing")
+    assert not cache.contains("key")
+    assert cache.get_stats()['size_mb'] == 0
+
+
+def test_tts_key_covers_every_synthesis_input():
+    base = ("Xin chào", "vi-VN-Neural2-A", "vi-VN", 1.1, 24000, "LINEAR16")
+    key = TTSCache.make_key(*base)
+
+    assert key == TTSCache.make_key(*base)
+    assert len(key) == 64
+    for index, changed in enumerate(("Xin chào!", "vi-VN-Neural2-D", "en-US", 1.2, 44100, "MP3")):
+        variant = list(base)
+        variant[index] = changed
+        assert TTSCache.make_key(*variant) != key
+    # Rates are compared as numbers
+    assert TTSCache.make_key("a", "v", "l", 1, 0, "e") == TTSCache.make_key("a", "v", "l", 1.0, 0, "e")
@@ -0,0 +1,76 @@
+"""
+FFmpegRenderer.build_plan: one millisecond timeline for every image and narration
+"""
+import random
+import pytest
+from src.services.ffmpeg_renderer import FFmpegRenderer
+
+
+def make_slides(tmp_path, count, seed=7):
+    rng = random.Random(seed)
+    slides = []
+    for slide_id in range(1, count + 1):
+        images = []
+        for image_index in range(rng.randint(1, 4)):
+            path = tmp_path / f"slide_{slide_id}_{image_index}.jpg"
+            path.write_bytes(b"jpg")
+            images.append({'path': str(path), 'duration': rng.uniform(0.3, 6.0)})
+        # Timing leaves image durations up to 0.5s off the narration
+        total = sum(img['duration'] for img in images) + rng.uniform(-0.5, 0.5)
+        slides.append({
+            'slide_id': slide_id,
+            'images': images,
+            'total_duration': total,
+            'audio_path': str(tmp_path / f"audio_{slide_id}.wav"),
+        })
+    return slides
+
+
+def test_timeline_is_contiguous_and_adds_up(tmp_path):
+    slides = make_slides(tmp_path, 40)
+    plan = FFmpegRenderer().build_plan(slides)
+
+    total_ms = round(plan['total_duration'] * 1000)
+    cursor = 0
+    for video_input in plan['video_inputs']:
+        assert video_input['start_ms'] == cursor
+        assert video_input['duration_ms'] > 0
+        cursor += video_input['duration_ms']
+    assert cursor == total_ms
+    assert sum(audio['duration_ms'] for audio in plan['audio_inputs']) == total_ms
+
+
+def test_no_drift_over_many_slides(tmp_path):
+    # Per-slide rounding of 1.0005s would lose up to 0.5ms a slide; the timeline must not
+    slides = make_slides(tmp_path, 1)
+    image = slides[0]['images'][0]
+    slides = [
+        {'slide_id': n, 'images': [dict(image, duration=1.0005)], 'total_duration': 1.0005,
+         'audio_path': slides[0]['audio_path']}
+        for n in range(1, 1001)
+    ]
+    plan = FFmpegRenderer().build_plan(slides)
+
+    assert plan['total_duration'] == pytest.approx(1000.5, abs=0.001)
+    exact_ms = sum(slide['total_duration'] for slide in slides) * 1000
+    assert abs(sum(audio['duration_ms'] for audio in plan['audio_inputs']) - exact_ms) < 1
+
+
+def test_each_slide_audio_matches_its_images(tmp_path):
+    slides = make_slides(tmp_path, 12, seed=3)
+    plan = FFmpegRenderer().build_plan(slides)
+
+    video_inputs = iter(plan['video_inputs'])
+    for slide, audio in zip(slides, plan['audio_inputs']):
+        span = sum(next(video_inputs)['duration_ms'] for _ in slide['images'])
+        assert span == audio['duration_ms']
+
+
+def test_missing_images_are_skipped(tmp_path):
+    slides = make_slides(tmp_path, 3)
+    slides[1]['images'] = [{'path': str(tmp_path / "missing.jpg"), 'duration': 2.0}]
+    plan = FFmpegRenderer().build_plan(slides)
+    assert len(plan['audio_inputs']) == 2
+
+    with pytest.raises(ValueError):
+        FFmpegRenderer().build_plan([slides[1]])
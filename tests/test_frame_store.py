@@ -0,0 +1,65 @@
+"""
+frame_store: raw frames in shared memory, the temp dir when shared memory is full
+"""
+import errno
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from src.services import frame_store
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    shm_dir, temp_dir = tmp_path / "shm", tmp_path / "tmp"
+    shm_dir.mkdir()
+    temp_dir.mkdir()
+    monkeypatch.setattr(frame_store, "_SHM_DIR", str(shm_dir))
+    monkeypatch.setattr(frame_store.tempfile, "gettempdir", lambda: str(temp_dir))
+    return shm_dir, temp_dir
+
+
+def test_round_trip_in_shared_memory(dirs):
+    shm_dir, _ = dirs
+    job_dir = frame_store.create_job_frame_dir()
+    path = frame_store.new_frame_path("content_1", job_dir)
+    img = Image.new('RGB', (8, 4), (10, 20, 30))
+
+    assert frame_store.write_frame(img, path) == path
+    assert path.startswith(str(shm_dir))
+    frame = frame_store.read_frame(path, (8, 4))
+    assert frame.shape == (4, 8, 3)
+    assert np.all(frame == [10, 20, 30])
+
+
+def test_full_shared_memory_falls_back_to_temp_dir(dirs, monkeypatch):
+    shm_dir, temp_dir = dirs
+    job_dir = frame_store.create_job_frame_dir()
+    path = frame_store.new_frame_path("content_1", job_dir)
+    real_open = open
+
+    def full_shm_open(file, mode='r', *args, **kwargs):
+        handle = real_open(file, mode, *args, **kwargs)
+        if str(file).startswith(str(shm_dir)) and 'w' in mode:
+            handle.close()
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return handle
+
+    with monkeypatch.context() as patch:
+        patch.setattr("builtins.open", full_shm_open)
+        written = frame_store.write_frame(Image.new('L', (8, 4), 200), path)
+
+    assert written.startswith(str(temp_dir))
+    assert os.path.basename(written) == os.path.basename(path)
+    assert not os.path.exists(path)
+    assert np.all(frame_store.read_frame(written, (8, 4)) == 200)
+
+    # Removing the job's frame directory also removes its fallback frames
+    frame_store.remove_frame_dir(job_dir)
+    assert not os.path.exists(job_dir)
+    assert not os.path.exists(written)
+
+
+def test_write_error_outside_shared_memory_is_raised(dirs, tmp_path):
+    with pytest.raises(OSError):
+        frame_store.write_frame(Image.new('RGB', (2, 2)), str(tmp_path / "missing" / "frame.rgb"))
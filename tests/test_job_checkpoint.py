@@ -0,0 +1,145 @@
+"""
+Job checkpoints: resume completed work for the same inputs, on this or another worker
+"""
+import asyncio
+import os
+import time
+import pytest
+from src.services.local_storage_service import LocalStorageService
+from src.services.job_checkpoint import JobCheckpoint, cleanup_expired_checkpoints, job_fingerprint
+
+CONTAINER = "checkpoints"
+LESSON = {"lesson_info": {"title": "Photosynthesis"}, "slides": [{"title": "Light"}, {"title": "Water"}]}
+VOICE = {"language_code": "vi-VN", "name": "vi-VN-Standard-A", "speaking_rate": 1.0}
+
+
+def fingerprint(lesson=LESSON, voice=VOICE):
+    # Same parts as ProductCreationHandler._open_checkpoint
+    return job_fingerprint("lessons/lesson.json", "VIDEO_LESSON", voice, lesson)
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+async def first_attempt(root_dir, artifact, storage=None):
+    checkpoint = JobCheckpoint("job-1", fingerprint(), root_dir=root_dir,
+                               blob_service=storage, blob_container=CONTAINER)
+    await checkpoint.load()
+    await checkpoint.complete_stage("product", artifact_path=artifact, duration=42.0)
+    return checkpoint
+
+
+def test_completed_stage_is_skipped_on_resume(tmp_path):
+    root_dir = str(tmp_path / "checkpoints")
+    artifact = write(tmp_path / "work" / "video.mp4", b"rendered video")
+
+    async def scenario():
+        await first_attempt(root_dir, artifact)
+        retry = JobCheckpoint("job-1", fingerprint(), root_dir=root_dir)
+        resumable = await retry.load()
+        return retry, resumable, await retry.fetch_stage_artifact("product")
+
+    retry, resumable, product_path = asyncio.run(scenario())
+
+    assert resumable and retry.resumed
+    assert retry.get_stage("product")["duration"] == 42.0
+    assert retry.get_stage("upload") is None
+    with open(product_path, "rb") as product_file:
+        assert product_file.read() == b"rendered video"
+
+
+@pytest.mark.parametrize("changed", [
+    {"lesson": {**LESSON, "slides": [{"title": "Light"}, {"title": "Carbon dioxide"}]}},
+    {"voice": {**VOICE, "speaking_rate": 1.25}},
+])
+def test_changed_lesson_or_voice_starts_over(tmp_path, changed):
+    root_dir = str(tmp_path / "checkpoints")
+    artifact = write(tmp_path / "work" / "video.mp4", b"rendered video")
+
+    async def scenario():
+        await first_attempt(root_dir, artifact)
+        retry = JobCheckpoint("job-1", fingerprint(**changed), root_dir=root_dir)
+        resumable = await retry.load()
+        return retry, resumable, await retry.fetch_stage_artifact("product")
+
+    retry, resumable, product_path = asyncio.run(scenario())
+
+    assert not resumable and not retry.resumed
+    assert retry.get_stage("product") is None
+    assert product_path is None
+    # The old artifact is gone, not just ignored
+    assert os.listdir(retry.directory) == []
+
+
+def test_retry_on_another_worker_resumes_from_blob_storage(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "blobs"))
+    artifact = write(tmp_path / "work" / "video.mp4", b"rendered video")
+    segment = write(tmp_path / "work" / "segment_1.mp4", b"slide one")
+
+    async def scenario():
+        checkpoint = await first_attempt(str(tmp_path / "worker-a"), artifact, storage)
+        checkpoint.record_slide(0, "key-0", segment)
+        flushed = await checkpoint.flush()
+
+        retry = JobCheckpoint("job-1", fingerprint(), root_dir=str(tmp_path / "worker-b"),
+                              blob_service=storage, blob_container=CONTAINER)
+        resumable = await retry.load()
+        product_path = await retry.fetch_stage_artifact("product")
+        restored = await retry.restore_slide(0, "key-0", str(tmp_path / "restored.mp4"))
+        changed_slide = await retry.restore_slide(0, "key-changed", str(tmp_path / "changed.mp4"))
+        return flushed, resumable, product_path, restored, changed_slide
+
+    flushed, resumable, product_path, restored, changed_slide = asyncio.run(scenario())
+
+    assert flushed == 1
+    assert resumable
+    assert product_path.startswith(str(tmp_path / "worker-b"))
+    assert restored and (tmp_path / "restored.mp4").read_bytes() == b"slide one"
+    assert not changed_slide
+
+
+def test_discard_removes_local_and_mirrored_files(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "blobs"))
+    artifact = write(tmp_path / "work" / "video.mp4", b"rendered video")
+
+    async def scenario():
+        checkpoint = await first_attempt(str(tmp_path / "checkpoints"), artifact, storage)
+        await checkpoint.discard()
+        return checkpoint, await storage.list_blobs(CONTAINER)
+
+    checkpoint, blobs = asyncio.run(scenario())
+
+    assert not os.path.exists(checkpoint.directory)
+    assert blobs == []
+
+
+def test_expired_checkpoints_are_swept(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "blobs"))
+    root_dir = str(tmp_path / "checkpoints")
+    artifact = write(tmp_path / "work" / "video.mp4", b"rendered video")
+    two_days_ago = time.time() - 48 * 3600
+
+    async def scenario():
+        for job_id in ("abandoned", "running"):
+            checkpoint = JobCheckpoint(job_id, fingerprint(), root_dir=root_dir,
+                                       blob_service=storage, blob_container=CONTAINER)
+            await checkpoint.load()
+            await checkpoint.complete_stage("product", artifact_path=artifact)
+        abandoned = os.path.join(root_dir, "job_abandoned")
+        os.utime(abandoned, (two_days_ago, two_days_ago))
+        for blob in await storage.list_blobs(CONTAINER, prefix="checkpoints/abandoned/"):
+            os.utime(storage._blob_path(CONTAINER, blob["name"]), (two_days_ago, two_days_ago))
+
+        deleted = await cleanup_expired_checkpoints(storage, CONTAINER, root_dir=root_dir, ttl_hours=24, force=True)
+        throttled = await cleanup_expired_checkpoints(storage, CONTAINER, root_dir=root_dir, ttl_hours=0)
+        return deleted, throttled, [blob["name"] for blob in await storage.list_blobs(CONTAINER)]
+
+    deleted, throttled, remaining = asyncio.run(scenario())
+
+    assert deleted == 2
+    assert throttled == 0
+    assert sorted(os.listdir(root_dir)) == ["job_running"]
+    assert remaining == ["checkpoints/running/manifest.json", "checkpoints/running/product.mp4"]
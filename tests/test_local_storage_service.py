@@ -0,0 +1,119 @@
+"""
+LocalStorageService: blobs appear only when complete and never outside their container
+"""
+import asyncio
+import os
+import pytest
+from src.services import local_storage_service
+from src.services.local_storage_service import LocalStorageService, PARTIAL_SUFFIX
+
+
+def files_under(path):
+    return sorted(
+        os.path.relpath(os.path.join(dir_path, name), path).replace(os.sep, "/")
+        for dir_path, _, names in os.walk(path) for name in names
+    )
+
+
+def test_upload_download_round_trip(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "root"))
+    source = tmp_path / "lesson.json"
+    source.write_bytes(b'{"slides": []}')
+
+    async def scenario():
+        url = await storage.upload_file("input", "lessons/a/lesson.json", str(source))
+        await storage.upload_content("input", "notes.txt", b"notes")
+        local_path = await storage.download_file("input", "lessons/a/lesson.json", str(tmp_path / "out" / "copy.json"))
+        blobs = await storage.list_blobs("input")
+        return url, local_path, blobs
+
+    url, local_path, blobs = asyncio.run(scenario())
+    assert url.startswith("file://") and url.endswith("/input/lessons/a/lesson.json")
+    assert open(local_path, "rb").read() == b'{"slides": []}'
+    assert [blob["name"] for blob in blobs] == ["lessons/a/lesson.json", "notes.txt"]
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path, monkeypatch):
+    storage = LocalStorageService(str(tmp_path / "root"))
+    asyncio.run(storage.upload_content("output", "video.mp4", b"old"))
+
+    def fail_replace(source, target):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(local_storage_service.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        asyncio.run(storage.upload_content("output", "video.mp4", b"new"))
+
+    # The previous blob is untouched and the partial file is gone
+    assert files_under(tmp_path / "root") == ["output/video.mp4"]
+    assert (tmp_path / "root" / "output" / "video.mp4").read_bytes() == b"old"
+
+
+def test_streamed_upload_is_invisible_until_commit(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "root"))
+
+    async def scenario():
+        upload = await storage.open_block_upload("output", "ai-product/video.mp4", "video/mp4")
+        await upload.write(b"a" * 10)
+        await upload.write(b"b" * 5)
+
+        # Only the partial file exists, and listings and lookups skip it
+        partial_files = files_under(tmp_path / "root")
+        assert len(partial_files) == 1 and partial_files[0].endswith(PARTIAL_SUFFIX)
+        assert not await storage.blob_exists("output", "ai-product/video.mp4")
+        assert await storage.list_blobs("output") == []
+
+        await upload.commit()
+        await upload.abort()  # no-op after commit
+        assert await storage.blob_exists("output", "ai-product/video.mp4")
+        return upload
+
+    upload = asyncio.run(scenario())
+    assert upload.bytes_written == 15
+    assert files_under(tmp_path / "root") == ["output/ai-product/video.mp4"]
+
+
+def test_aborted_stream_upload_leaves_nothing(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "root"))
+
+    async def scenario():
+        upload = await storage.open_block_upload("output", "video.mp4")
+        await upload.write(b"partial")
+        await upload.abort()
+
+    asyncio.run(scenario())
+    assert files_under(tmp_path / "root") == []
+
+
+def test_delete_and_exists(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "root"))
+
+    async def scenario():
+        await storage.upload_content("output", "a.mp4", b"x")
+        deleted = await storage.delete_blob("output", "a.mp4")
+        missing = await storage.delete_blob("output", "a.mp4")
+        return deleted, missing, await storage.blob_exists("output", "a.mp4")
+
+    assert asyncio.run(scenario()) == (True, False, False)
+
+
+@pytest.mark.parametrize("blob_name", ["../escape.txt", "a/../../escape.txt", "../other/blob.txt", "/etc/passwd", ""])
+def test_blob_names_cannot_escape_the_container(tmp_path, blob_name):
+    storage = LocalStorageService(str(tmp_path / "root"))
+    (tmp_path / "root" / "other").mkdir()
+    (tmp_path / "root" / "other" / "blob.txt").write_bytes(b"secret")
+
+    with pytest.raises(ValueError):
+        asyncio.run(storage.upload_content("input", blob_name, b"x"))
+    with pytest.raises(ValueError):
+        asyncio.run(storage.open_block_upload("input", blob_name))
+    with pytest.raises(ValueError):
+        asyncio.run(storage.download_file("input", blob_name, str(tmp_path / "out.txt")))
+    with pytest.raises(ValueError):
+        storage.get_blob_url("input", blob_name)
+    assert not asyncio.run(storage.blob_exists("input", blob_name))
+    assert not asyncio.run(storage.delete_blob("input", blob_name))
+
+    assert not (tmp_path / "root" / "escape.txt").exists()
+    assert not (tmp_path / "escape.txt").exists()
+    assert (tmp_path / "root" / "other" / "blob.txt").read_bytes() == b"secret"
@@ -0,0 +1,155 @@
+"""
+media_info: durations read from MP4, WAV and MP3 headers, ffprobe for everything else
+"""
+import shutil
+import struct
+import subprocess
+import wave
+import pytest
+from src.utils import media_info
+from src.utils.media_info import get_media_duration
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def atom(atom_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + atom_type + payload
+
+
+def mvhd(timescale: int, duration: int, version: int = 0) -> bytes:
+    if version == 1:
+        fields = struct.pack(">QQIQ", 0, 0, timescale, duration)
+    else:
+        fields = struct.pack(">IIII", 0, 0, timescale, duration)
+    return atom(b"mvhd", bytes([version, 0, 0, 0]) + fields + b"\0" * 80)
+
+
+def write_mp4(path, *moov_children: bytes):
+    path.write_bytes(atom(b"ftyp", b"isom\0\0\2\0isomiso2") + atom(b"free", b"") + atom(b"moov", b"".join(moov_children)))
+
+
+@pytest.fixture
+def no_ffprobe(monkeypatch):
+    """Fail the test if the header parsers fall back to ffprobe"""
+    def fail(path):
+        raise AssertionError(f"unexpected ffprobe fallback for {path}")
+    monkeypatch.setattr(media_info, "_ffprobe_duration", fail)
+
+
+def test_mp4_mvhd(tmp_path, no_ffprobe):
+    path = tmp_path / "lesson.mp4"
+    write_mp4(path, mvhd(1000, 83_250))
+    assert get_media_duration(str(path)) == 83.25
+
+
+def test_mp4_mvhd_version_1(tmp_path, no_ffprobe):
+    path = tmp_path / "long.mp4"
+    write_mp4(path, mvhd(90_000, 90_000 * 7200, version=1))
+    assert get_media_duration(str(path)) == 7200.0
+
+
+def test_mp4_longest_track_when_mvhd_is_empty(tmp_path, no_ffprobe):
+    def trak(timescale, duration):
+        mdhd = atom(b"mdhd", b"\0\0\0\0" + struct.pack(">IIII", 0, 0, timescale, duration) + b"\0" * 4)
+        return atom(b"trak", atom(b"mdia", mdhd))
+
+    path = tmp_path / "tracks.mp4"
+    write_mp4(path, mvhd(1000, 0), trak(44_100, 44_100 * 4), trak(10, 45))
+    assert get_media_duration(str(path)) == 4.5
+
+
+def test_wav(tmp_path, no_ffprobe):
+    path = tmp_path / "speech.wav"
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(24_000)
+        wav_file.writeframes(b"\0\0" * 24_000 * 3)
+    assert get_media_duration(str(path)) == 3.0
+
+
+def mp3_frame_header(bitrate_index: int = 9, sample_rate_index: int = 0, mono: bool = False) -> bytes:
+    # MPEG-1 Layer III without CRC; 9 = 128 kbps, 0 = 44.1 kHz
+    return bytes([0xFF, 0xFB, (bitrate_index << 4) | (sample_rate_index << 2), 0xC0 if mono else 0x00])
+
+
+def test_mp3_cbr(tmp_path, no_ffprobe):
+    path = tmp_path / "cbr.mp3"
+    path.write_bytes(mp3_frame_header() + b"\0" * (160_000 - 4))
+    # 160000 bytes at 128 kbps
+    assert get_media_duration(str(path)) == 10.0
+
+
+def test_mp3_cbr_after_id3_tag(tmp_path, no_ffprobe):
+    tag_size = 100
+    id3 = b"ID3\x04\x00\x00" + bytes([0, 0, 0, tag_size]) + b"\0" * tag_size
+    path = tmp_path / "tagged.mp3"
+    path.write_bytes(id3 + mp3_frame_header() + b"\0" * (16_000 - 4))
+    assert get_media_duration(str(path)) == 1.0
+
+
+def test_mp3_xing_frame_count(tmp_path, no_ffprobe):
+    side_info = b"\0" * 32  # MPEG-1 stereo
+    xing = b"Xing" + struct.pack(">II", 0x1, 1000)
+    path = tmp_path / "vbr.mp3"
+    path.write_bytes(mp3_frame_header() + side_info + xing + b"\0" * 5000)
+    assert get_media_duration(str(path)) == pytest.approx(1000 * 1152 / 44_100)
+
+
+def test_unknown_format_uses_ffprobe(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(media_info, "_ffprobe_duration", lambda path: calls.append(path) or 12.5)
+    path = tmp_path / "clip.ogg"
+    path.write_bytes(b"OggS" + b"\0" * 100)
+
+    assert get_media_duration(str(path)) == 12.5
+    assert calls == [str(path)]
+
+
+def test_no_duration_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_info, "_ffprobe_duration", lambda path: None)
+    path = tmp_path / "garbage.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        get_media_duration(str(path))
+
+
+def ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-v", "error", "-y", *args], check=True)
+
+
+@requires_ffmpeg
+def test_encoded_fixtures(tmp_path, no_ffprobe):
+    mp4 = tmp_path / "encoded.mp4"
+    ffmpeg("-f", "lavfi", "-i", "testsrc=d=3:s=160x120:r=10", "-f", "lavfi", "-i", "sine=d=3",
+           "-c:v", "libx264", "-c:a", "aac", "-shortest", "-movflags", "+faststart", str(mp4))
+    xing_mp3 = tmp_path / "xing.mp3"
+    ffmpeg("-f", "lavfi", "-i", "sine=d=4", "-c:a", "libmp3lame", "-q:a", "4", str(xing_mp3))
+    cbr_mp3 = tmp_path / "cbr.mp3"
+    ffmpeg("-f", "lavfi", "-i", "sine=d=4", "-c:a", "libmp3lame", "-b:a", "128k", "-write_xing", "0", str(cbr_mp3))
+
+    # Encoder delay and padding add a few frames
+    assert get_media_duration(str(mp4)) == pytest.approx(3.0, abs=0.1)
+    assert get_media_duration(str(xing_mp3)) == pytest.approx(4.0, abs=0.1)
+    assert get_media_duration(str(cbr_mp3)) == pytest.approx(4.0, abs=0.1)
+
+
+@requires_ffmpeg
+def test_fragmented_mp4_falls_back_to_ffprobe(tmp_path, monkeypatch):
+    path = tmp_path / "streamed.mp4"
+    ffmpeg("-f", "lavfi", "-i", "testsrc=d=2:s=160x120:r=10", "-c:v", "libx264",
+           "-movflags", "frag_keyframe+empty_moov+default_base_moof", str(path))
+
+    calls = []
+    monkeypatch.setattr(media_info, "_ffprobe_duration", lambda probed: calls.append(probed) or 2.0)
+    assert get_media_duration(str(path)) == 2.0
+    assert calls == [str(path)]
+
+
+@pytest.mark.skipif(shutil.which("ffprobe") is None or shutil.which("ffmpeg") is None,
+                    reason="ffmpeg/ffprobe not installed")
+def test_fragmented_mp4_with_real_ffprobe(tmp_path):
+    path = tmp_path / "streamed.mp4"
+    ffmpeg("-f", "lavfi", "-i", "testsrc=d=2:s=160x120:r=10", "-c:v", "libx264",
+           "-movflags", "frag_keyframe+empty_moov+default_base_moof", str(path))
+    assert get_media_duration(str(path)) == pytest.approx(2.0, abs=0.1)
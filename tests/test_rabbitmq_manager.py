@@ -0,0 +1,87 @@
+"""
+RabbitMQManager message handling: routing between worker types, sub-task replies
+"""
+import asyncio
+from src.models.task_messages import TaskType
+from fake_broker import FakeMessage, make_manager
+
+RENDER_SLIDE = {
+    "jobId": "job-1",
+    "taskType": TaskType.RENDER_SLIDE.value,
+    "slide": {"slide_id": 3, "title": "Slide 3", "content": [], "tts_script": "Ba."},
+    "slideIndex": 2,
+    "segmentBlobName": "render-segments/job-1/slide_2_abc.mp4",
+    "renderProfile": {"render_mode": "segments"},
+}
+
+
+def test_render_sub_task_is_handled_not_forwarded(tmp_path):
+    handled = []
+
+    async def handler(data):
+        handled.append(data["taskType"])
+        return {"success": True, "cacheable": True}
+
+    manager = make_manager(tmp_path, handler)
+    message = FakeMessage(RENDER_SLIDE, reply_to="amq.gen-reply")
+
+    asyncio.run(manager._process_message_safely(message))
+
+    assert handled == [TaskType.RENDER_SLIDE.value]
+    assert message.outcome == "acked"
+    # The only publish is the reply to the requesting worker, on the default exchange
+    assert manager.published == [
+        ("amq.gen-reply", "", {"success": True, "cacheable": True, "workerId": manager.config.worker_id})
+    ]
+
+
+def test_render_sub_task_routes_to_the_render_queue(tmp_path):
+    manager = make_manager(tmp_path, None, render_routing_key="ai.render")
+    assert manager._route_for(RENDER_SLIDE) == ("ai.render", True)
+
+
+def test_other_worker_types_tasks_are_forwarded(tmp_path):
+    async def handler(data):
+        raise AssertionError("a content task must not run on a product worker")
+
+    manager = make_manager(tmp_path, handler)
+    body = {"jobId": "job-2", "taskType": TaskType.GENERATE_CONTENT.value, "topic": "Photosynthesis", "sourceBlobNames": ["notes.pdf"]}
+    message = FakeMessage(body)
+
+    asyncio.run(manager._process_message_safely(message))
+
+    assert [(route, exchange) for route, exchange, _ in manager.published] == [("eduva.task.generate_content", None)]
+    assert message.outcome == "acked"
+
+
+def test_failed_sub_task_replies_instead_of_retrying(tmp_path):
+    async def handler(data):
+        return False
+
+    manager = make_manager(tmp_path, handler, max_retries=3)
+    message = FakeMessage(RENDER_SLIDE, reply_to="amq.gen-reply")
+
+    asyncio.run(manager._process_message_safely(message))
+
+    assert manager.published == [("amq.gen-reply", "", {"success": False, "workerId": manager.config.worker_id})]
+
+
+def test_render_sub_task_runs_while_a_video_holds_every_slot(tmp_path):
+    rendered = asyncio.Event()
+
+    async def handler(data):
+        rendered.set()
+        return {"success": True}
+
+    manager = make_manager(tmp_path, handler, max_concurrent_tasks=2)
+
+    async def scenario():
+        # The coordinating video (weight 2) takes both slots until its slides are rendered
+        async with manager.admission.slot(2, "video job-1", cost=300.0):
+            await asyncio.wait_for(
+                manager._process_message_safely(FakeMessage(RENDER_SLIDE, reply_to="amq.gen-reply")), timeout=5
+            )
+            assert manager.admission.in_use == 2
+
+    asyncio.run(scenario())
+    assert rendered.is_set()
@@ -0,0 +1,57 @@
+"""
+Segment cache reuse across jobs: an edited lesson only re-renders the edited slide
+"""
+import copy
+from src.services.segment_cache import SegmentCache
+from src.services.slide_templates import SlideTemplateManager, slide_template_seed
+
+VOICE = {"languageCode": "vi-VN", "name": "vi-VN-Neural2-A", "speakingRate": 1.1}
+PROFILE = {"render_mode": "segments", "encoding_mode": "static", "resolution": [1280, 720], "fps": 10}
+
+LESSON = {
+    "slides": [
+        {
+            "slide_id": index + 1,
+            "title": f"Bài {index + 1}",
+            "content": [f"Ý chính {index + 1}", f"- Chi tiết {index + 1}"],
+            "tts_script": f"Lời giảng cho slide số {index + 1}.",
+            "image_keywords": ["education"],
+        }
+        for index in range(8)
+    ]
+}
+
+
+def segment_keys(lesson):
+    """Keys a job computes for its slides (a fresh template manager per job, as in VideoGenerator)"""
+    slides = lesson["slides"]
+    plan = SlideTemplateManager().plan_templates([slide_template_seed(slide) for slide in slides])
+    return [
+        SegmentCache.make_key(slide, VOICE, template, PROFILE, add_disclaimer=(index == 0), language="vietnamese")
+        for index, (slide, template) in enumerate(zip(slides, plan))
+    ]
+
+
+def test_resubmitted_lesson_reuses_every_segment():
+    assert segment_keys(LESSON) == segment_keys(copy.deepcopy(LESSON))
+
+
+def test_edited_slide_is_the_only_cache_miss(tmp_path):
+    cache = SegmentCache(str(tmp_path / "segments"), max_size_mb=16)
+    for key in segment_keys(LESSON):
+        cache.put(key, b"segment")
+
+    edited = copy.deepcopy(LESSON)
+    edited["slides"][3]["tts_script"] = "Lời giảng đã được giáo viên chỉnh sửa."
+
+    misses = [key for key in segment_keys(edited) if not cache.contains(key)]
+    assert len(misses) == 1
+
+
+def test_any_single_edit_rekeys_at_most_the_next_slide():
+    # No template twice in a row: the edited slide may take the next slide's template and push it to another one
+    keys = set(segment_keys(LESSON))
+    for index in range(len(LESSON["slides"])):
+        edited = copy.deepcopy(LESSON)
+        edited["slides"][index]["title"] = "Tiêu đề mới"
+        assert 1 <= sum(key not in keys for key in segment_keys(edited)) <= 2
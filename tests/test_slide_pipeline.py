@@ -0,0 +1,96 @@
+"""
+Slide pipeline: stages overlap, failures and timeouts drop a slide without stalling the rest
+"""
+import asyncio
+import threading
+import time
+from src.utils.cancellation import CancellationToken
+from src.services.slide_pipeline import PipelineStage, SlidePipeline
+
+
+def run(pipeline, items, limit=5):
+    # A stuck queue shows up as a timeout instead of a hung test run
+    return asyncio.run(asyncio.wait_for(pipeline.run(items), timeout=limit))
+
+
+def slides(count):
+    return [{"slide_index": index, "steps": []} for index in range(count)]
+
+
+def step(name, delay=0.0):
+    def func(ctx, token):
+        time.sleep(delay)
+        ctx["steps"].append(name)
+        return ctx
+    return func
+
+
+def test_slides_pass_every_stage_and_come_back_in_order():
+    pipeline = SlidePipeline([
+        PipelineStage("tts", step("tts", 0.01), workers=3),
+        PipelineStage("render", step("render", 0.02), workers=2),
+        PipelineStage("encode", step("encode"), workers=1),
+    ], queue_size=1)
+
+    results = run(pipeline, slides(8))
+
+    assert [ctx["slide_index"] for ctx in results] == list(range(8))
+    assert all(ctx["steps"] == ["tts", "render", "encode"] for ctx in results)
+    assert set(pipeline.stage_timings) == {"tts", "render", "encode"}
+
+
+def test_stages_overlap():
+    render_started = threading.Event()
+
+    def tts(ctx, token):
+        if ctx["slide_index"] == 1:
+            # Slide 2 is narrated while slide 1 renders
+            assert render_started.wait(2)
+        return ctx
+
+    def render(ctx, token):
+        render_started.set()
+        return ctx
+
+    pipeline = SlidePipeline([PipelineStage("tts", tts), PipelineStage("render", render)])
+
+    assert len(run(pipeline, slides(3))) == 3
+
+
+def test_failing_slides_are_dropped_without_stalling_the_queues():
+    def flaky(ctx, token):
+        if ctx["slide_index"] % 3 == 0:
+            raise RuntimeError("TTS quota exceeded")
+        if ctx["slide_index"] % 3 == 1:
+            return None
+        return ctx
+
+    # More slides than the queues hold, so a lost end marker or stuck put() would hang
+    pipeline = SlidePipeline([
+        PipelineStage("tts", flaky, workers=2),
+        PipelineStage("render", step("render")),
+    ], queue_size=1)
+
+    results = run(pipeline, slides(12))
+
+    assert [ctx["slide_index"] for ctx in results] == [2, 5, 8, 11]
+
+
+def test_timed_out_stage_is_cancelled_and_the_next_slide_runs():
+    tokens = {}
+
+    def narrate(ctx, token):
+        tokens[ctx["slide_index"]] = token
+        if ctx["slide_index"] == 0:
+            token.sleep(30)
+        return ctx
+
+    pipeline = SlidePipeline([PipelineStage("tts", narrate, timeout=0.2)])
+    start = time.monotonic()
+
+    results = run(pipeline, slides(3))
+
+    assert [ctx["slide_index"] for ctx in results] == [1, 2]
+    assert tokens[0].cancelled and "timed out" in tokens[0].reason
+    assert not tokens[1].cancelled
+    assert time.monotonic() - start < 5
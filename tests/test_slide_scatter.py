@@ -0,0 +1,169 @@
+"""
+SlideScatter: split of a lesson's slides, remote renders and their local fallback
+"""
+import asyncio
+import pytest
+from src.models.task_messages import TaskType
+from src.services import slide_scatter
+from src.services.local_storage_service import LocalStorageService
+from src.services.slide_scatter import SlideScatter, segment_blob_name
+from fake_broker import make_manager, link
+
+CONTAINER = "eduva-temp-storage"
+
+
+def slide_ctx(tmp_path, slide_index):
+    temp_dir = tmp_path / f"slide_{slide_index + 1}"
+    temp_dir.mkdir(exist_ok=True)
+    return {
+        'slide': {'slide_id': slide_index + 1, 'title': f"Slide {slide_index + 1}", 'content': [], 'tts_script': "..."},
+        'slide_index': slide_index,
+        'slide_id': slide_index + 1,
+        'temp_dir': str(temp_dir),
+        'segment_key': f"{slide_index:02d}" + "ab" * 31,
+        'cacheable': True,
+    }
+
+
+class FakePublisher:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.requests = []
+
+    async def request(self, routing_key, body, timeout):
+        self.requests.append((routing_key, body, timeout))
+        if self.error is not None:
+            raise self.error
+        return self.reply
+
+
+def test_split_keeps_small_lessons_local(monkeypatch):
+    monkeypatch.setattr(slide_scatter, "SCATTER_MIN_SLIDES", 4)
+    monkeypatch.setattr(slide_scatter, "SCATTER_LOCAL_SLIDES", 2)
+    pending = list(range(3))
+    assert SlideScatter.split(pending) == ([0, 1, 2], [])
+
+    pending = list(range(7))
+    assert SlideScatter.split(pending) == ([0, 1], [2, 3, 4, 5, 6])
+
+
+def test_remote_render_fetches_the_segment(tmp_path):
+    storage = LocalStorageService(str(tmp_path / "storage"))
+    ctx = slide_ctx(tmp_path, 4)
+    blob_name = segment_blob_name("job-1", 4, ctx['segment_key'])
+    asyncio.run(storage.upload_content(CONTAINER, blob_name, b"segment bytes"))
+    publisher = FakePublisher(reply={"success": True, "cacheable": False, "workerId": "peer-2"})
+    scatter = SlideScatter(publisher, storage, CONTAINER, "ai.render", timeout=30)
+
+    assert asyncio.run(scatter.render_remote("job-1", ctx, {"slide": ctx['slide'], "slideIndex": 4}))
+
+    routing_key, body, timeout = publisher.requests[0]
+    assert (routing_key, timeout) == ("ai.render", 30)
+    assert body["taskType"] == TaskType.RENDER_SLIDE.value
+    assert (body["jobId"], body["segmentBlobName"]) == ("job-1", blob_name)
+    assert open(ctx['video_path'], "rb").read() == b"segment bytes"
+    assert ctx['cacheable'] is False
+    # The hand-over blob is deleted once fetched
+    assert not asyncio.run(storage.blob_exists(CONTAINER, blob_name))
+
+
+@pytest.mark.parametrize("publisher", [
+    FakePublisher(error=asyncio.TimeoutError()),
+    FakePublisher(error=RuntimeError("channel closed")),
+    FakePublisher(reply={"success": False, "workerId": "peer-2"}),
+    FakePublisher(reply={"success": True}),  # segment never uploaded
+], ids=["timeout", "dispatch error", "peer failed", "segment missing"])
+def test_failed_remote_render_falls_back_to_local(tmp_path, publisher):
+    scatter = SlideScatter(publisher, LocalStorageService(str(tmp_path / "storage")), CONTAINER, "ai.render")
+    ctx = slide_ctx(tmp_path, 2)
+
+    assert not asyncio.run(scatter.render_remote("job-1", ctx, {}))
+    assert 'video_path' not in ctx
+
+
+def test_unanswered_request_times_out(tmp_path):
+    # A sub-task nobody replies to: the manager's request() gives up after the scatter timeout
+    coordinator = make_manager(tmp_path, None, name="coordinator")
+    coordinator.reply_queue_name = "amq.gen-coordinator"
+    coordinator.reply_queue_ready.set()
+    scatter = SlideScatter(coordinator, LocalStorageService(str(tmp_path / "storage")), CONTAINER, "ai.render",
+                           timeout=0.05)
+    ctx = slide_ctx(tmp_path, 5)
+
+    assert not asyncio.run(scatter.render_remote("job-1", ctx, {"slide": ctx['slide'], "slideIndex": 5}))
+    assert [route for route, _, _ in coordinator.published] == ["ai.render"]
+    assert coordinator.pending_replies == {}
+
+
+def test_render_handler_round_trip(tmp_path, monkeypatch):
+    pytest.importorskip("google.cloud.texttospeech")
+    from src.core.product_task_dispatcher import ProductTaskDispatcher
+    from src.handlers import slide_render_handler
+    from src.handlers.slide_render_handler import SlideRenderHandler
+
+    profile = {'render_mode': "segments", 'fps': 10}
+    rendered = []
+
+    class FakeVideoGenerator:
+        def __init__(self, voice_config=None, language="vietnamese", render_mode=None, encoding_mode=None,
+                     segment_cache=None):
+            self.segment_profile = dict(profile)
+
+        async def render_slide_segment(self, slide, slide_index, template_name, temp_dir):
+            rendered.append((slide['slide_id'], slide_index, template_name))
+            video_path = f"{temp_dir}/segment.mp4"
+            with open(video_path, "wb") as segment:
+                segment.write(b"peer segment %d" % slide_index)
+            return {'video_path': video_path, 'cacheable': True}
+
+    monkeypatch.setattr(slide_render_handler, "VideoGenerator", FakeVideoGenerator)
+    monkeypatch.setattr(slide_render_handler, "get_segment_cache", lambda storage, container: None)
+
+    peer_handler = None
+
+    async def peer_handle(data):
+        return await ProductTaskDispatcher(None, peer_handler).dispatch_task(data)
+
+    coordinator = make_manager(tmp_path, None, name="coordinator", render_routing_key="ai.render")
+    peer = make_manager(tmp_path, peer_handle, name="peer", render_routing_key="ai.render")
+    peer_handler = SlideRenderHandler(peer.config, backend_client=None)
+    link(coordinator, peer)
+    scatter = SlideScatter(coordinator, peer_handler.storage, peer.config.azure_input_container, "ai.render",
+                           timeout=10)
+    ctx = slide_ctx(tmp_path, 6)
+    request = {'slide': ctx['slide'], 'slideIndex': 6, 'templateName': "dark_mode",
+               'voiceConfig': None, 'language': "vietnamese", 'renderProfile': profile}
+
+    assert asyncio.run(scatter.render_remote("job-1", ctx, request))
+
+    assert rendered == [(7, 6, "dark_mode")]
+    assert open(ctx['video_path'], "rb").read() == b"peer segment 6"
+    assert ctx['cacheable'] is True
+    reply_route, reply_exchange, reply = peer.published[0]
+    assert (reply_route, reply_exchange) == ("amq.gen-coordinator", "")
+    assert reply == {"success": True, "cacheable": True, "workerId": "peer"}
+
+
+def test_render_handler_refuses_a_different_profile(tmp_path, monkeypatch):
+    pytest.importorskip("google.cloud.texttospeech")
+    from src.handlers import slide_render_handler
+    from src.handlers.slide_render_handler import SlideRenderHandler
+    from src.models.task_messages import parse_task_message
+
+    class FakeVideoGenerator:
+        segment_profile = {'render_mode': "segments", 'fps': 24}
+
+        def __init__(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(slide_render_handler, "VideoGenerator", FakeVideoGenerator)
+    monkeypatch.setattr(slide_render_handler, "get_segment_cache", lambda storage, container: None)
+    manager = make_manager(tmp_path, None)
+    handler = SlideRenderHandler(manager.config, backend_client=None)
+    message = parse_task_message({
+        "jobId": "job-1", "taskType": TaskType.RENDER_SLIDE.value, "slide": {"slide_id": 1}, "slideIndex": 0,
+        "segmentBlobName": "render-segments/job-1/slide_0.mp4", "renderProfile": {'render_mode': "segments", 'fps': 10},
+    })
+
+    assert asyncio.run(handler.process(message)) is False
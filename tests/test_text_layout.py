@@ -0,0 +1,59 @@
+"""
+text_layout.wrap_text: same line breaks as the textbbox-per-candidate wrapper it replaced
+"""
+import pytest
+from PIL import Image, ImageDraw
+from src.services import text_layout
+from src.services.text_layout import get_font, wrap_text
+
+PARAGRAPHS = [
+    "Machine Learning là một nhánh của trí tuệ nhân tạo cho phép máy tính học từ dữ liệu mà không cần lập trình tường minh.",
+    "Python là ngôn ngữ lập trình cấp cao, dễ học và có cú pháp đơn giản, được sử dụng rộng rãi trong khoa học dữ liệu.",
+    "The quick brown fox jumps over the lazy dog while photosynthesis converts light energy into chemical energy.",
+    "Các loại ML: Supervised, Unsupervised, Reinforcement Learning — mỗi loại có ứng dụng riêng trong đời sống.",
+    "(Ví dụ) «trích dẫn» f(x) = x² + 1; W/V/Y/T: kerning-heavy capitals, jjj ffff.",
+]
+
+requires_truetype = pytest.mark.skipif(text_layout.resolve_font_path() is None, reason="no TrueType font installed")
+
+
+def textbbox_wrap(text, font, max_width):
+    """The wrapper slide templates used before text_layout: one textbbox call per candidate line"""
+    draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    lines = []
+    current_line = []
+    for word in text.split():
+        test_line = ' '.join(current_line + [word])
+        bbox = draw.textbbox((0, 0), test_line, font=font)
+        if bbox[2] - bbox[0] <= max_width:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+            else:
+                lines.append(word)
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines
+
+
+@requires_truetype
+@pytest.mark.parametrize("size", [18, 28, 36, 60])
+def test_matches_textbbox_wrapper(size):
+    font = get_font(size)
+    for text in PARAGRAPHS:
+        for max_width in range(60, 1300, 11):
+            assert wrap_text(text, font, max_width) == textbbox_wrap(text, font, max_width), (text, max_width)
+
+
+@requires_truetype
+def test_overlong_word_gets_its_own_line():
+    font = get_font(32)
+    assert wrap_text("a supercalifragilisticexpialidocious b", font, 100) == ["a", "supercalifragilisticexpialidocious", "b"]
+
+
+def test_whitespace_is_collapsed():
+    font = get_font(24)
+    assert wrap_text("  one \n two\tthree  ", font, 10_000) == ["one two three"]
+    assert wrap_text("   ", font, 100) == []
@@ -0,0 +1,64 @@
+"""
+WorkerConfig retry tiers: exponential delays from RETRY_DELAY, capped at RETRY_MAX_DELAY
+"""
+import pytest
+from src.config.worker_config import WorkerConfig
+
+
+def make_config(tmp_path, **overrides):
+    settings = dict(
+        storage_backend="local", local_storage_dir=str(tmp_path / "storage"), temp_dir=str(tmp_path / "temp"),
+        backend_api_key="test-key", main_exchange="eduva_exchange",
+        max_retries=5, retry_delay=5, retry_backoff_factor=4, retry_max_delay=600,
+    )
+    settings.update(overrides)
+    return WorkerConfig(**settings)
+
+
+def test_delays_grow_exponentially_up_to_the_cap(tmp_path):
+    config = make_config(tmp_path)
+    assert [config.retry_delay_for(n) for n in range(1, 7)] == [5, 20, 80, 320, 600, 600]
+
+
+def test_retry_count_zero_uses_the_first_tier(tmp_path):
+    config = make_config(tmp_path)
+    assert config.retry_delay_for(0) == config.retry_delay_for(1) == 5
+
+
+def test_tiers_cover_every_retry_of_a_message(tmp_path):
+    # Retries 1..max_retries-1 are published; the last attempt goes to the DLQ instead
+    config = make_config(tmp_path)
+    assert config.retry_delay_tiers == [5, 20, 80, 320]
+    assert config.retry_delay_tiers == sorted({config.retry_delay_for(n) for n in range(1, config.max_retries)})
+
+
+def test_capped_delays_share_a_tier(tmp_path):
+    config = make_config(tmp_path, max_retries=10, retry_max_delay=100)
+    assert config.retry_delay_tiers == [5, 20, 80, 100]
+
+
+def test_max_delay_below_first_delay_keeps_first_delay(tmp_path):
+    config = make_config(tmp_path, retry_delay=30, retry_max_delay=10)
+    assert config.retry_delay_for(1) == 30
+    assert config.retry_delay_for(4) == 30
+    assert config.retry_delay_tiers == [30]
+
+
+def test_constant_delay_without_backoff(tmp_path):
+    config = make_config(tmp_path, retry_backoff_factor=1)
+    assert config.retry_delay_tiers == [5]
+
+
+@pytest.mark.parametrize("overrides", [dict(retry_delay=0), dict(max_retries=1)])
+def test_immediate_retries_need_no_tiers(tmp_path, overrides):
+    config = make_config(tmp_path, **overrides)
+    assert config.retry_delay_tiers == []
+    if config.retry_delay == 0:
+        assert config.retry_delay_for(3) == 0
+
+
+def test_tier_name_is_per_delay(tmp_path):
+    config = make_config(tmp_path)
+    names = [config.retry_tier_name(delay) for delay in config.retry_delay_tiers]
+    assert names[0] == "eduva_exchange.retry.5s"
+    assert len(set(names)) == len(names)